@@ -8,12 +8,17 @@ This module provides thread-safe TTL-based caches for:
 - Movies and TV shows (reduces DB reads for content endpoints)
 - MyList per user (reduces DB reads for watchlist checks)
 - Notifications per user and admin (reduces DB reads for notification endpoints)
+- Encoded catalog responses (skips filtering and JSON encoding for repeat requests)
+- Search rankings (skips filtering and fuzzy scoring for repeated queries)
 
 Cache hit rates of 95%+ are expected, reducing DB load by ~96%.
 """
 
+import hashlib
+import json
 import threading
 import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional, TypeVar, Generic
 from dataclasses import dataclass
 from utils.logger import log_info, log_debug
@@ -164,6 +169,203 @@ class TTLCache(Generic[T]):
             }
 
 
+class ResponseCache:
+    """
+    Thread-safe LRU cache of encoded responses, bounded by their total size.
+
+    Entries belong to one catalog version: the first get/set with a newer
+    version drops everything stored for the previous one, so no response
+    outlives the data it was built from.
+    """
+
+    # Rough per-entry bookkeeping cost (key, tuple, OrderedDict node)
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 4 * 1024 * 1024,
+                 name: str = "cache"):
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self._max_entry_bytes = max_entry_bytes
+        self._name = name
+        self._version = None
+        self._bytes = 0
+
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _sync_version(self, version) -> None:
+        # Caller holds the lock
+        if version != self._version:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key: str, version) -> Optional[tuple]:
+        """
+        Get the (body, headers) stored for key under this catalog version.
+
+        Returns None on a miss.
+        """
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0], entry[1]
+
+    def set(self, key: str, version, body: bytes, headers: list) -> bool:
+        """
+        Store an encoded response body and its headers.
+
+        Returns False if the entry is too large to cache or was built for an
+        older catalog version than the one already cached.
+        """
+        size = len(body) + len(key) + sum(len(k) + len(v) for k, v in headers) + self.ENTRY_OVERHEAD
+        if size > self._max_entry_bytes:
+            return False
+        with self._lock:
+            if self._version is not None and version < self._version:
+                return False
+            self._sync_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (body, headers, size)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self._evictions += 1
+            return True
+
+    def clear(self) -> None:
+        """Clear all entries from cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            log_info(f"{self._name}: Cache cleared")
+
+    def stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            return {
+                "name": self._name,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "catalog_version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": f"{hit_rate:.1f}%"
+            }
+
+
+class RankingCache:
+    """
+    Thread-safe LRU cache of search rankings, bounded by their total length.
+
+    A ranking is stored as (items, kinds): the matching catalog items in rank
+    order (references to the read-only catalog dicts, no copies) and a bytes
+    with the number of the list each item came from. Entries belong to one
+    catalog version, as in ResponseCache.
+    """
+
+    def __init__(self, max_items: int = 1000000, max_entries: int = 1024, name: str = "cache"):
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_items = max_items
+        self._max_entries = max_entries
+        self._name = name
+        self._version = None
+        self._items = 0
+
+        # Statistics
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _sync_version(self, version) -> None:
+        # Caller holds the lock
+        if version != self._version:
+            self._entries.clear()
+            self._items = 0
+            self._version = version
+
+    def get(self, key: tuple, version) -> Optional[tuple]:
+        """
+        Get the (items, kinds) ranking stored for key under this catalog version.
+
+        Returns None on a miss.
+        """
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def set(self, key: tuple, version, items: tuple, kinds: bytes) -> bool:
+        """
+        Store a ranking.
+
+        Returns False if the ranking is longer than a quarter of the cache or
+        was built for an older catalog version than the one already cached.
+        """
+        if len(items) > self._max_items // 4:
+            return False
+        with self._lock:
+            if self._version is not None and version < self._version:
+                return False
+            self._sync_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._items -= len(previous[0])
+            self._entries[key] = (items, kinds)
+            self._items += len(items)
+            while self._items > self._max_items or len(self._entries) > self._max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._items -= len(evicted[0])
+                self._evictions += 1
+            return True
+
+    def clear(self) -> None:
+        """Clear all entries from cache."""
+        with self._lock:
+            self._entries.clear()
+            self._items = 0
+            log_info(f"{self._name}: Cache cleared")
+
+    def stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            total = self._hits + self._misses
+            hit_rate = (self._hits / total * 100) if total > 0 else 0
+            return {
+                "name": self._name,
+                "size": len(self._entries),
+                "max_size": self._max_entries,
+                "items": self._items,
+                "max_items": self._max_items,
+                "catalog_version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": f"{hit_rate:.1f}%"
+            }
+
+
 # =============================================================================
 # Global Cache Instances
 # =============================================================================
@@ -198,6 +400,20 @@ movies_cache: TTLCache[list] = TTLCache(ttl_seconds=43200, max_size=1, name="Mov
 # TTL: 12 hours - content changes daily, immediate invalidation on writes
 shows_cache: TTLCache[list] = TTLCache(ttl_seconds=43200, max_size=1, name="ShowsCache")
 
+# Catalog response cache: stores encoded JSON responses of the catalog endpoints
+# Bounded by memory (64 MB), invalidated by catalog version (see utils/catalog_etag.py)
+# Key: catalog ETag (path + normalized query args), Value: (body, headers)
+catalog_response_cache: ResponseCache = ResponseCache(max_bytes=64 * 1024 * 1024, name="CatalogResponseCache")
+
+# Search ranking caches: store the full ranking of a search so every page (and
+# every shuffle of random=true) of a repeated query skips filtering and scoring
+# Bounded by 1M ranked titles (~9 MB of references), LRU-evicted
+# CDN searches are invalidated by catalog snapshot version (utils/catalog.py),
+# /api/search by catalog version (utils/catalog_etag.py)
+# Key: (normalized query, filters, fuzzy threshold, media_type[, with_images]), Value: (items, kinds)
+cdn_search_cache: RankingCache = RankingCache(max_items=1000000, name="CdnSearchCache")
+content_search_cache: RankingCache = RankingCache(max_items=1000000, name="ContentSearchCache")
+
 # MyList cache: stores per-user watchlist entries
 # TTL: 12 hours - invalidated on add/delete
 # Key: "user_{id}", Value: list of {content_type, content_id} dicts
@@ -349,6 +565,9 @@ def get_all_cache_stats() -> dict:
         "valid_token_cache": valid_token_cache.stats(),
         "movies_cache": movies_cache.stats(),
         "shows_cache": shows_cache.stats(),
+        "catalog_response_cache": catalog_response_cache.stats(),
+        "cdn_search_cache": cdn_search_cache.stats(),
+        "content_search_cache": content_search_cache.stats(),
         "mylist_cache": mylist_cache.stats(),
         "user_notifications_cache": user_notifications_cache.stats(),
         "admin_notifications_cache": admin_notifications_cache.stats(),
@@ -359,40 +578,114 @@ def get_all_cache_stats() -> dict:
 # Content Cache Helper Functions
 # =============================================================================
 
-def get_all_movies_cached() -> list:
-    """
-    Get all movies from cache or database.
-    Returns a list of shallow-copied serialized movie dicts.
-    """
+def _get_serialized_movies() -> list:
+    """Return the cached serialized movie list itself (callers must not mutate it)."""
     from models import Movie
 
     cached = movies_cache.get("all")
     if cached is not None:
-        return [dict(m) for m in cached]
+        return cached
 
     movies = Movie.query.all()
     serialized = [movie.serialize for movie in movies]
     movies_cache.set("all", serialized)
     log_info(f"MoviesCache: Loaded {len(serialized)} movies from DB")
-    return [dict(m) for m in serialized]
+    return serialized
 
 
-def get_all_shows_cached() -> list:
-    """
-    Get all TV shows from cache or database.
-    Returns a list of shallow-copied serialized show dicts.
-    """
+def _get_serialized_shows() -> list:
+    """Return the cached serialized show list itself (callers must not mutate it)."""
     from models import TVShow
 
     cached = shows_cache.get("all")
     if cached is not None:
-        return [dict(s) for s in cached]
+        return cached
 
     shows = TVShow.query.all()
     serialized = [show.serialize for show in shows]
     shows_cache.set("all", serialized)
     log_info(f"ShowsCache: Loaded {len(serialized)} shows from DB")
-    return [dict(s) for s in serialized]
+    return serialized
+
+
+def get_all_movies_cached() -> list:
+    """
+    Get all movies from cache or database.
+    Returns a list of shallow-copied serialized movie dicts.
+    """
+    return [dict(m) for m in _get_serialized_movies()]
+
+
+def get_all_shows_cached() -> list:
+    """
+    Get all TV shows from cache or database.
+    Returns a list of shallow-copied serialized show dicts.
+    """
+    return [dict(s) for s in _get_serialized_shows()]
+
+
+# Columnar filter indexes over the cached lists, rebuilt when the cached list is replaced
+_content_indexes: Dict[str, Any] = {}
+_content_indexes_lock = threading.Lock()
+
+
+def _get_content_index(name: str, serialized: list, media_type: str, date_fields: tuple = None):
+    from utils.catalog_index import ColumnarIndex
+
+    with _content_indexes_lock:
+        index = _content_indexes.get(name)
+        if index is None or index.items is not serialized:
+            index = ColumnarIndex(serialized, media_type, date_fields=date_fields)
+            _content_indexes[name] = index
+        return index
+
+
+def get_movies_index_cached():
+    """
+    Get the columnar filter index over the cached movies (its items are the
+    cached dicts themselves and must be copied before changing them).
+    """
+    return _get_content_index('movies', _get_serialized_movies(), 'movie')
+
+
+def get_shows_index_cached():
+    """
+    Get the columnar filter index over the cached TV shows (its items are the
+    cached dicts themselves and must be copied before changing them).
+    """
+    return _get_content_index('shows', _get_serialized_shows(), 'tv', ('first_air_date', 'release_date'))
+
+
+def filter_movies_cached(**filters) -> list:
+    """
+    Get the cached movies that pass the given filters (see ColumnarIndex.positions).
+    Returns a list of shallow-copied serialized movie dicts.
+    """
+    return [dict(m) for m in get_movies_index_cached().filter(**filters)]
+
+
+def filter_shows_cached(**filters) -> list:
+    """
+    Get the cached TV shows that pass the given filters (see ColumnarIndex.positions).
+    Returns a list of shallow-copied serialized show dicts.
+    """
+    return [dict(s) for s in get_shows_index_cached().filter(**filters)]
+
+
+# id -> item lookups over the cached lists, rebuilt when the cached list is replaced
+_id_indexes: Dict[str, tuple] = {}
+
+
+def _get_id_index(name: str, serialized: list, key: str) -> dict:
+    with _content_indexes_lock:
+        entry = _id_indexes.get(name)
+        if entry is None or entry[0] is not serialized:
+            by_id = {}
+            for item in serialized:
+                by_id.setdefault(item.get(key), item)
+            entry = (serialized, by_id)
+            _id_indexes[name] = entry
+        return entry[1]
 
 
 def get_movie_by_id_cached(movie_id: int) -> dict:
@@ -400,34 +693,123 @@ def get_movie_by_id_cached(movie_id: int) -> dict:
     Get a single movie by ID from the cached list.
     Returns a shallow-copied dict or None if not found.
     """
-    all_movies = get_all_movies_cached()
-    for movie in all_movies:
-        if movie.get('id') == movie_id:
-            return movie
-    return None
+    movie = _get_id_index('movies', _get_serialized_movies(), 'id').get(movie_id)
+    return dict(movie) if movie is not None else None
 
 
 def get_show_by_id_cached(show_id: int) -> dict:
     """
-    Get a single TV show by ID from the cached list.
+    Get a single TV show by show_id from the cached list.
     Returns a shallow-copied dict or None if not found.
     """
-    all_shows = get_all_shows_cached()
-    for show in all_shows:
-        if show.get('show_id') == show_id:
-            return show
-    return None
+    show = _get_id_index('shows', _get_serialized_shows(), 'show_id').get(show_id)
+    return dict(show) if show is not None else None
+
+
+# Discovery rankings over the cached lists, rebuilt when a cached list is replaced
+_ranked_views: Dict[tuple, tuple] = {}
+
+
+def get_ranked_content_cached(kind: str, content_type: str = '', with_images: bool = False):
+    """
+    Get the trending/featured ranking of the cached movies and shows.
+
+    Trending ranks the rated titles by vote_average, featured ranks every
+    title by vote_average (see utils/catalog_rankings.py). with_images keeps
+    only titles with both a poster and a backdrop.
+
+    Returns a RankedView of (serialized item, media_type) entries; the items
+    are the cached dicts themselves and must be copied before changing them.
+    """
+    from utils.catalog_rankings import RANK_TRENDING, rank_indexes, rated_scores, rating_scores
+
+    if content_type not in ('movie', 'tv'):
+        content_type = ''
+    movies = _get_serialized_movies() if content_type != 'tv' else None
+    shows = _get_serialized_shows() if content_type != 'movie' else None
+    key = (kind, content_type, bool(with_images))
+
+    with _content_indexes_lock:
+        entry = _ranked_views.get(key)
+        if entry is not None and entry[0] is movies and entry[1] is shows:
+            return entry[2]
+
+    sources = []
+    if movies is not None:
+        sources.append((_get_content_index('movies', movies, 'movie'), 'movie'))
+    if shows is not None:
+        sources.append((_get_content_index('shows', shows, 'tv', ('first_air_date', 'release_date')), 'tv'))
+    score = rated_scores if kind == RANK_TRENDING else rating_scores
+    view = rank_indexes(sources, score, with_images=with_images)
+
+    with _content_indexes_lock:
+        _ranked_views[key] = (movies, shows, view)
+    return view
+
+
+# Version of the cached lists, moved on when a cached list is replaced
+_content_version: Dict[str, tuple] = {}
+
+
+def get_content_version() -> int:
+    """
+    Get a version number of the cached movies and shows for this process.
+
+    It moves on whenever either cached list is replaced: after an invalidation
+    and also when the TTL expires and the rows are reloaded, which the catalog
+    version (utils/catalog_etag.py) does not follow.
+    """
+    movies = _get_serialized_movies()
+    shows = _get_serialized_shows()
+    with _content_indexes_lock:
+        entry = _content_version.get('all')
+        if entry is not None and entry[0] is movies and entry[1] is shows:
+            return entry[2]
+        version = entry[2] + 1 if entry is not None else 1
+        _content_version['all'] = (movies, shows, version)
+    return version
+
+
+# Digest of the cached lists, recomputed when a cached list is replaced
+_content_digest: Dict[str, tuple] = {}
+
+
+def get_content_digest() -> str:
+    """
+    Get a digest of the cached movies and shows.
+
+    Every worker that loaded the same rows gets the same digest, so it can tag
+    responses built from them (see utils/catalog_etag.py).
+    """
+    movies = _get_serialized_movies()
+    shows = _get_serialized_shows()
+    with _content_indexes_lock:
+        entry = _content_digest.get('all')
+        if entry is not None and entry[0] is movies and entry[1] is shows:
+            return entry[2]
+
+    encoded = json.dumps([movies, shows], sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:16]
+    with _content_indexes_lock:
+        _content_digest['all'] = (movies, shows, digest)
+    return digest
 
 
 def invalidate_movie_cache() -> None:
     """Invalidate the movies cache. Call after movie create/update/delete."""
+    from utils.catalog_etag import bump_catalog_version
+
     movies_cache.clear()
+    bump_catalog_version()
     log_info("MoviesCache: Invalidated")
 
 
 def invalidate_show_cache() -> None:
     """Invalidate the shows cache. Call after show create/update/delete."""
+    from utils.catalog_etag import bump_catalog_version
+
     shows_cache.clear()
+    bump_catalog_version()
     log_info("ShowsCache: Invalidated")
 
 
@@ -7,6 +7,8 @@ from utils.logger import log_info, log_success, log_warning, log_error
 from api.db_utils import safe_commit, safe_rollback
 from api.cache import invalidate_user, invalidate_admin, add_to_blacklist_cache
 from paths import CDN_FILES_DIR, CDN_POSTERS_DIR
+from utils.image_index import add_images
+from utils.catalog_journal import compact_journal
 import os
 import json
 import csv
@@ -717,9 +719,7 @@ def uploadRequests_count(current_admin):
 @admin_bp.route('/uploadRequests', methods=['GET'])
 @admin_token_required('moderator')
 def get_all_uploadRequests(current_admin):
-    from utils.data_helpers import get_tv_shows, get_movies
-    temp_tv_series = get_tv_shows()
-    temp_movies = get_movies()
+    from utils.data_helpers import get_catalog_item
     uploadRequest_items = UploadRequest.query.all()
     with_duplicates = request.args.get('with_duplicates', 'false').lower() == 'true'
 
@@ -729,7 +729,7 @@ def get_all_uploadRequests(current_admin):
     for title in uploadRequest_items:
         requests_count = len(UploadRequest.query.filter_by(content_id=title.content_id).all())
         if title.content_type == 'movie':
-            movie = next((item for item in temp_movies if item["id"] == title.content_id), None)
+            movie = get_catalog_item('movies', title.content_id)
             if movie:
                 new_data = {
                     'id': title.id,
@@ -755,7 +755,7 @@ def get_all_uploadRequests(current_admin):
                     if not found:
                         titles.append(new_data)
         elif title.content_type == 'tv':
-            tv = next((item for item in temp_tv_series if item["id"] == title.content_id), None)
+            tv = get_catalog_item('tv_series', title.content_id)
             if tv:
                 new_data = {
                     'id': title.id,
@@ -859,6 +859,10 @@ def import_cdn_data(current_admin):
             log_warning("No files provided in the request")
             return jsonify({'success': False, 'message': 'No files provided'}), 400
 
+        # The import rewrites the catalog files: fold the journaled single-item
+        # edits into them first, so a later replay cannot undo the import
+        compact_journal(CDN_FILES_DIR)
+
         # Get merge option
         merge_content = request.form.get('merge', 'true').lower() == 'true'
         log_info(f"Merge content option: {merge_content}")
@@ -905,6 +909,7 @@ def import_cdn_data(current_admin):
                     log_error(f"Error saving image {filename}: {str(e)}")
             
             log_info(f"Saved {saved_images} images")
+            add_images(saved_filenames)
         
         # 2. THEN PROCESS JSON/CSV DATA (after images are already saved)
         if 'data_file' in request.files:
@@ -969,12 +974,13 @@ def import_cdn_data(current_admin):
             
             log_info(f"Sorted content - Movies: {len(movies_data)}, TV Shows: {len(tv_data)}")
             
-            # Update the CDN files
-            from utils.data_helpers import get_movies, get_tv_shows, get_movies_with_images, get_tv_shows_with_images
-            temp_movies = get_movies(force_clean=False)
-            temp_tv_series = get_tv_shows(force_clean=False)
-            temp_movies_with_images = get_movies_with_images(force_clean=False)
-            temp_tv_series_with_images = get_tv_shows_with_images(force_clean=False)
+            # Update the CDN files, starting from the compacted files rather than
+            # this worker's catalog (which may not have the other workers' edits yet)
+            from utils.catalog_loader import load_catalog_file
+            temp_movies = load_catalog_file(os.path.join(CDN_FILES_DIR, 'movies_little_clean.json'), 'movie')
+            temp_tv_series = load_catalog_file(os.path.join(CDN_FILES_DIR, 'tv_little_clean.json'), 'tv')
+            temp_movies_with_images = load_catalog_file(os.path.join(CDN_FILES_DIR, 'movies_with_images.json'), 'movie')
+            temp_tv_series_with_images = load_catalog_file(os.path.join(CDN_FILES_DIR, 'tv_with_images.json'), 'tv')
             log_info(f"Current content - Movies: {len(temp_movies)}, TV Shows: {len(temp_tv_series)}")
             
             # Update the normal content files
@@ -1184,11 +1190,10 @@ def update_with_images_content(content_type, new_data, existing_with_images):
 def update_with_images_for_new_files(filenames):
     """Update with_images data for items with newly uploaded image files."""
     try:
-        from utils.data_helpers import get_movies, get_tv_shows, get_movies_with_images, get_tv_shows_with_images
-        temp_movies = get_movies(force_clean=False)
-        temp_tv_series = get_tv_shows(force_clean=False)
-        temp_movies_with_images = get_movies_with_images(force_clean=False)
-        temp_tv_series_with_images = get_tv_shows_with_images(force_clean=False)
+        from utils.data_helpers import get_catalog_item, get_movies_with_images, get_tv_shows_with_images
+        # The with_images lists are modified below, so work on writable copies
+        temp_movies_with_images = list(get_movies_with_images(force_clean=False))
+        temp_tv_series_with_images = list(get_tv_shows_with_images(force_clean=False))
         import app
         
         # Extract IDs from filenames (assumes format like poster_123.jpg or backdrop_123.jpg)
@@ -1213,31 +1218,39 @@ def update_with_images_for_new_files(filenames):
         
         # Check movies
         movies_updated = 0
+        movie_positions = {}
+        for i, m in enumerate(temp_movies_with_images):
+            movie_positions.setdefault(m['id'], i)
         for item_id in updated_items:
-            movie = next((m for m in temp_movies if m['id'] == item_id), None)
+            movie = get_catalog_item('movies', item_id)
             if movie:
                 from cdn.utils import check_images_existence
                 if check_images_existence(movie):
                     # Add to or update in temp_movies_with_images
-                    existing_index = next((i for i, m in enumerate(temp_movies_with_images) if m['id'] == item_id), None)
+                    existing_index = movie_positions.get(item_id)
                     if existing_index is not None:
                         temp_movies_with_images[existing_index] = movie
                     else:
+                        movie_positions[item_id] = len(temp_movies_with_images)
                         temp_movies_with_images.append(movie)
                     movies_updated += 1
         
         # Check TV shows
         tv_updated = 0
+        show_positions = {}
+        for i, s in enumerate(temp_tv_series_with_images):
+            show_positions.setdefault(s['id'], i)
         for item_id in updated_items:
-            show = next((s for s in temp_tv_series if s['id'] == item_id), None)
+            show = get_catalog_item('tv_series', item_id)
             if show:
                 from cdn.utils import check_images_existence
                 if check_images_existence(show):
                     # Add to or update in temp_tv_series_with_images
-                    existing_index = next((i for i, s in enumerate(temp_tv_series_with_images) if s['id'] == item_id), None)
+                    existing_index = show_positions.get(item_id)
                     if existing_index is not None:
                         temp_tv_series_with_images[existing_index] = show
                     else:
+                        show_positions[item_id] = len(temp_tv_series_with_images)
                         temp_tv_series_with_images.append(show)
                     tv_updated += 1
         
@@ -1334,6 +1347,27 @@ def get_cache_stats(current_admin):
     }), 200
 
 
+@admin_bp.route('/catalog/memory', methods=['GET'])
+@admin_token_required('moderator')
+def get_catalog_memory(current_admin):
+    """
+    Get the memory footprint of the in-memory catalog.
+    
+    Reports bytes per title as held (with shared keys and values) and as
+    it would be with a private copy of every value per title.
+    Walks the whole catalog, so it takes a moment on large catalogs.
+    """
+    from utils.catalog_memory import catalog_memory_report
+    from utils.data_helpers import get_catalog_snapshot
+    
+    report = catalog_memory_report(get_catalog_snapshot())
+    return jsonify({
+        'success': True,
+        'memory': report,
+        'message': 'Catalog memory report retrieved successfully'
+    }), 200
+
+
 @admin_bp.route('/cache/clear', methods=['POST'])
 @admin_token_required('superadmin')
 def clear_all_caches_endpoint(current_admin):
@@ -1,43 +1,46 @@
 from flask import Blueprint, request, jsonify
 from api.utils import token_required, serialize_watch_history
-from api.cache import get_all_movies_cached, get_all_shows_cached
-from cdn.utils import paginate, check_images_existence, filter_valid_genres
+from api.cache import filter_movies_cached, filter_shows_cached, get_ranked_content_cached, get_movies_index_cached, get_shows_index_cached
+from cdn.utils import paginate, check_images_existence, with_next_cursor
 from models import Movie, TVShow, db
 from sqlalchemy import func, text
 from datetime import datetime, timedelta
-import random
+from utils.catalog_etag import catalog_etag, SOURCE_CONTENT
+from utils.catalog_rankings import RANK_TRENDING, RANK_FEATURED
+from utils.projection import project, resolve_fields
+from utils.cursors import RANKED_CURSOR, clamp_per_page, page_ranked, read_cursor
+from utils.seeded_sampling import SEED_HEADER, resolve_seed, sample_page
 
 discovery_bp = Blueprint('discovery_bp', __name__, url_prefix='/api')
 
-def _extract_year(item, item_type):
-    date_field = 'release_date' if item_type == 'movie' else 'first_air_date'
-    date_str = item.get(date_field, '') or ''
-    try:
-        return int(str(date_str)[:4])
-    except (ValueError, TypeError):
-        return None
-
-def _passes_filters(item, item_type, genre, year, min_rating, max_rating):
-    vote_average = item.get('vote_average', 0) or 0
-    if isinstance(vote_average, str):
-        try:
-            vote_average = float(vote_average)
-        except ValueError:
-            return False
-
-    if not (min_rating <= vote_average <= max_rating):
-        return False
 
-    if genre and not filter_valid_genres(item, genre):
-        return False
-
-    if year is not None and _extract_year(item, item_type) != year:
-        return False
+def _discovery_item(item, media_type, fields=None):
+    """Copy a cached serialized item for a response, with the id the client expects and projected onto fields."""
+    item = dict(item)
+    if media_type == 'movie':
+        item['id'] = item.get('id', item.get('movie_id'))
+    else:
+        item['id'] = item.get('show_id', item.get('id'))
+    return project(item, fields)
+
+
+def _add_watch_history(items, current_user):
+    """Attach the user's watch history to each response item, in place."""
+    for item in items:
+        item_content_type = item.get('media_type', 'movie')
+        watch_history = serialize_watch_history(
+            content_id=item['id'],
+            content_type=item_content_type,
+            current_user=current_user,
+            include_next_episode=(item_content_type == 'tv')
+        )
+        if watch_history:
+            item['watch_history'] = watch_history
 
-    return True
 
 @discovery_bp.route('/discovery/random', methods=['GET'])
 @token_required
+@catalog_etag(random_arg=True, source=SOURCE_CONTENT)
 def get_discovery_random(current_user):
     """
     Discovery endpoint that returns random content from both movies and TV shows
@@ -46,70 +49,44 @@ def get_discovery_random(current_user):
     """
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 1, type=int)  # Default to 1 for banner
+    per_page = clamp_per_page(request.args.get('per_page', 1, type=int), default=1)  # Default to 1 for banner
     min_rating = request.args.get('min_rating', 0, type=float)
     max_rating = request.args.get('max_rating', 10, type=float)
     with_images = request.args.get('with_images', False, type=bool)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     content_type = request.args.get('content_type', '')  # 'movie', 'tv', or '' for both
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     
-    combined_content = []
+    seed = resolve_seed(request.args.get('seed', None, type=int))  # Same seed: next page of the same shuffle
     
     try:
-        # Get movies from cache
+        # Filter the cached movies and TV shows on their columnar indexes
+        sources = []
         if content_type != 'tv':
-            for movie_data in get_all_movies_cached():
-                vote_avg = movie_data.get('vote_average') or 0
-                if min_rating > 0 and vote_avg < min_rating:
-                    continue
-                if max_rating < 10 and vote_avg > max_rating:
-                    continue
-                if with_images and (not movie_data.get('poster_path') or not movie_data.get('backdrop_path')):
-                    continue
-                movie_data['id'] = movie_data.get('id', movie_data.get('movie_id'))
-                combined_content.append(movie_data)
-        
-        # Get TV shows from cache
+            index = get_movies_index_cached()
+            sources.append((index.items, index.positions(min_rating=min_rating, max_rating=max_rating, with_images=with_images), 'movie'))
         if content_type != 'movie':
-            for tv_data in get_all_shows_cached():
-                vote_avg = tv_data.get('vote_average') or 0
-                if min_rating > 0 and vote_avg < min_rating:
-                    continue
-                if max_rating < 10 and vote_avg > max_rating:
-                    continue
-                if with_images and (not tv_data.get('poster_path') or not tv_data.get('backdrop_path')):
-                    continue
-                tv_data['id'] = tv_data.get('show_id', tv_data.get('id'))
-                combined_content.append(tv_data)
+            index = get_shows_index_cached()
+            sources.append((index.items, index.positions(min_rating=min_rating, max_rating=max_rating, with_images=with_images), 'tv'))
         
-        # Shuffle the combined content for randomness
-        random.shuffle(combined_content)
-        
-        # Paginate results
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_content = combined_content[start:end]
+        # Draw only this page from a seeded permutation of the matching content
+        paginated_content = [_discovery_item(item, media_type, fields)
+                             for item, media_type in sample_page(sources, page, per_page, seed)]
         
         # Add watch history if requested
         if include_watch_history:
-            for item in paginated_content:
-                item_content_type = item.get('media_type', 'movie')
-                watch_history = serialize_watch_history(
-                    content_id=item['id'],
-                    content_type=item_content_type,
-                    current_user=current_user,
-                    include_next_episode=(item_content_type == 'tv')
-                )
-                if watch_history:
-                    item['watch_history'] = watch_history
+            _add_watch_history(paginated_content, current_user)
         
-        return jsonify(paginated_content)
+        response = jsonify(paginated_content)
+        response.headers[SEED_HEADER] = str(seed)
+        return response
         
     except Exception as e:
         return jsonify({'error': f'Database query failed: {str(e)}'}), 500
 
 @discovery_bp.route('/discovery/trending', methods=['GET'])
 @token_required
+@catalog_etag(source=SOURCE_CONTENT)
 def get_discovery_trending(current_user):
     """
     Get trending content from both movies and TV shows based on popularity
@@ -117,66 +94,37 @@ def get_discovery_trending(current_user):
     """
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     with_images = request.args.get('with_images', False, type=bool)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     content_type = request.args.get('content_type', '')  # 'movie', 'tv', or '' for both
-    
-    combined_content = []
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
+    cursor = read_cursor(request.args, RANKED_CURSOR)  # From X-Next-Cursor: resume after the previous page
     
     try:
-        # Get movies from cache
-        if content_type != 'tv':
-            for movie_data in get_all_movies_cached():
-                vote_average = movie_data.get('vote_average') or 0
-                if not vote_average:
-                    continue
-                if with_images and (not movie_data.get('poster_path') or not movie_data.get('backdrop_path')):
-                    continue
-                movie_data['id'] = movie_data.get('id', movie_data.get('movie_id'))
-                movie_data['popularity_score'] = vote_average * 10
-                combined_content.append(movie_data)
-        
-        # Get TV shows from cache
-        if content_type != 'movie':
-            for tv_data in get_all_shows_cached():
-                vote_average = tv_data.get('vote_average') or 0
-                if not vote_average:
-                    continue
-                if with_images and (not tv_data.get('poster_path') or not tv_data.get('backdrop_path')):
-                    continue
-                tv_data['id'] = tv_data.get('show_id', tv_data.get('id'))
-                tv_data['popularity_score'] = vote_average * 10
-                combined_content.append(tv_data)
+        # Rated titles by vote average, ranked once per cached content list
+        ranking = get_ranked_content_cached(RANK_TRENDING, content_type, with_images)
         
-        # Sort by popularity score
-        combined_content.sort(key=lambda x: x.get('popularity_score', 0), reverse=True)
-        
-        # Paginate results
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_content = combined_content[start:end]
+        # Only the returned page is copied
+        paginated_content = []
+        entries, next_cursor = page_ranked(ranking, page, per_page, cursor)
+        for item, media_type in entries:
+            item = _discovery_item(item, media_type, fields)
+            item['popularity_score'] = item.get('vote_average', 0) * 10
+            paginated_content.append(item)
         
         # Add watch history if requested
         if include_watch_history:
-            for item in paginated_content:
-                item_content_type = item.get('media_type', 'movie')
-                watch_history = serialize_watch_history(
-                    content_id=item['id'],
-                    content_type=item_content_type,
-                    current_user=current_user,
-                    include_next_episode=(item_content_type == 'tv')
-                )
-                if watch_history:
-                    item['watch_history'] = watch_history
+            _add_watch_history(paginated_content, current_user)
         
-        return jsonify(paginated_content)
+        return with_next_cursor(jsonify(paginated_content), next_cursor)
         
     except Exception as e:
         return jsonify({'error': f'Database query failed: {str(e)}'}), 500
 
 @discovery_bp.route('/discovery/featured', methods=['GET'])
 @token_required
+@catalog_etag(random_arg=True, source=SOURCE_CONTENT)
 def get_discovery_featured(current_user):
     """
     Get featured content from both movies and TV shows
@@ -184,64 +132,32 @@ def get_discovery_featured(current_user):
     """
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     with_images = request.args.get('with_images', False, type=bool)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     content_type = request.args.get('content_type', '')  # 'movie', 'tv', or '' for both
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     min_rating = request.args.get('min_rating', 7.0, type=float)  # Higher default for featured
-    
-    combined_content = []
+    seed = request.args.get('seed', None, type=int)  # Repeat a shuffle across pages
     
     try:
-        # Get movies from cache
-        if content_type != 'tv':
-            for movie_data in get_all_movies_cached():
-                vote_avg = movie_data.get('vote_average') or 0
-                if vote_avg < min_rating:
-                    continue
-                if with_images and (not movie_data.get('poster_path') or not movie_data.get('backdrop_path')):
-                    continue
-                movie_data['id'] = movie_data.get('id', movie_data.get('movie_id'))
-                combined_content.append(movie_data)
-        
-        # Get TV shows from cache
-        if content_type != 'movie':
-            for tv_data in get_all_shows_cached():
-                vote_avg = tv_data.get('vote_average') or 0
-                if vote_avg < min_rating:
-                    continue
-                if with_images and (not tv_data.get('poster_path') or not tv_data.get('backdrop_path')):
-                    continue
-                tv_data['id'] = tv_data.get('show_id', tv_data.get('id'))
-                combined_content.append(tv_data)
-        
-        # Sort by vote average descending
-        combined_content.sort(key=lambda x: x.get('vote_average', 0) or 0, reverse=True)
+        # Titles by vote average descending, ranked once per cached content list;
+        # the ones rated >= min_rating are a prefix of the ranking
+        ranking = get_ranked_content_cached(RANK_FEATURED, content_type, with_images)
+        featured_count = ranking.count_at_least(min_rating)
         
         # Add some randomness to avoid always showing the same content
-        if len(combined_content) > per_page * 2:
-            # Take top items but add some randomness
-            top_items = combined_content[:per_page * 2]
-            random.shuffle(top_items)
-            combined_content = top_items
+        if featured_count > per_page * 2:
+            # Take top items in a seeded random order
+            entries = ranking.shuffled_page(page, per_page, per_page * 2, seed)
+        else:
+            entries = ranking.page(page, per_page, limit=featured_count)
         
-        # Paginate results
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_content = combined_content[start:end]
+        paginated_content = [_discovery_item(item, media_type, fields) for item, media_type in entries]
         
         # Add watch history if requested
         if include_watch_history:
-            for item in paginated_content:
-                item_content_type = item.get('media_type', 'movie')
-                watch_history = serialize_watch_history(
-                    content_id=item['id'],
-                    content_type=item_content_type,
-                    current_user=current_user,
-                    include_next_episode=(item_content_type == 'tv')
-                )
-                if watch_history:
-                    item['watch_history'] = watch_history
+            _add_watch_history(paginated_content, current_user)
         
         return jsonify(paginated_content)
         
@@ -258,11 +174,12 @@ def get_discovery_new_titles(current_user):
     the last N days are returned (default 5 days).
     """
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     days = request.args.get('days', 5, type=int)  # Only titles added in the last N days
     with_images = request.args.get('with_images', False, type=bool)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     content_type = request.args.get('content_type', '')  # 'movie', 'tv', or '' for both
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     genre = request.args.get('genre', '', type=str)
     year = request.args.get('year', None, type=int)
     min_rating = request.args.get('min_rating', 0, type=float)
@@ -271,31 +188,24 @@ def get_discovery_new_titles(current_user):
     combined_content = []
     cutoff = datetime.utcnow() - timedelta(days=days)
     cutoff_iso = cutoff.isoformat()
+    filters = dict(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year, with_images=with_images)
 
     try:
         # --- Movies ---
         if content_type != 'tv':
-            for movie_data in get_all_movies_cached():
+            for movie_data in filter_movies_cached(**filters):
                 added_at = movie_data.get('added_at')
                 if not added_at or added_at < cutoff_iso:
                     continue
-                if with_images and (not movie_data.get('poster_path') or not movie_data.get('backdrop_path')):
-                    continue
-                if not _passes_filters(movie_data, 'movie', genre, year, min_rating, max_rating):
-                    continue
                 movie_data['id'] = movie_data.get('id', movie_data.get('movie_id'))
                 combined_content.append(movie_data)
 
         # --- TV Shows ---
         if content_type != 'movie':
-            for tv_data in get_all_shows_cached():
+            for tv_data in filter_shows_cached(**filters):
                 added_at = tv_data.get('added_at')
                 if not added_at or added_at < cutoff_iso:
                     continue
-                if with_images and (not tv_data.get('poster_path') or not tv_data.get('backdrop_path')):
-                    continue
-                if not _passes_filters(tv_data, 'tv_series', genre, year, min_rating, max_rating):
-                    continue
                 tv_data['id'] = tv_data.get('show_id', tv_data.get('id'))
                 combined_content.append(tv_data)
 
@@ -308,7 +218,7 @@ def get_discovery_new_titles(current_user):
         # Paginate
         start = (page - 1) * per_page
         end = start + per_page
-        paginated_content = combined_content[start:end]
+        paginated_content = [project(item, fields) for item in combined_content[start:end]]
 
         # Add watch history if requested
         if include_watch_history:
@@ -1,47 +1,23 @@
 from flask import Blueprint, request, jsonify, abort
 from models import Movie
 from api.utils import admin_token_required, sort, token_required, serialize_watch_history
-from api.cache import get_all_movies_cached, get_movie_by_id_cached
-from cdn.utils import filter_valid_genres
+from api.cache import get_all_movies_cached, get_movie_by_id_cached, filter_movies_cached, get_movies_index_cached
 from utils.fuzzy import fuzzy_filter_and_rank
+from utils.projection import project, resolve_fields
+from utils.cursors import clamp_per_page
+from cdn.utils import paginate_positions, with_next_cursor
+from utils.seeded_sampling import SEED_HEADER, resolve_seed, sample_items
 from paths import UPLOADS_DIR
 import os
-import random
 
 movies_bp = Blueprint('movies_bp', __name__, url_prefix='/api')
 
-def _extract_year(movie):
-    date_str = movie.get('release_date', '') or ''
-    try:
-        return int(str(date_str)[:4])
-    except (ValueError, TypeError):
-        return None
-
-def _passes_filters(movie, genre, year, min_rating, max_rating):
-    vote_average = movie.get('vote_average', 0) or 0
-    if isinstance(vote_average, str):
-        try:
-            vote_average = float(vote_average)
-        except ValueError:
-            return False
-
-    if not (min_rating <= vote_average <= max_rating):
-        return False
-
-    if genre and not filter_valid_genres(movie, genre):
-        return False
-
-    if year is not None and _extract_year(movie) != year:
-        return False
-
-    return True
-
 # Endpoint to get all movies with pagination
 @movies_bp.route('/movies', methods=['GET'])
 @token_required
 def get_movies(current_user):
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     order = request.args.get('order', 'asc', type=str)  # Default order is ascending
     sort_by_field = request.args.get('sort_by', None, type=str)  # Default sort_by is None
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
@@ -50,34 +26,43 @@ def get_movies(current_user):
     year = request.args.get('year', None, type=int)
     min_rating = request.args.get('min_rating', 0, type=float)
     max_rating = request.args.get('max_rating', 10, type=float)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
 
-    # Get all Movies from cache
-    all_movies_data = [
-        movie for movie in get_all_movies_cached()
-        if _passes_filters(movie, genre, year, min_rating, max_rating)
-    ]
-    
-    # Apply sorting if sort_by_field is provided
-    if sort_by_field:
-        reverse_sort = order.lower() == 'desc'
-        all_movies_data.sort(key=lambda m: m.get(sort_by_field) or '', reverse=reverse_sort)
-                
-    if reverse:
-        all_movies_data.reverse()
+    filters = dict(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
     
-    # Manual pagination on the reversed list
-    total = len(all_movies_data)
-    start = (page - 1) * per_page
-    end = start + per_page
-    movies_page = all_movies_data[start:end]
+    if sort_by_field or reverse:
+        # Get the filtered Movies from cache
+        all_movies_data = filter_movies_cached(**filters)
+        
+        # Apply sorting if sort_by_field is provided
+        if sort_by_field:
+            reverse_sort = order.lower() == 'desc'
+            all_movies_data.sort(key=lambda m: m.get(sort_by_field) or '', reverse=reverse_sort)
+                    
+        if reverse:
+            all_movies_data.reverse()
+        
+        # Manual pagination on the reversed list
+        total = len(all_movies_data)
+        start = (page - 1) * per_page
+        end = start + per_page
+        movies_page = all_movies_data[start:end]
+        next_cursor = None
+    else:
+        # Cached order: page the filter's positions on the cached index (?cursor= from
+        # X-Next-Cursor resumes after the previous page) and copy only this page
+        index = get_movies_index_cached()
+        movies_page, next_cursor = paginate_positions(index, index.positions(**filters), page, per_page)
+        movies_page = [dict(movie) for movie in movies_page]
     
-    movie_list = movies_page
+    # Project only the returned page
+    movie_list = [project(movie, fields) for movie in movies_page]
     
     # Add watch history if requested
     if include_watch_history:
-        for movie in movie_list:
+        for movie, source in zip(movie_list, movies_page):
             watch_history = serialize_watch_history(
-                content_id=movie['id'],
+                content_id=source['id'],
                 content_type='movie',
                 current_user=current_user,
                 include_next_episode=False
@@ -85,7 +70,7 @@ def get_movies(current_user):
             if watch_history:
                 movie['watch_history'] = watch_history
     
-    return jsonify(movie_list), 200
+    return with_next_cursor(jsonify(movie_list), next_cursor), 200
 
 @movies_bp.route('/movies/random', methods=['GET'])
 @token_required
@@ -93,31 +78,16 @@ def get__random_movie(current_user):
     genre = request.args.get('genre', '', type=str)
     min_rating = request.args.get('min_rating', 0, type=float)
     max_rating = request.args.get('max_rating', 10, type=float)
-    per_page = request.args.get('per_page', 20, type=int)
+    page = request.args.get('page', 1, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
+    seed = resolve_seed(request.args.get('seed', None, type=int))  # Same seed: next page of the same shuffle
 
-    movies = get_all_movies_cached()
-
-    def apply_filters(items, item_type):
-        results = []
-        for item in items:
-            title_or_name = item.get('title')
-            vote_average = item.get('vote_average', 0)
-            if isinstance(vote_average, str):
-                try:
-                    vote_average = float(vote_average)
-                except ValueError:
-                    continue
-            if (filter_valid_genres(item, genre) if genre else True) and \
-                    (min_rating <= vote_average <= max_rating):
-                item['type'] = item_type
-                results.append(item)
-        return results
-
-    movie_results = apply_filters(movies, 'movie')
-    random.shuffle(movie_results)
-
-    limited_results = movie_results[:per_page]
+    # Filter on the columnar index, then draw only this page from a seeded permutation of the matches
+    index = get_movies_index_cached()
+    positions = index.positions(min_rating=min_rating, max_rating=max_rating, genre=genre)
+    limited_results = [dict(project(movie, fields), type='movie') for movie in sample_items(index.items, positions, page, per_page, seed)]
     
     # Add watch history if requested
     if include_watch_history:
@@ -131,7 +101,9 @@ def get__random_movie(current_user):
             if watch_history:
                 movie['watch_history'] = watch_history
     
-    return jsonify(limited_results)
+    response = jsonify(limited_results)
+    response.headers[SEED_HEADER] = str(seed)
+    return response
 
 # Endpoint to search for movies by title
 @movies_bp.route('/movies/search', methods=['GET'])
@@ -142,8 +114,10 @@ def search_movies(current_user):
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     
     all_movies = get_all_movies_cached()
-    result = fuzzy_filter_and_rank(query, all_movies, lambda m: m.get('title') or '') if query else list(all_movies)
-    limited_result = result[:max_results]
+    if query:
+        limited_result = fuzzy_filter_and_rank(query, all_movies, lambda m: m.get('title') or '', limit=max_results)
+    else:
+        limited_result = list(all_movies)[:max_results]
     
     # Add watch history if requested
     if include_watch_history:
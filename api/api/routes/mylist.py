@@ -95,9 +95,7 @@ def check_in_mylist(current_user):
 @mylist_bp.route('/all', methods=['GET'])
 @token_required
 def get_all_mylist(current_user):
-    from utils.data_helpers import get_tv_shows, get_movies
-    temp_tv_series = get_tv_shows()
-    temp_movies = get_movies()
+    from utils.data_helpers import get_catalog_item
     from api.utils import serialize_watch_history
     
     page = request.args.get('page', 1, type=int)
@@ -118,9 +116,9 @@ def get_all_mylist(current_user):
             if cached_movie:
                 content_item = dict(cached_movie)
             else:
-                movie = next((item for item in temp_movies if item["id"] == content_id), None)
+                movie = get_catalog_item('movies', content_id)
                 if movie:
-                    content_item = movie
+                    content_item = dict(movie)
         
         elif content_type == 'tv':
             cached_show = get_show_by_id_cached(content_id)
@@ -130,9 +128,9 @@ def get_all_mylist(current_user):
                 if 'show_id' in content_item and 'id' not in content_item:
                     content_item['id'] = content_item['show_id']
             else:
-                tv = next((item for item in temp_tv_series if item["id"] == content_id), None)
+                tv = get_catalog_item('tv_series', content_id)
                 if tv:
-                    content_item = tv
+                    content_item = dict(tv)
                     # Ensure TV shows have an id field (copy from show_id if needed)
                     if 'show_id' in content_item and 'id' not in content_item:
                         content_item['id'] = content_item['show_id']
@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify, abort
 from models import Movie, TVShow
-from api.cache import get_all_movies_cached, get_all_shows_cached
-from cdn.utils import filter_valid_genres, check_images_existence
+from api.cache import get_all_movies_cached, get_all_shows_cached, get_movies_index_cached, get_shows_index_cached, content_search_cache, get_content_version
+from cdn.utils import check_images_existence
 from utils.fuzzy import fuzzy_filter_and_rank
+import itertools
 import random
 
 search_bp = Blueprint('search_bp', __name__, url_prefix='/api')
@@ -25,7 +26,8 @@ def autocomplete():
         query,
         all_items,
         lambda item: item.get('title') or item.get('name') or '',
-    )[:max_results]
+        limit=max_results,
+    )
 
     return jsonify(suggestions)
 
@@ -44,62 +46,57 @@ def advanced_search():
     fuzzy = request.args.get('fuzzy', False, type=bool)
     fuzzy_threshold = request.args.get('fuzzy_threshold', 0.25, type=float)
 
-    movies = get_all_movies_cached()
-    tv_series = get_all_shows_cached()
-
-    def _extract_year(item, item_type):
-        date_field = 'release_date' if item_type == 'movie' else 'first_air_date'
-        date_str = item.get(date_field, '') or ''
-        try:
-            return int(str(date_str)[:4])
-        except (ValueError, TypeError):
-            return None
-
-    def apply_filters(items, item_type):
-        results = []
-        for item in items:
-            title_or_name = item.get('title')
-            vote_average = item.get('vote_average', 0)
-            if isinstance(vote_average, str):
-                try:
-                    vote_average = float(vote_average)
-                except ValueError:
-                    continue
-            if year is not None and _extract_year(item, item_type) != year:
-                continue
-            if not (min_rating <= vote_average <= max_rating):
-                continue
-            if genre and not filter_valid_genres(item, genre):
-                continue
-            item['type'] = item_type
-            results.append(item)
-        return results
-
     if media_type == 'movies':
-        final_results = apply_filters(movies, 'movie')
+        catalogs = [(get_movies_index_cached, 'movie')]
     elif media_type == 'tv':
-        final_results = apply_filters(tv_series, 'tv_series')
+        catalogs = [(get_shows_index_cached, 'tv_series')]
     else:
-        final_results = apply_filters(movies, 'movie') + apply_filters(tv_series, 'tv_series')
-
-    # Text matching — fuzzy or exact substring
-    if query:
+        catalogs = [(get_movies_index_cached, 'movie'), (get_shows_index_cached, 'tv_series')]
+    fuzzy = bool(query and fuzzy)
+
+    # The full ranking of a query is cached per version of the cached lists
+    # (read before ranking, so a reload meanwhile doesn't leave it cached as current)
+    version = get_content_version()
+    key = (
+        query.strip().lower() if fuzzy else query.lower(),
+        genre, min_rating, max_rating, year,
+        fuzzy_threshold if fuzzy else None,
+        tuple(item_type for _, item_type in catalogs),
+    )
+    ranking = content_search_cache.get(key, version)
+    if ranking is None:
+        ranked = []
+        for list_no, (get_index, _) in enumerate(catalogs):
+            # Year, rating and genre facets are evaluated on the cached columnar index
+            results = get_index().filter(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
+            ranked.extend((list_no, item) for item in results)
+
+        # Text matching — fuzzy or exact substring
         if fuzzy:
-            final_results = fuzzy_filter_and_rank(
+            ranked = fuzzy_filter_and_rank(
                 query,
-                final_results,
-                text_getter=lambda item: item.get('title') or '',
+                ranked,
+                text_getter=lambda entry: entry[1].get('title') or '',
                 threshold=fuzzy_threshold,
             )
-        else:
+        elif query:
             q_lower = query.lower()
-            final_results = [
-                item for item in final_results
+            ranked = [
+                (list_no, item) for list_no, item in ranked
                 if q_lower in (item.get('title') or '').lower()
             ]
+        ranking = (tuple(item for _, item in ranked), bytes(list_no for list_no, _ in ranked))
+        content_search_cache.set(key, version, *ranking)
+    items, kinds = ranking
 
+    order = range(len(items))
     if is_random:
-        random.shuffle(final_results)
+        order = list(order)
+        random.shuffle(order)
+
+    # Cached items are shared: copy and tag each one as it is returned
+    item_types = [item_type for _, item_type in catalogs]
+    final_results = (dict(items[n], type=item_types[kinds[n]]) for n in order)
 
     if with_images:
         limited_results = []
@@ -110,7 +107,7 @@ def advanced_search():
             if len(limited_results) >= max_results:
                 break
     else:
-        limited_results = final_results[:max_results]
+        limited_results = list(itertools.islice(final_results, max_results))
 
 
     return jsonify(limited_results)
\ No newline at end of file
@@ -17,6 +17,7 @@ from api.service_controller import (
     is_service_enabled,
     is_maintenance_mode
 )
+from utils.catalog_loader import catalog_status
 from utils.logger import log_info, log_warning, log_success
 
 service_control_bp = Blueprint('service_control_bp', __name__, url_prefix='/api/service')
@@ -43,6 +44,20 @@ def get_service_status():
     })
 
 
+@service_control_bp.route('/ready', methods=['GET'])
+def get_readiness():
+    """
+    Readiness probe for orchestration.
+    Returns 200 once the content catalog is loaded, 503 while it is still
+    loading (or failed to load). Liveness is covered by /status.
+    
+    Returns:
+        JSON with the catalog loader state
+    """
+    status = catalog_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
 @service_control_bp.route('/config', methods=['GET'])
 @admin_token_required('superadmin')
 def get_full_config(current_admin):
@@ -1,45 +1,21 @@
 from flask import Blueprint, request, jsonify, abort
 from models import TVShow
 from api.utils import admin_token_required, token_required, serialize_watch_history
-from api.cache import get_all_shows_cached, get_show_by_id_cached
-from cdn.utils import filter_valid_genres
+from api.cache import get_all_shows_cached, get_show_by_id_cached, filter_shows_cached, get_shows_index_cached
 from utils.fuzzy import fuzzy_filter_and_rank
+from utils.projection import project, resolve_fields
+from utils.cursors import clamp_per_page
+from cdn.utils import paginate_positions, with_next_cursor
 from paths import UPLOADS_DIR
 import os
 
 shows_bp = Blueprint('shows_bp', __name__, url_prefix='/api')
 
-def _extract_year(show):
-    date_str = show.get('first_air_date', '') or show.get('release_date', '') or ''
-    try:
-        return int(str(date_str)[:4])
-    except (ValueError, TypeError):
-        return None
-
-def _passes_filters(show, genre, year, min_rating, max_rating):
-    vote_average = show.get('vote_average', 0) or 0
-    if isinstance(vote_average, str):
-        try:
-            vote_average = float(vote_average)
-        except ValueError:
-            return False
-
-    if not (min_rating <= vote_average <= max_rating):
-        return False
-
-    if genre and not filter_valid_genres(show, genre):
-        return False
-
-    if year is not None and _extract_year(show) != year:
-        return False
-
-    return True
-
 @shows_bp.route('/shows', methods=['GET'])
 @token_required
 def get_shows(current_user):
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     order = request.args.get('order', 'asc', type=str)  # Default order is ascending
     sort_by_field = request.args.get('sort_by', None, type=str)  # Default sort_by is None
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
@@ -48,34 +24,43 @@ def get_shows(current_user):
     year = request.args.get('year', None, type=int)
     min_rating = request.args.get('min_rating', 0, type=float)
     max_rating = request.args.get('max_rating', 10, type=float)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
 
-    # Get all Shows from cache
-    all_shows_data = [
-        show for show in get_all_shows_cached()
-        if _passes_filters(show, genre, year, min_rating, max_rating)
-    ]
-    
-    # Apply sorting if sort_by_field is provided
-    if sort_by_field:
-        reverse_sort = order.lower() == 'desc'
-        all_shows_data.sort(key=lambda s: s.get(sort_by_field) or '', reverse=reverse_sort)
-                
-    if reverse:
-        all_shows_data.reverse()
-    
-    # Manual pagination on the reversed list
-    total = len(all_shows_data)
-    start = (page - 1) * per_page
-    end = start + per_page
-    shows_page = all_shows_data[start:end]
-    
-    show_list = shows_page
+    filters = dict(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
+    
+    if sort_by_field or reverse:
+        # Get the filtered Shows from cache
+        all_shows_data = filter_shows_cached(**filters)
+        
+        # Apply sorting if sort_by_field is provided
+        if sort_by_field:
+            reverse_sort = order.lower() == 'desc'
+            all_shows_data.sort(key=lambda s: s.get(sort_by_field) or '', reverse=reverse_sort)
+                    
+        if reverse:
+            all_shows_data.reverse()
+        
+        # Manual pagination on the reversed list
+        total = len(all_shows_data)
+        start = (page - 1) * per_page
+        end = start + per_page
+        shows_page = all_shows_data[start:end]
+        next_cursor = None
+    else:
+        # Cached order: page the filter's positions on the cached index (?cursor= from
+        # X-Next-Cursor resumes after the previous page) and copy only this page
+        index = get_shows_index_cached()
+        shows_page, next_cursor = paginate_positions(index, index.positions(**filters), page, per_page)
+        shows_page = [dict(show) for show in shows_page]
+    
+    # Project only the returned page
+    show_list = [project(show, fields) for show in shows_page]
     
     # Add watch history if requested
     if include_watch_history:
-        for show in show_list:
+        for show, source in zip(show_list, shows_page):
             watch_history = serialize_watch_history(
-                content_id=show['show_id'],
+                content_id=source['show_id'],
                 content_type='tv',
                 current_user=current_user,
                 include_next_episode=True
@@ -83,7 +68,7 @@ def get_shows(current_user):
             if watch_history:
                 show['watch_history'] = watch_history
     
-    return jsonify(show_list), 200
+    return with_next_cursor(jsonify(show_list), next_cursor), 200
 
 @shows_bp.route('/shows/search', methods=['GET'])
 @token_required
@@ -93,8 +78,10 @@ def search_show(current_user):
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     
     all_shows = get_all_shows_cached()
-    result = fuzzy_filter_and_rank(query, all_shows, lambda s: s.get('title') or '') if query else list(all_shows)
-    limited_result = result[:max_results]
+    if query:
+        limited_result = fuzzy_filter_and_rank(query, all_shows, lambda s: s.get('title') or '', limit=max_results)
+    else:
+        limited_result = list(all_shows)[:max_results]
     
     # Add watch history if requested
     if include_watch_history:
@@ -67,9 +67,7 @@ def check_in_uploadRequest(current_user):
 @upload_request_bp.route('/all', methods=['GET'])
 @token_required
 def get_all_uploadRequest(current_user):
-    from utils.data_helpers import get_movies, get_tv_shows
-    temp_movies = get_movies()
-    temp_tv_series = get_tv_shows()
+    from utils.data_helpers import get_catalog_item
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
 
@@ -79,12 +77,12 @@ def get_all_uploadRequest(current_user):
     titles = []
     for title in uploadRequest_items:
         if title.content_type == 'movie':
-            movie = next((item for item in temp_movies if item["id"] == title.content_id), None)
+            movie = get_catalog_item('movies', title.content_id)
             if movie:
                 titles.append(movie)
             pass
         elif title.content_type == 'tv':
-            tv = next((item for item in temp_tv_series if item["id"] == title.content_id), None)
+            tv = get_catalog_item('tv_series', title.content_id)
             if tv:
                 titles.append(tv)
             pass
@@ -18,6 +18,15 @@ from api.utils import check_ffmpeg_available, setup_request_logging
 from utils.logger import log_info, log_success, log_warning, log_error, log_section, log_section_end
 from utils.logger import log_step, log_substep, log_data, Colors, log_fancy, log_banner, log_status
 from paths import CDN_FILES_DIR, CDN_POSTERS_DIR, DB_URI, DATA_ROOT
+from utils.catalog_bundle import schedule_bundle_refresh
+from utils.catalog_image import schedule_image_publish
+from utils.catalog_etag import bump_catalog_version
+from utils.catalog_journal import request_compaction, start_compactor, start_follower
+from utils.catalog_loader import catalog_status, is_catalog_ready, load_catalog_file, start_catalog_load
+from utils.image_index import image_exists
+from utils.seeded_sampling import SEED_HEADER
+from utils.cursors import NEXT_CURSOR_HEADER
+from utils.similarity import schedule_similarity_refresh
 
 # Show where data is being loaded from
 def _path_status(path):
@@ -129,7 +138,8 @@ log_section_end()
 log_section("FLASK APPLICATION")
 log_step("Initializing Flask app")
 app = Flask(__name__)
-CORS(app)
+# Let browser clients read the seed of a random page to request the next one
+CORS(app, expose_headers=[SEED_HEADER, NEXT_CURSOR_HEADER])
 app = setup_request_logging(app)
 app.config['SOCK_SERVER_OPTIONS'] = {'ping_interval': 25}
 sock = Sock(app)
@@ -156,6 +166,21 @@ ADMIN_ENDPOINT_PREFIXES = [
     '/api/admin/',
 ]
 
+# Endpoint prefixes that need the content catalog (503 while it is still loading)
+CATALOG_ENDPOINT_PREFIXES = [
+    '/cdn/',
+    '/api/cdn/',
+    '/api/mylist',
+    '/api/uploadRequest',
+    '/api/admin/import/',
+    '/api/admin/uploadRequests',
+]
+
+# Catalog-prefixed endpoints that work without the catalog
+CATALOG_INDEPENDENT_PREFIXES = [
+    '/cdn/images/',
+]
+
 @app.before_request
 def check_service_status():
     """
@@ -163,6 +188,7 @@ def check_service_status():
     
     - Admin endpoints remain accessible if allow_admin_access is True
     - Service status endpoint is always accessible
+    - Catalog endpoints return 503 until the content catalog is loaded
     - All other endpoints return 503 when service is disabled
     """
     path = request.path
@@ -172,6 +198,15 @@ def check_service_status():
         if path.startswith(endpoint):
             return None
     
+    # Catalog endpoints wait for the background catalog load
+    if not is_catalog_ready() and path.startswith(tuple(CATALOG_ENDPOINT_PREFIXES)) \
+            and not path.startswith(tuple(CATALOG_INDEPENDENT_PREFIXES)):
+        return jsonify({
+            'error': 'catalog_loading',
+            'message': 'The content catalog is still loading. Please try again shortly.',
+            'catalog_state': catalog_status()['state'],
+        }), 503, {'Retry-After': '5'}
+    
     # Check if service is enabled
     if is_service_enabled():
         return None
@@ -307,49 +342,6 @@ if missing_dirs or missing_files:
 log_success("CDN structure verified successfully")
 log_step("Loading content databases")
 
-def load_data(file_path, media_type):
-    """
-    Load data from JSON file and clean unwanted fields.
-    This function ensures that any watch_history or other unwanted fields
-    are removed from the data when loaded from disk.
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Clean unwanted fields and add required metadata
-        cleaned_count = 0
-        for item in tqdm(data, desc=f"Loading and cleaning {media_type} data"):
-            # Remove unwanted fields that shouldn't be in the main data files
-            fields_to_remove = ['watch_history', 'user_specific_data']
-            fields_removed = False
-            
-            for field in fields_to_remove:
-                if field in item:
-                    del item[field]
-                    fields_removed = True
-                    
-            if fields_removed:
-                cleaned_count += 1
-            
-            # Add required metadata
-            item['media_type'] = media_type
-            item['dir_type'] = 'cdn'
-        
-        if cleaned_count > 0:
-            log_warning(f"Cleaned {cleaned_count} items with unwanted fields from {file_path}")
-            
-        return data
-    except FileNotFoundError:
-        log_warning(f"File not found: {file_path} - returning empty list")
-        return []
-    except json.JSONDecodeError as e:
-        log_warning(f"Invalid JSON in {file_path}: {e} - returning empty list")
-        return []
-    except Exception as e:
-        log_warning(f"Error loading {file_path}: {e} - returning empty list")
-        return []
-
 def load_only_images_data(file_path, media_type):
     """
     Load data with images from JSON file and clean unwanted fields.
@@ -381,7 +373,7 @@ def load_only_images_data(file_path, media_type):
             # Check if images exist
             poster_path = item.get('poster_path', '').replace("/", "")
             backdrop_path = item.get('backdrop_path', '').replace("/", "")
-            if poster_path and os.path.exists(os.path.join(CDN_POSTERS_DIR, poster_path)) and backdrop_path and os.path.exists(os.path.join(CDN_POSTERS_DIR, backdrop_path)):
+            if image_exists(poster_path) and image_exists(backdrop_path):
                 all_items.append(item)
         
         if cleaned_count > 0:
@@ -398,37 +390,77 @@ def load_only_images_data(file_path, media_type):
         log_warning(f"Error loading {file_path}: {e} - returning empty list")
         return []
 
-# Loading content with better progress display
-movies = load_data(os.path.join(CDN_FILES_DIR, 'movies_little_clean.json'), 'movie')
-log_success(f"Movies catalog loaded: {Colors.BOLD}{len(movies):,}{Colors.RESET} titles")
+# The catalog is loaded in the background (utils/catalog_loader.py) so the server
+# can bind and answer health checks while it warms; catalog endpoints answer 503
+# until it is ready. The globals stay empty until install_catalogs() runs.
+movies = []
+tv_series = []
+movies_with_images = []
+tv_series_with_images = []
+
+all_items = []
+item_index = {}
+
+all_items_with_images = []
+item_index_with_images = {}
+
+def install_catalogs(catalogs, status):
+    """Publish the catalogs once the background loader has them (see start_catalog_load)."""
+    global movies, tv_series, movies_with_images, tv_series_with_images
 
-tv_series = load_data(os.path.join(CDN_FILES_DIR, 'tv_little_clean.json'), 'tv')
-log_success(f"TV catalog loaded: {Colors.BOLD}{len(tv_series):,}{Colors.RESET} titles")
+    if status['from_bundle']:
+        log_substep(f"Loaded from compiled bundle: {', '.join(status['from_bundle'])}")
+    if status['journaled_edits']:
+        log_substep(f"Replayed {status['journaled_edits']} journaled catalog edits")
 
-movies_with_images = load_data(os.path.join(CDN_FILES_DIR, 'movies_with_images.json'), 'movie')
-log_success(f"Movies with images loaded: {Colors.BOLD}{len(movies_with_images)}{Colors.RESET} titles")
+    movies = catalogs['movies']
+    log_success(f"Movies catalog loaded: {Colors.BOLD}{len(movies):,}{Colors.RESET} titles")
 
-tv_series_with_images = load_data(os.path.join(CDN_FILES_DIR, 'tv_with_images.json'), 'tv')
-log_success(f"TV shows with images loaded: {Colors.BOLD}{len(tv_series_with_images)}{Colors.RESET} titles")
+    tv_series = catalogs['tv_series']
+    log_success(f"TV catalog loaded: {Colors.BOLD}{len(tv_series):,}{Colors.RESET} titles")
 
-all_items = movies + tv_series
-item_index = {item['id']: index for index, item in enumerate(all_items)}
+    movies_with_images = catalogs['movies_with_images']
+    log_success(f"Movies with images loaded: {Colors.BOLD}{len(movies_with_images)}{Colors.RESET} titles")
 
-all_items_with_images = movies_with_images + tv_series_with_images
-item_index_with_images = {item['id']: index for index, item in enumerate(all_items)}
+    tv_series_with_images = catalogs['tv_series_with_images']
+    log_success(f"TV shows with images loaded: {Colors.BOLD}{len(tv_series_with_images)}{Colors.RESET} titles")
 
-log_success(f"Created content index with {Colors.BOLD}{len(item_index)}{Colors.RESET} items")
+    from utils.data_helpers import clear_data_cache
+    clear_data_cache()
+    rebuild_content_indexes(clear_cache=False)
+    log_success(f"Created content index with {Colors.BOLD}{len(item_index)}{Colors.RESET} items")
 
-def rebuild_content_indexes():
-    """Rebuild the search indexes after content data changes."""
+    # Build (or load) the /similar neighbor tables in the background
+    schedule_similarity_refresh(CDN_FILES_DIR, delay=0)
+
+    # Fold journaled single-item edits into the JSON files in the background
+    start_compactor(CDN_FILES_DIR, on_compacted=refresh_catalog_bundle)
+
+    # Share the encoded catalog with the other workers on this host
+    from utils.data_helpers import share_catalog_image
+    share_catalog_image(CDN_FILES_DIR)
+    # Apply the single-item edits the other workers journal
+    start_follower(CDN_FILES_DIR)
+    if status['journaled_edits']:
+        request_compaction()
+
+def rebuild_content_indexes(clear_cache=True):
+    """
+    Rebuild the search indexes after content data changes.
+
+    clear_cache=False is used after a journaled single-item edit: the catalog
+    snapshot was already updated incrementally and the JSON files are rewritten
+    by the journal compactor, so only the combined lists are refreshed here.
+    """
     global all_items, item_index, all_items_with_images, item_index_with_images
     
     # Clear data helpers cache when content is updated
-    try:
-        from utils.data_helpers import clear_data_cache
-        clear_data_cache()
-    except ImportError:
-        pass  # data_helpers might not be available during initial setup
+    if clear_cache:
+        try:
+            from utils.data_helpers import clear_data_cache
+            clear_data_cache()
+        except ImportError:
+            pass  # data_helpers might not be available during initial setup
     
     # Rebuild all_items and its index
     all_items = movies + tv_series
@@ -440,6 +472,30 @@ def rebuild_content_indexes():
     
     print(f"Rebuilt content indexes: {len(all_items)} total items, {len(all_items_with_images)} with images")
 
+    # New catalog version: ETags issued for the previous data no longer match
+    bump_catalog_version()
+
+    if not clear_cache:
+        return
+
+    # Fold pending journal edits into the JSON files now, so they are not
+    # replayed over this whole-catalog change at the next start
+    request_compaction()
+
+    # Recompile the catalog bundle from the updated JSON sources in the background
+    refresh_catalog_bundle()
+
+    # Hand the new catalog to the other workers
+    schedule_image_publish()
+
+def refresh_catalog_bundle():
+    """Recompile the catalog bundle (and the similarity store) in the background."""
+    schedule_bundle_refresh(CDN_FILES_DIR, load_catalog_file)
+    schedule_similarity_refresh(CDN_FILES_DIR)
+
+start_catalog_load(CDN_FILES_DIR, on_ready=install_catalogs)
+log_substep("Content catalog loading in the background")
+
 log_section_end()
 
 progresses = {}
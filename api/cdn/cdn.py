@@ -1,8 +1,9 @@
 from flask import Blueprint, jsonify, send_from_directory, request
-from utils.data_helpers import get_movies, get_tv_shows
+from utils.data_helpers import get_movies, get_tv_shows, get_catalog_snapshot
 from utils.fuzzy import fuzzy_filter_and_rank
 from paths import CDN_POSTERS_DIR
-import os
+from utils.catalog_etag import catalog_etag
+from utils.image_index import image_exists
 from utils.logger import log_error
 from api.utils import admin_token_required
 
@@ -22,37 +23,23 @@ def get_image(filename):
 
 @cdn_bp.route('/images/<path:filename>/check', methods=['GET'])
 def check_image(filename):
-    filepath = os.path.join(CDN_POSTERS_DIR, filename)
-    if os.path.exists(filepath) and os.path.isfile(filepath):
+    if image_exists(filename):
         return jsonify(exist=True, return_reason="check_image_found", url=filename)
     else:
         return jsonify(exist=False, return_reason="check_image_not_found", url=filename)
 
 @cdn_bp.route('/genres', methods=['GET'])
+@catalog_etag()
 def get_genres():
-    temp_movies = get_movies()
-    temp_tv_series = get_tv_shows()
-
     list_type = request.args.get('list_type', 'all', type=str)
 
-    if list_type == 'movies':
-        use_list = temp_movies
-    elif list_type == 'tv':
-        use_list = temp_tv_series
-    else:
-        use_list = temp_movies + temp_tv_series
-
-    genres = set()
-    for item in use_list:
-        if "genres" in item:
-            if isinstance(item['genres'], str):
-                genres.update([g.strip().lower() for g in item['genres'].split(',')])
-            elif isinstance(item['genres'], list):
-                genres.update([g['name'].lower() for g in item['genres'] if isinstance(g, dict) and 'name' in g])
-    return jsonify(sorted(genres))
+    # Genre lists are precomputed once per catalog snapshot version
+    genres = get_catalog_snapshot().genres
+    return jsonify(genres.get(list_type, genres['all']))
 
 @cdn_bp.route('/combined', methods=['GET'])
 @admin_token_required('moderator')
+@catalog_etag(cache=False)
 def get_combined_content(current_admin):
     page = request.args.get('page', 1, type=int)
     per_page = min(request.args.get('per_page', 15, type=int), 100)  # Limit max items per page
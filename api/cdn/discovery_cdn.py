@@ -1,202 +1,102 @@
-from flask import Blueprint, request, jsonify
-from cdn.utils import paginate, check_images_existence
-from utils.data_helpers import get_movies, get_tv_shows, get_movies_with_images, get_tv_shows_with_images
-import random
+from flask import Blueprint, request
+from cdn.utils import jsonify_items, with_next_cursor
+from utils.data_helpers import get_catalog_snapshot, get_ranked_view
+from utils.catalog_etag import catalog_etag
+from utils.catalog_rankings import RANK_TRENDING, RANK_FEATURED
+from utils.projection import resolve_fields
+from utils.cursors import RANKED_CURSOR, clamp_per_page, page_ranked, read_cursor
+from utils.seeded_sampling import SEED_HEADER, resolve_seed, sample_page
 
 discovery_cdn_bp = Blueprint('discovery_cdn_bp', __name__, url_prefix='/cdn')
 
 @discovery_cdn_bp.route('/discovery/random', methods=['GET'])
+@catalog_etag(random_arg=True)
 def get_cdn_discovery_random():
     """
     CDN Discovery endpoint that returns random content from both movies and TV shows
     This is a fallback when the main API is not available
     """
-    # Use safe getter functions to get cleaned data copies
-    temp_movies = get_movies()
-    temp_tv_series = get_tv_shows()
-    temp_movies_with_images = get_movies_with_images()
-    temp_tv_series_with_images = get_tv_shows_with_images()
-    
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 1, type=int)  # Default to 1 for banner
+    per_page = clamp_per_page(request.args.get('per_page', 1, type=int), default=1)  # Default to 1 for banner
     min_rating = request.args.get('min_rating', 0, type=float)
     max_rating = request.args.get('max_rating', 10, type=float)
     with_images = request.args.get('with_images', False, type=bool)
     content_type = request.args.get('content_type', '')  # 'movie', 'tv', or '' for both
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
+    seed = resolve_seed(request.args.get('seed', None, type=int))  # Same seed: next page of the same shuffle
     
     # Choose data source based on image requirements
-    if with_images:
-        temp_movies = temp_movies_with_images
-        temp_tv = temp_tv_series_with_images
-    else:
-        temp_movies = temp_movies
-        temp_tv = temp_tv_series
-    
-    # Apply content type filter
-    combined_content = []
-    if content_type == 'movie':
-        # Add media_type to all movies
-        combined_content = [dict(item, media_type='movie') for item in temp_movies]
-    elif content_type == 'tv':
-        # Add media_type to all TV shows
-        combined_content = [dict(item, media_type='tv') for item in temp_tv]
-    else:
-        # Combine both types
-        movies_with_type = [dict(item, media_type='movie') for item in temp_movies]
-        tv_with_type = [dict(item, media_type='tv') for item in temp_tv]
-        combined_content = movies_with_type + tv_with_type
-    
-    # Shuffle the combined content
-    shuffled_content = combined_content.copy()
-    random.shuffle(shuffled_content)
-    
-    def apply_filters(items):
-        """Apply rating filters to content items"""
-        results = []
-        for item in items:
-            vote_average = item.get('vote_average', 0)
-            if isinstance(vote_average, str):
-                try:
-                    vote_average = float(vote_average)
-                except ValueError:
-                    continue
-            if min_rating <= vote_average <= max_rating:
-                results.append(item)
-        return results
-    
-    # Apply filters
-    filtered_content = apply_filters(shuffled_content)
-    
-    # Paginate results
-    paginated_content = paginate(filtered_content, page, per_page)
-    
-    return jsonify(paginated_content)
+    suffix = '_with_images' if with_images else ''
+    
+    # Filter each list on its columnar index (rating filters), from one snapshot version
+    indexes = get_catalog_snapshot().indexes
+    sources = []
+    for name, media_type in (('movies', 'movie'), ('tv_series', 'tv')):
+        if content_type in ('movie', 'tv') and content_type != media_type:
+            continue
+        index = indexes[name + suffix]
+        sources.append((index.items, index.positions(min_rating=min_rating, max_rating=max_rating), media_type))
+    
+    # Draw only this page from a seeded permutation of the matching content
+    entries = sample_page(sources, page, per_page, seed)
+    
+    # Assembled from the items' cached JSON fragments, tagged with their media type
+    response = jsonify_items([item for item, _ in entries], [{'media_type': media_type} for _, media_type in entries], fields)
+    response.headers[SEED_HEADER] = str(seed)
+    return response
 
 @discovery_cdn_bp.route('/discovery/trending', methods=['GET'])
+@catalog_etag()
 def get_cdn_discovery_trending():
     """
     Get trending content from both movies and TV shows based on popularity
     CDN version without authentication
     """
-    # Use safe getter functions to get cleaned data copies
-    temp_movies = get_movies()
-    temp_tv_series = get_tv_shows()
-    temp_movies_with_images = get_movies_with_images()
-    temp_tv_series_with_images = get_tv_shows_with_images()
-    
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     with_images = request.args.get('with_images', False, type=bool)
     content_type = request.args.get('content_type', '')  # 'movie', 'tv', or '' for both
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     
-    # Choose data source based on image requirements
-    if with_images:
-        temp_movies = temp_movies_with_images
-        temp_tv = temp_tv_series_with_images
-    else:
-        temp_movies = temp_movies
-        temp_tv = temp_tv_series
-    
-    # Apply content type filter and add media_type
-    combined_content = []
-    if content_type == 'movie':
-        combined_content = [dict(item, media_type='movie') for item in temp_movies]
-    elif content_type == 'tv':
-        combined_content = [dict(item, media_type='tv') for item in temp_tv]
-    else:
-        # Combine both types
-        movies_with_type = [dict(item, media_type='movie') for item in temp_movies]
-        tv_with_type = [dict(item, media_type='tv') for item in temp_tv]
-        combined_content = movies_with_type + tv_with_type
-    
-    # Sort by popularity (assuming higher vote_average * vote_count indicates trending)
-    def get_popularity_score(item):
-        vote_average = item.get('vote_average', 0)
-        vote_count = item.get('vote_count', 0)
-        popularity = item.get('popularity', 0)
-        
-        # Use TMDB's popularity score if available, otherwise calculate
-        if popularity > 0:
-            return popularity
-        else:
-            return vote_average * vote_count if vote_average and vote_count else 0
+    # Ranked by TMDB popularity (or vote_average * vote_count), once per catalog version
+    ranking = get_ranked_view(RANK_TRENDING, content_type, with_images)
     
-    sorted_content = sorted(combined_content, key=get_popularity_score, reverse=True)
+    # Only the returned page is tagged, on the items' cached JSON fragments;
+    # ?cursor= (from X-Next-Cursor) resumes after the last entry of the previous page
+    entries, next_cursor = page_ranked(ranking, page, per_page, read_cursor(request.args, RANKED_CURSOR))
     
-    # Paginate results
-    paginated_content = paginate(sorted_content, page, per_page)
-    
-    return jsonify(paginated_content)
+    response = jsonify_items([item for item, _ in entries], [{'media_type': media_type} for _, media_type in entries], fields)
+    return with_next_cursor(response, next_cursor)
 
 @discovery_cdn_bp.route('/discovery/featured', methods=['GET'])
+@catalog_etag(random_arg=True)
 def get_cdn_discovery_featured():
     """
     Get featured content from both movies and TV shows
     Based on high ratings and popularity
     CDN version without authentication
     """
-    # Use safe getter functions to get cleaned data copies
-    temp_movies = get_movies()
-    temp_tv_series = get_tv_shows()
-    temp_movies_with_images = get_movies_with_images()
-    temp_tv_series_with_images = get_tv_shows_with_images()
-    
     # Get query parameters
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     with_images = request.args.get('with_images', False, type=bool)
     content_type = request.args.get('content_type', '')  # 'movie', 'tv', or '' for both
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     min_rating = request.args.get('min_rating', 7.0, type=float)  # Higher default for featured
+    seed = request.args.get('seed', None, type=int)  # Repeat a shuffle across pages
     
-    # Choose data source based on image requirements
-    if with_images:
-        temp_movies = temp_movies_with_images
-        temp_tv = temp_tv_series_with_images
-    else:
-        temp_movies = temp_movies
-        temp_tv = temp_tv_series
-    
-    # Apply content type filter and add media_type
-    combined_content = []
-    if content_type == 'movie':
-        combined_content = [dict(item, media_type='movie') for item in temp_movies]
-    elif content_type == 'tv':
-        combined_content = [dict(item, media_type='tv') for item in temp_tv]
-    else:
-        # Combine both types
-        movies_with_type = [dict(item, media_type='movie') for item in temp_movies]
-        tv_with_type = [dict(item, media_type='tv') for item in temp_tv]
-        combined_content = movies_with_type + tv_with_type
-    
-    # Filter for high-quality content
-    def is_featured_worthy(item):
-        vote_average = item.get('vote_average', 0)
-        vote_count = item.get('vote_count', 0)
-        
-        if isinstance(vote_average, str):
-            try:
-                vote_average = float(vote_average)
-            except ValueError:
-                return False
-        
-        # Must have good rating and sufficient votes
-        return vote_average >= min_rating and vote_count >= 100
-    
-    featured_content = [item for item in combined_content if is_featured_worthy(item)]
-    
-    # Sort by vote average descending
-    featured_content.sort(key=lambda x: x.get('vote_average', 0), reverse=True)
+    # Titles with at least 100 votes by vote average descending, once per catalog version;
+    # the ones rated >= min_rating are a prefix of the ranking
+    ranking = get_ranked_view(RANK_FEATURED, content_type, with_images)
+    featured_count = ranking.count_at_least(min_rating)
     
     # Add some randomness to avoid always showing the same content
-    if len(featured_content) > per_page * 2:
-        # Take top items but add some randomness
-        top_items = featured_content[:per_page * 2]
-        random.shuffle(top_items)
-        featured_content = top_items
-    
-    # Paginate results
-    paginated_content = paginate(featured_content, page, per_page)
+    if featured_count > per_page * 2:
+        # Take top items in a seeded random order
+        entries = ranking.shuffled_page(page, per_page, per_page * 2, seed)
+    else:
+        entries = ranking.page(page, per_page, limit=featured_count)
     
-    return jsonify(paginated_content)
+    return jsonify_items([item for item, _ in entries], [{'media_type': media_type} for _, media_type in entries], fields)
@@ -1,80 +1,66 @@
 from flask import Blueprint, jsonify, request, abort
-from cdn.utils import paginate, calculate_similarity, check_images_existence, filter_valid_genres
+from cdn.utils import paginate, paginate_positions, check_images_existence, jsonify_items, watch_history_extras, with_next_cursor
 from api.utils import token_required, serialize_watch_history
-from utils.data_helpers import get_movies, get_movies_with_images
-from utils.fuzzy import fuzzy_filter_and_rank
-import random
+from utils.data_helpers import get_movies, get_catalog_index, get_catalog_item, get_similar_items, get_text_index
+from utils.projection import resolve_fields
+from utils.cursors import clamp_per_page
+from utils.catalog_etag import catalog_etag
+from utils.seeded_sampling import SEED_HEADER, SeededPermutation, resolve_seed, sample_items
 import os
 import time
 
 movie_cdn_bp = Blueprint('movie_cdn_bp', __name__, url_prefix='/cdn')
 
-def _extract_year(movie):
-    date_str = movie.get('release_date', '') or ''
-    try:
-        return int(str(date_str)[:4])
-    except (ValueError, TypeError):
-        return None
-
 # Endpoint to get all movies with pagination
 @movie_cdn_bp.route('/movies', methods=['GET'])
 @token_required
+@catalog_etag()
 def get_movies_endpoint(current_user):
-    temp_movies = get_movies()
+    index = get_catalog_index('movies')
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     
-    paginated_movies = paginate(temp_movies, page, per_page)
+    # Keyset paging: ?cursor= (from X-Next-Cursor) resumes after the last title of the previous page
+    paginated_movies, next_cursor = paginate_positions(index, range(len(index)), page, per_page)
     
     # Add watch history if requested
-    if include_watch_history:
-        for movie in paginated_movies:
-            watch_history = serialize_watch_history(
-                content_id=movie['id'],
-                content_type='movie',
-                current_user=current_user,
-                include_next_episode=False
-            )
-            if watch_history:
-                movie['watch_history'] = watch_history
+    extras = watch_history_extras(paginated_movies, 'movie', current_user) if include_watch_history else None
     
-    return jsonify(paginated_movies)
+    return with_next_cursor(jsonify_items(paginated_movies, extras, fields), next_cursor)
 
 # Endpoint to search for movies by title
 @movie_cdn_bp.route('/movies/search', methods=['GET'])
 @token_required
+@catalog_etag()
 def search_movies(current_user):
     temp_movies = get_movies()
     query = request.args.get('q', '', type=str)
     max_results = request.args.get('max_results', 3, type=int)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     
-    result = fuzzy_filter_and_rank(query, temp_movies, lambda item: item.get('title', '')) if query else list(temp_movies)
-    limited_result = result[:max_results]
+    if query:
+        # Fuzzy ranking over the trigram index: only titles sharing enough trigrams are scored
+        index = get_text_index('movies')
+        limited_result = [index.items[position] for _, position in index.search(query, limit=max_results)]
+    else:
+        limited_result = temp_movies[:max_results]
     
     # Add watch history if requested
-    if include_watch_history:
-        for movie in limited_result:
-            watch_history = serialize_watch_history(
-                content_id=movie['id'],
-                content_type='movie',
-                current_user=current_user,
-                include_next_episode=False
-            )
-            if watch_history:
-                movie['watch_history'] = watch_history
+    extras = watch_history_extras(limited_result, 'movie', current_user) if include_watch_history else None
     
-    return jsonify(limited_result)
+    return jsonify_items(limited_result, extras, fields)
 
 # Endpoint to get a single movie by ID
 @movie_cdn_bp.route('/movies/<int:movie_id>')
 @token_required
+@catalog_etag(cache=False)
 def get_movie(current_user, movie_id):
-    temp_movies = get_movies()
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     
-    movie = next((item for item in temp_movies if item["id"] == movie_id), None)
+    movie = get_catalog_item('movies', movie_id)
     if not movie:
         return jsonify(message="The selected Movie not found!"), 404
     
@@ -87,117 +73,73 @@ def get_movie(current_user, movie_id):
             include_next_episode=False
         )
         if watch_history:
-            movie['watch_history'] = watch_history
+            movie = dict(movie, watch_history=watch_history)
     
     return jsonify(movie)
 
 # Endpoint to get a random movie with pagination
 @movie_cdn_bp.route('/movies/random', methods=['GET'])
 @token_required
+@catalog_etag(random_arg=True)
 def get__random_movie(current_user):
-    temp_movies = get_movies()
-    temp_movies_with_images = get_movies_with_images()
     func_start_time = time.time()
     
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     min_rating = request.args.get('min_rating', 0, type=float)
     max_rating = request.args.get('max_rating', 10, type=float)
     with_images = request.args.get('with_images', False, type=bool)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     genre = request.args.get('genre', '', type=str)
-    year = request.args.get('year', None, type=int)
-
-    movies_to_use = temp_movies
-    if with_images:
-        movies_to_use = temp_movies_with_images
-
-    shuffled_movies = movies_to_use.copy()
-    random.shuffle(shuffled_movies)
-
-    def apply_filters(items):
-        results = []
-        for item in items:
-            vote_average = item.get('vote_average', 0)
-            if isinstance(vote_average, str):
-                try:
-                    vote_average = float(vote_average)
-                except ValueError:
-                    continue
-            if not (min_rating <= vote_average <= max_rating):
-                continue
-            if genre and not filter_valid_genres(item, genre):
-                continue
-            if year is not None and _extract_year(item) != year:
-                continue
-            results.append(item)
-        return results
+    year = request.args.get('year', None, type=int)
+    seed = resolve_seed(request.args.get('seed', None, type=int))  # Same seed: next page of the same shuffle
 
-    movie_results = apply_filters(shuffled_movies)
+    # Filter on the columnar index, then draw only this page from a seeded permutation of the matches
+    index = get_catalog_index('movies_with_images' if with_images else 'movies')
+    positions = index.positions(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
     with_images_start_time = time.time()
-    paginated_movies = paginate(movie_results, page, per_page)
+    paginated_movies = sample_items(index.items, positions, page, per_page, seed)
     
     # Add watch history if requested
-    if include_watch_history:
-        for movie in paginated_movies:
-            watch_history = serialize_watch_history(
-                content_id=movie['id'],
-                content_type='movie',
-                current_user=current_user,
-                include_next_episode=False
-            )
-            if watch_history:
-                movie['watch_history'] = watch_history
+    extras = watch_history_extras(paginated_movies, 'movie', current_user) if include_watch_history else None
 
     end_time = time.time()
     
-    return jsonify(paginated_movies)
+    response = jsonify_items(paginated_movies, extras, fields)
+    response.headers[SEED_HEADER] = str(seed)
+    return response
 
 @movie_cdn_bp.route('/movies/<int:movie_id>/similar', methods=['GET'])
 @token_required
+@catalog_etag(random_arg='random')
 def get_similar_movies(current_user, movie_id):
-    temp_movies = get_movies()
-    temp_movies_with_images = get_movies_with_images()
-
     with_images = request.args.get('with_images', False, type=bool)
     is_random = request.args.get('random', False, type=bool)
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 12, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 12, type=int), default=12)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
+    seed = resolve_seed(request.args.get('seed', None, type=int))  # With random: same seed, same order
 
-    movies_to_use = temp_movies
-    if with_images:
-        movies_to_use = temp_movies_with_images
-
-    movie = next((item for item in movies_to_use if item["id"] == movie_id), None)
+    list_name = 'movies_with_images' if with_images else 'movies'
+    movie = get_catalog_item(list_name, movie_id)
     if not movie:
         return jsonify(message="The selected Movie not found!"), 404
     
-    similar_movies = []
-    for item in movies_to_use:
-        if item['id'] != movie_id:
-            similarity = calculate_similarity(movie, item)
-            if similarity > 0:
-                similar_movies.append((item, similarity))
-    
-    similar_movies = sorted(similar_movies, key=lambda x: x[1], reverse=True)
+    # Similar movies, most similar first: the precomputed top-K when the page
+    # falls within it, the whole ranking for later pages and shuffles
+    similar_movies = get_similar_items(list_name, movie_id, None if is_random else max(page, 1) * per_page)
 
     if is_random:
-        random.shuffle(similar_movies)
-
-    paginated_movies = paginate(similar_movies, page, per_page)
-    result = [item for item, _ in paginated_movies]
+        result = [similar_movies[i] for i in SeededPermutation(len(similar_movies), seed).page(page, per_page)]
+    else:
+        result = paginate(similar_movies, page, per_page)
     
     # Add watch history if requested
-    if include_watch_history:
-        for movie in result:
-            watch_history = serialize_watch_history(
-                content_id=movie['id'],
-                content_type='movie',
-                current_user=current_user,
-                include_next_episode=False
-            )
-            if watch_history:
-                movie['watch_history'] = watch_history
+    extras = watch_history_extras(result, 'movie', current_user) if include_watch_history else None
     
-    return jsonify(result)
+    response = jsonify_items(result, extras, fields)
+    if is_random:
+        response.headers[SEED_HEADER] = str(seed)
+    return response
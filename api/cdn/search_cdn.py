@@ -1,33 +1,60 @@
 from flask import Blueprint, jsonify, request
-from cdn.utils import filter_valid_genres, check_images_existence, paginate
+from cdn.utils import check_images_existence, paginate, with_next_cursor
 from api.utils import token_required, serialize_watch_history
-from utils.data_helpers import get_movies, get_tv_shows, get_movies_with_images, get_tv_shows_with_images
-from utils.fuzzy import fuzzy_filter_and_rank
+from api.cache import cdn_search_cache
+from utils.data_helpers import get_movies, get_tv_shows, get_catalog_index, get_catalog_snapshot, get_text_index, get_autocomplete_index
+from utils.catalog_etag import catalog_etag
+from utils.projection import project, resolve_fields
+from utils.cursors import SEARCH_CURSOR, clamp_per_page, encode_cursor, item_id, read_cursor, resume_position
+import bisect
 import random
 
 search_cdn_bp = Blueprint('search_cdn_bp', __name__, url_prefix='/cdn')
 
 @search_cdn_bp.route('/autocomplete', methods=['GET'])
+@catalog_etag()
 def autocomplete():
-    temp_movies = get_movies_with_images()
-    temp_tv_series = get_tv_shows_with_images()
     query = request.args.get('q', '', type=str)
     max_results = request.args.get('max_results', 10, type=int)
 
-    all_items = [
-        {"id": item['id'], "title": item['title']} for item in temp_movies
-    ] + [
-        {"id": item['id'], "name": item['name']} for item in temp_tv_series if isinstance(item.get('name'), str)
-    ]
+    # Titles with a word starting with the typed prefix, most popular first (utils/autocomplete.py)
+    index = get_autocomplete_index()
+    numbers = index.lookup(query, max_results)
+    suggestions = [index.suggestions[number] for number in numbers]
 
-    suggestions = fuzzy_filter_and_rank(
-        query,
-        all_items,
-        lambda item: item.get('title') or item.get('name') or '',
-    )[:max_results]
+    # Typo fallback: fill up with fuzzy matches only when the prefix matches too few titles
+    if len(suggestions) < max_results and query.strip():
+        shown = {id(index.items[number]) for number in numbers}
+        for item, suggestion in _fuzzy_suggestions(query, max_results):
+            if len(suggestions) == max_results:
+                break
+            if id(item) not in shown:
+                shown.add(id(item))
+                suggestions.append(suggestion)
 
     return jsonify(suggestions)
 
+def _fuzzy_suggestions(query, max_results):
+    """
+    Best fuzzy matches of the query among the titles with images, as (item, suggestion).
+
+    Ranked over the trigram indexes: only titles sharing enough trigrams with
+    the query are scored. Ties list movies first, then TV series, so the best
+    max_results of each list hold the best max_results overall.
+    """
+    matches = []
+    for list_no, name in enumerate(('movies_with_images', 'tv_series_with_images')):
+        index = get_text_index(name)
+        matches.extend((score, list_no, index.items[position])
+                       for score, position in index.search(query, limit=max_results))
+    matches.sort(key=lambda match: -match[0])
+
+    return [
+        (item, {"id": item['id'], "title": item['title']} if list_no == 0 else {"id": item['id'], "name": item['name']})
+        for _, list_no, item in matches
+        if list_no == 0 or isinstance(item.get('name'), str)
+    ]
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -45,83 +72,132 @@ def _extract_year(item, item_type):
 # Common search functionality extracted to a helper function
 def _perform_search(query, genre, min_rating, max_rating, media_type, is_random,
                     with_images, page, per_page, year=None, fuzzy=False,
-                    fuzzy_threshold=0.25):
-    temp_movies = get_movies()
-    temp_tv_series = get_tv_shows()
-
-    def apply_filters(items, item_type):
-        results = []
-        for item in items:
-            title_or_name = item.get('title' if item_type == 'movie' else 'name', '')
-            vote_average = item.get('vote_average', 0)
-            if isinstance(vote_average, str):
-                try:
-                    vote_average = float(vote_average)
-                except ValueError:
-                    continue
-            # Year facet
-            if year is not None:
-                item_year = _extract_year(item, item_type)
-                if item_year != year:
-                    continue
-            # Rating facet
-            if not (min_rating <= vote_average <= max_rating):
-                continue
-            # Genre facet
-            if genre and not filter_valid_genres(item, genre):
-                continue
-            item['type'] = item_type
-            results.append(item)
-        return results
-
-    temp_movies_search = temp_movies
-    temp_tv_series_search = temp_tv_series
-
-    if with_images:
-        temp_movies_search = get_movies_with_images()
-        temp_tv_series_search = get_tv_shows_with_images()
-
+                    fuzzy_threshold=0.25, fields=None):
     if media_type == 'movies':
-        final_results = apply_filters(temp_movies_search, 'movie')
+        catalogs = [('movies', 'movie')]
     elif media_type == 'tv':
-        final_results = apply_filters(temp_tv_series_search, 'tv_series')
+        catalogs = [('tv_series', 'tv_series')]
     else:
-        final_results = (
-            apply_filters(temp_movies_search, 'movie') +
-            apply_filters(temp_tv_series_search, 'tv_series')
-        )
+        catalogs = [('movies', 'movie'), ('tv_series', 'tv_series')]
+    fuzzy = bool(query and fuzzy)
 
-    # Text matching — fuzzy or exact substring
-    if query:
+    # The full ranking of a query is cached per snapshot version; every page
+    # (and every shuffle) of a repeated search is cut from it
+    snapshot = get_catalog_snapshot()
+    key = (
+        query.strip().lower() if fuzzy else query.lower(),
+        genre, min_rating, max_rating, year,
+        fuzzy_threshold if fuzzy else None,
+        tuple(catalog for catalog, _ in catalogs),
+        bool(with_images),
+    )
+    ranking = cdn_search_cache.get(key, snapshot.version)
+    if ranking is None:
+        ranking = _rank_search(snapshot, catalogs, query, genre, min_rating, max_rating,
+                               with_images, year, fuzzy, fuzzy_threshold)
+        cdn_search_cache.set(key, snapshot.version, *ranking)
+    items, kinds = ranking
+
+    order = range(len(items))
+    if is_random:
+        order = list(order)
+        random.shuffle(order)
+
+    # Catalog items are read-only: project and tag only the returned page with its type
+    item_types = [item_type for _, item_type in catalogs]
+    return [dict(project(items[n], fields), type=item_types[kinds[n]]) for n in paginate(order, page, per_page)]
+
+def _rank_search(snapshot, catalogs, query, genre, min_rating, max_rating, with_images,
+                 year, fuzzy, fuzzy_threshold):
+    """
+    Rank the titles of a search in one snapshot.
+
+    Returns:
+        tuple: (matching items in rank order, bytes with the catalogs index of each item)
+    """
+    ranked = []
+    matches = []
+    for list_no, (catalog, _) in enumerate(catalogs):
+        name = f'{catalog}_with_images' if with_images else catalog
+        # Year, rating and genre facets are evaluated on the columnar index
+        index = snapshot.indexes[name]
+        positions = index.positions(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
         if fuzzy:
-            final_results = fuzzy_filter_and_rank(
-                query,
-                final_results,
-                text_getter=lambda item: item.get('title') or item.get('name') or '',
-                threshold=fuzzy_threshold,
-            )
+            # Fuzzy ranking over the trigram index, limited to the filtered titles
+            text_index = snapshot.text_index(name)
+            matches.extend((score, list_no, text_index.items[position])
+                           for score, position in text_index.search(query, fuzzy_threshold, positions))
         else:
-            q_lower = query.lower()
-            final_results = [
-                item for item in final_results
-                if q_lower in (item.get('title') or item.get('name') or '').lower()
-            ]
+            ranked.extend((list_no, index.items[position]) for position in positions)
 
-    if is_random:
-        random.shuffle(final_results)
+    # Text matching — fuzzy or exact substring
+    if fuzzy:
+        # Best score first; ties keep movies first, each in catalog order
+        matches.sort(key=lambda match: -match[0])
+        ranked = [(list_no, item) for _, list_no, item in matches]
+    elif query:
+        q_lower = query.lower()
+        ranked = [
+            (list_no, item) for list_no, item in ranked
+            if q_lower in (item.get('title') or item.get('name') or '').lower()
+        ]
+
+    return tuple(item for _, item in ranked), bytes(list_no for list_no, _ in ranked)
+
+def _search_page(query, genre, min_rating, max_rating, media_type, with_images,
+                 page, per_page, year=None, fields=None):
+    """
+    Catalog-order search (exact substring or no query), paged by keyset.
+
+    Matches are listed movies first, then TV series, each in catalog order, so
+    a cursor (list, position, id) from X-Next-Cursor skips straight to the
+    first title after the previous page. Matching stops as soon as the page and
+    one more match (for the next cursor) are found.
+
+    Returns:
+        tuple: (page of results, cursor of the next page or None)
+    """
+    cursor = read_cursor(request.args, SEARCH_CURSOR)
+    q_lower = query.lower()
+    skip = 0 if cursor is not None else max(page - 1, 0) * per_page
+    page_entries, last = [], None
+
+    for list_no, (catalog, item_type) in enumerate((('movies', 'movie'), ('tv_series', 'tv_series'))):
+        if media_type == 'movies' and item_type != 'movie' or media_type == 'tv' and item_type == 'movie':
+            continue
+        if cursor is not None and list_no < cursor[0]:
+            continue
+        # Year, rating and genre facets are evaluated on the columnar index
+        index = get_catalog_index(f'{catalog}_with_images' if with_images else catalog)
+        positions = index.positions(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
+        if cursor is not None and list_no == cursor[0]:
+            positions = positions[bisect.bisect_left(positions, resume_position(index, cursor[1], cursor[2])):]
+
+        for position in positions:
+            item = index.items[position]
+            if q_lower and q_lower not in (item.get('title') or item.get('name') or '').lower():
+                continue
+            if skip:
+                skip -= 1
+                continue
+            if len(page_entries) == per_page:
+                results = [dict(project(entry, fields), type=entry_type) for entry_type, entry in page_entries]
+                return results, encode_cursor(last[0], last[1], item_id(page_entries[-1][1]))
+            page_entries.append((item_type, item))
+            last = (list_no, position)
 
-    return paginate(final_results, page, per_page)
+    return [dict(project(entry, fields), type=entry_type) for entry_type, entry in page_entries], None
 
 # _perform_search_with_images is now handled by passing with_images=True to _perform_search
 # Kept as a thin alias for backwards compatibility.
 def _perform_search_with_images(query, genre, min_rating, max_rating, media_type, is_random,
                                 with_images, page, per_page, year=None, fuzzy=False,
-                                fuzzy_threshold=0.25):
+                                fuzzy_threshold=0.25, fields=None):
     return _perform_search(
         query=query, genre=genre, min_rating=min_rating, max_rating=max_rating,
         media_type=media_type, is_random=is_random, with_images=with_images,
         page=page, per_page=per_page, year=year, fuzzy=fuzzy,
-        fuzzy_threshold=fuzzy_threshold,
+        fuzzy_threshold=fuzzy_threshold, fields=fields,
     )
 
 # ---------------------------------------------------------------------------
@@ -129,6 +205,7 @@ def _perform_search_with_images(query, genre, min_rating, max_rating, media_type
 # ---------------------------------------------------------------------------
 
 @search_cdn_bp.route('/facets', methods=['GET'])
+@catalog_etag()
 def get_facets():
     """Return available filter facets: distinct genres and min/max release year."""
     movies = get_movies()
@@ -172,9 +249,10 @@ def _collect_genres(item, genre_set: set):
 
 # Public search endpoint that doesn't require authentication
 @search_cdn_bp.route('/search', methods=['GET'])
+@catalog_etag(random_arg='random', seeded=False)
 def public_search():
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     query = request.args.get('q', '', type=str)
     genre = request.args.get('genre', '', type=str)
     min_rating = request.args.get('min_rating', 0, type=float)
@@ -185,30 +263,52 @@ def public_search():
     year = request.args.get('year', None, type=int)
     fuzzy = request.args.get('fuzzy', False, type=bool)
     fuzzy_threshold = request.args.get('fuzzy_threshold', 0.25, type=float)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
 
-    limited_results = _perform_search(
-        query=query,
-        genre=genre,
-        min_rating=min_rating,
-        max_rating=max_rating,
-        media_type=media_type,
-        is_random=is_random,
-        with_images=with_images,
-        page=page,
-        per_page=per_page,
-        year=year,
-        fuzzy=fuzzy,
-        fuzzy_threshold=fuzzy_threshold,
-    )
+    if is_random or (fuzzy and query):
+        # Shuffled and fuzzy-ranked results are paged by offset from one ranking kept in
+        # cdn_search_cache per query and catalog version
+        limited_results = _perform_search(
+            query=query,
+            genre=genre,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            media_type=media_type,
+            is_random=is_random,
+            with_images=with_images,
+            page=page,
+            per_page=per_page,
+            year=year,
+            fuzzy=fuzzy,
+            fuzzy_threshold=fuzzy_threshold,
+            fields=fields,
+        )
+        next_cursor = None
+    else:
+        # Catalog-order results are paged by keyset: the scan resumes at the cursor and
+        # stops one match past the page, so there is no ranking to cache
+        limited_results, next_cursor = _search_page(
+            query=query,
+            genre=genre,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            media_type=media_type,
+            with_images=with_images,
+            page=page,
+            per_page=per_page,
+            year=year,
+            fields=fields,
+        )
 
-    return jsonify(limited_results)
+    return with_next_cursor(jsonify(limited_results), next_cursor)
 
 # Authenticated search endpoint that can include watch history
 @search_cdn_bp.route('/auth-search', methods=['GET'])
 @token_required
+@catalog_etag(random_arg='random', seeded=False, watch_history_default=True)
 def authenticated_search(current_user):
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     query = request.args.get('q', '', type=str)
     genre = request.args.get('genre', '', type=str)
     min_rating = request.args.get('min_rating', 0, type=float)
@@ -220,21 +320,42 @@ def authenticated_search(current_user):
     year = request.args.get('year', None, type=int)
     fuzzy = request.args.get('fuzzy', False, type=bool)
     fuzzy_threshold = request.args.get('fuzzy_threshold', 0.25, type=float)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
 
-    limited_results = _perform_search(
-        query=query,
-        genre=genre,
-        min_rating=min_rating,
-        max_rating=max_rating,
-        media_type=media_type,
-        is_random=is_random,
-        with_images=with_images,
-        page=page,
-        per_page=per_page,
-        year=year,
-        fuzzy=fuzzy,
-        fuzzy_threshold=fuzzy_threshold,
-    )
+    if is_random or (fuzzy and query):
+        # Shuffled and fuzzy-ranked results are paged by offset from one ranking kept in
+        # cdn_search_cache per query and catalog version
+        limited_results = _perform_search(
+            query=query,
+            genre=genre,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            media_type=media_type,
+            is_random=is_random,
+            with_images=with_images,
+            page=page,
+            per_page=per_page,
+            year=year,
+            fuzzy=fuzzy,
+            fuzzy_threshold=fuzzy_threshold,
+            fields=fields,
+        )
+        next_cursor = None
+    else:
+        # Catalog-order results are paged by keyset: the scan resumes at the cursor and
+        # stops one match past the page, so there is no ranking to cache
+        limited_results, next_cursor = _search_page(
+            query=query,
+            genre=genre,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            media_type=media_type,
+            with_images=with_images,
+            page=page,
+            per_page=per_page,
+            year=year,
+            fields=fields,
+        )
     
     # Add watch history if requested (only available in authenticated search)
     if include_watch_history:
@@ -249,4 +370,4 @@ def authenticated_search(current_user):
             if watch_history:
                 item['watch_history'] = watch_history
     
-    return jsonify(limited_results)
+    return with_next_cursor(jsonify(limited_results), next_cursor)
@@ -1,78 +1,64 @@
 from flask import Blueprint, jsonify, request, abort
-from cdn.utils import paginate, calculate_similarity, check_images_existence, filter_valid_genres
+from cdn.utils import paginate, paginate_positions, check_images_existence, jsonify_items, watch_history_extras, with_next_cursor
 from api.utils import token_required, serialize_watch_history
-from utils.data_helpers import get_tv_shows, get_tv_shows_with_images
-from utils.fuzzy import fuzzy_filter_and_rank
-import random
+from utils.data_helpers import get_tv_shows, get_catalog_index, get_catalog_item, get_similar_items, get_text_index
+from utils.projection import resolve_fields
+from utils.cursors import clamp_per_page
+from utils.catalog_etag import catalog_etag
+from utils.seeded_sampling import SEED_HEADER, SeededPermutation, resolve_seed, sample_items
 
 tv_cdn_bp = Blueprint('tv_cdn_bp', __name__, url_prefix='/cdn')
 
-def _extract_year(show):
-    date_str = show.get('first_air_date', '') or ''
-    try:
-        return int(str(date_str)[:4])
-    except (ValueError, TypeError):
-        return None
-
 # Endpoint to get all TV series with pagination
 @tv_cdn_bp.route('/tv', methods=['GET'])
 @token_required
+@catalog_etag()
 def get_tv_series(current_user):
-    temp_tv_series = get_tv_shows()
+    index = get_catalog_index('tv_series')
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     
-    paginated_tv_series = paginate(temp_tv_series, page, per_page)
+    # Keyset paging: ?cursor= (from X-Next-Cursor) resumes after the last title of the previous page
+    paginated_tv_series, next_cursor = paginate_positions(index, range(len(index)), page, per_page)
     
     # Add watch history if requested
-    if include_watch_history:
-        for show in paginated_tv_series:
-            watch_history = serialize_watch_history(
-                content_id=show['id'],
-                content_type='tv',
-                current_user=current_user,
-                include_next_episode=True
-            )
-            if watch_history:
-                show['watch_history'] = watch_history
-    
-    return jsonify(paginated_tv_series)
+    extras = watch_history_extras(paginated_tv_series, 'tv', current_user, include_next_episode=True) if include_watch_history else None
+    
+    return with_next_cursor(jsonify_items(paginated_tv_series, extras, fields), next_cursor)
 
 # Endpoint to search for TV series by title
 @tv_cdn_bp.route('/tv/search', methods=['GET'])
 @token_required
+@catalog_etag()
 def search_tv_series(current_user):
     temp_tv_series = get_tv_shows()
     query = request.args.get('q', '', type=str)
     max_results = request.args.get('max_results', 3, type=int)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     
-    result = fuzzy_filter_and_rank(query, temp_tv_series, lambda item: item.get('name', '')) if query else list(temp_tv_series)
-    limited_result = result[:max_results]
+    if query:
+        # Fuzzy ranking over the trigram index: only titles sharing enough trigrams are scored
+        index = get_text_index('tv_series')
+        limited_result = [index.items[position] for _, position in index.search(query, limit=max_results)]
+    else:
+        limited_result = temp_tv_series[:max_results]
     
     # Add watch history if requested
-    if include_watch_history:
-        for show in limited_result:
-            watch_history = serialize_watch_history(
-                content_id=show['id'],
-                content_type='tv',
-                current_user=current_user,
-                include_next_episode=True
-            )
-            if watch_history:
-                show['watch_history'] = watch_history
-    
-    return jsonify(limited_result)
+    extras = watch_history_extras(limited_result, 'tv', current_user, include_next_episode=True) if include_watch_history else None
+    
+    return jsonify_items(limited_result, extras, fields)
 
 # Endpoint to get a single TV series by ID
 @tv_cdn_bp.route('/tv/<int:tv_id>')
 @token_required
+@catalog_etag(cache=False)
 def get_tv(current_user, tv_id):
-    temp_tv_series = get_tv_shows()
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
     
-    tv = next((item for item in temp_tv_series if item["id"] == tv_id), None)
+    tv = get_catalog_item('tv_series', tv_id)
     if not tv:
         return jsonify(message="The selected Show not found!"), 404
     
@@ -85,114 +71,69 @@ def get_tv(current_user, tv_id):
             include_next_episode=True
         )
         if watch_history:
-            tv['watch_history'] = watch_history
+            tv = dict(tv, watch_history=watch_history)
     
     return jsonify(tv)
 
 # Endpoint to get random TV shows with pagination
 @tv_cdn_bp.route('/tv/random', methods=['GET'])
 @token_required
+@catalog_etag(random_arg=True)
 def get_random_tv(current_user):
-    temp_tv_series = get_tv_shows()
-    temp_tv_series_with_images = get_tv_shows_with_images()
-    
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 20, type=int))
     min_rating = request.args.get('min_rating', 0, type=float)
     max_rating = request.args.get('max_rating', 10, type=float)
     with_images = request.args.get('with_images', False, type=bool)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
     genre = request.args.get('genre', '', type=str)
-    year = request.args.get('year', None, type=int)
-    
-    temp_shows = temp_tv_series
-    if with_images:
-        temp_shows = temp_tv_series_with_images
-    
-    shuffled_tv = temp_shows.copy()
-    random.shuffle(shuffled_tv)
-    
-    def apply_filters(items):
-        results = []
-        for item in items:
-            vote_average = item.get('vote_average', 0)
-            if isinstance(vote_average, str):
-                try:
-                    vote_average = float(vote_average)
-                except ValueError:
-                    continue
-            if not (min_rating <= vote_average <= max_rating):
-                continue
-            if genre and not filter_valid_genres(item, genre):
-                continue
-            if year is not None and _extract_year(item) != year:
-                continue
-            results.append(item)
-        return results
-    
-    tv_results = apply_filters(shuffled_tv)
-    
-    paginated_tv_series = paginate(tv_results, page, per_page)
+    year = request.args.get('year', None, type=int)
+    seed = resolve_seed(request.args.get('seed', None, type=int))  # Same seed: next page of the same shuffle
+    
+    # Filter on the columnar index, then draw only this page from a seeded permutation of the matches
+    index = get_catalog_index('tv_series_with_images' if with_images else 'tv_series')
+    positions = index.positions(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
+    
+    paginated_tv_series = sample_items(index.items, positions, page, per_page, seed)
     
     # Add watch history if requested
-    if include_watch_history:
-        for show in paginated_tv_series:
-            watch_history = serialize_watch_history(
-                content_id=show['id'],
-                content_type='tv',
-                current_user=current_user,
-                include_next_episode=True
-            )
-            if watch_history:
-                show['watch_history'] = watch_history
-    
-    return jsonify(paginated_tv_series)
+    extras = watch_history_extras(paginated_tv_series, 'tv', current_user, include_next_episode=True) if include_watch_history else None
+    
+    response = jsonify_items(paginated_tv_series, extras, fields)
+    response.headers[SEED_HEADER] = str(seed)
+    return response
 
 @tv_cdn_bp.route('/tv/<int:tv_id>/similar', methods=['GET'])
 @token_required
+@catalog_etag(random_arg='random')
 def get_similar_tv_series(current_user, tv_id):
-    temp_tv_series = get_tv_shows()
-    temp_tv_series_with_images = get_tv_shows_with_images()
-    
     with_images = request.args.get('with_images', False, type=bool)
     is_random = request.args.get('random', False, type=bool)
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 12, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', 12, type=int), default=12)
     include_watch_history = request.args.get('include_watch_history', False, type=bool)
+    fields = resolve_fields(request.args)  # view=card|detail or fields=a,b,c
+    seed = resolve_seed(request.args.get('seed', None, type=int))  # With random: same seed, same order
     
-    temp_shows = temp_tv_series
-    if with_images:
-        temp_shows = temp_tv_series_with_images
-    
-    tv = next((item for item in temp_shows if item["id"] == tv_id), None)
+    list_name = 'tv_series_with_images' if with_images else 'tv_series'
+    tv = get_catalog_item(list_name, tv_id)
     if not tv:
         return jsonify(message="The selected Show not found!"), 404
     
-    similar_tv = []
-    for item in temp_shows:
-        if item['id'] != tv_id:
-            similarity = calculate_similarity(tv, item)
-            if similarity > 0:
-                similar_tv.append((item, similarity))
-    
-    similar_tv = sorted(similar_tv, key=lambda x: x[1], reverse=True)
+    # Similar shows, most similar first: the precomputed top-K when the page
+    # falls within it, the whole ranking for later pages and shuffles
+    similar_tv = get_similar_items(list_name, tv_id, None if is_random else max(page, 1) * per_page)
     
     if is_random:
-        random.shuffle(similar_tv)
-    
-    paginated_shows = paginate(similar_tv, page, per_page)
-    result = [item for item, _ in paginated_shows]
+        result = [similar_tv[i] for i in SeededPermutation(len(similar_tv), seed).page(page, per_page)]
+    else:
+        result = paginate(similar_tv, page, per_page)
     
     # Add watch history if requested
-    if include_watch_history:
-        for show in result:
-            watch_history = serialize_watch_history(
-                content_id=show['id'],
-                content_type='tv',
-                current_user=current_user,
-                include_next_episode=True
-            )
-            if watch_history:
-                show['watch_history'] = watch_history
-    
-    return jsonify(result)
+    extras = watch_history_extras(result, 'tv', current_user, include_next_episode=True) if include_watch_history else None
+    
+    response = jsonify_items(result, extras, fields)
+    if is_random:
+        response.headers[SEED_HEADER] = str(seed)
+    return response
@@ -1,5 +1,8 @@
-import os
-from paths import CDN_POSTERS_DIR
+from flask import current_app, request
+from api.utils import serialize_watch_history
+from utils.cursors import NEXT_CURSOR_HEADER, POSITION_CURSOR, page_positions, read_cursor
+from utils.data_helpers import encode_catalog_items
+from utils.image_index import image_exists
 
 def paginate(data, page, per_page):
     start = (page - 1) * per_page
@@ -7,6 +10,55 @@ def paginate(data, page, per_page):
     return data[start:end]
 
 
+def paginate_positions(index, positions, page, per_page):
+    """
+    One page of an indexed catalog list, by ?cursor= when given, else by page.
+
+    Args:
+        index (ColumnarIndex): Index of the list
+        positions (list|range): Ascending positions of the matching items
+        page (int): Page number
+        per_page (int): Page size
+
+    Returns:
+        tuple: (items of the page, cursor of the next page or None)
+    """
+    selected, next_cursor = page_positions(index, positions, page, per_page, read_cursor(request.args, POSITION_CURSOR))
+    return [index.items[position] for position in selected], next_cursor
+
+
+def with_next_cursor(response, next_cursor):
+    """Send the next page's cursor with a list response (nothing on the last page)."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+def jsonify_items(items, extras=None, fields=None):
+    """
+    JSON response for a page of catalog items, assembled from cached per-item fragments.
+
+    extras is an optional list of per-item fields to add and fields an optional
+    projection of the items (see encode_catalog_items).
+    """
+    return current_app.response_class(f'{encode_catalog_items(items, extras, fields)}\n',
+                                      mimetype=current_app.json.mimetype)
+
+
+def watch_history_extras(items, content_type, current_user, include_next_episode=False):
+    """Per-item {'watch_history': ...} fields for jsonify_items ({} when there is none)."""
+    extras = []
+    for item in items:
+        watch_history = serialize_watch_history(
+            content_id=item['id'],
+            content_type=content_type,
+            current_user=current_user,
+            include_next_episode=include_next_episode
+        )
+        extras.append({'watch_history': watch_history} if watch_history else {})
+    return extras
+
+
 def calculate_similarity(item1, item2):
     def get_genres_sim(item):
         genres = item.get('genres', '')
@@ -47,8 +99,9 @@ def check_images_existence(item):
         backdrop_path = backdrop_path.replace("/", "")
 
     if all(path is not None for path in [poster_path, backdrop_path]):
-        # if os.path.exists(os.path.join(CDN_POSTERS_DIR, poster_path)) and os.path.exists(os.path.join(CDN_POSTERS_DIR, backdrop_path)):
-        if os.path.exists(os.path.join(CDN_POSTERS_DIR, backdrop_path)):
+        # if image_exists(poster_path) and image_exists(backdrop_path):
+        # Set lookup in the scanned posters directory (see utils/image_index.py)
+        if image_exists(backdrop_path):
             return True
     return False
 
@@ -0,0 +1,74 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.autocomplete import AUTOCOMPLETE_TOP_N, AutocompleteIndex, normalize_prefix
+from utils.catalog import build_snapshot
+
+WORDS = ['the', 'dark', 'darkman', 'knight', 'rises', 'city', 'star', 'wars', 'stargate', 'lost', 'up']
+
+
+def make_entries(count, seed=11):
+    rng = random.Random(seed)
+    entries = []
+    for item_id in range(count):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        if item_id % 3:
+            entries.append(({'id': item_id, 'title': title}, 'movie'))
+        else:
+            entries.append(({'id': item_id, 'name': title}, 'tv'))
+    return entries
+
+
+def brute_force(entries, prefix, limit):
+    prefix = normalize_prefix(prefix)
+    matches = []
+    for item, _ in entries:
+        words = (item.get('title') or item.get('name')).lower().split()
+        if any(' '.join(words[start:]).startswith(prefix) for start in range(len(words))):
+            matches.append(item['id'])
+    return matches[:limit]
+
+
+class AutocompleteIndexTests(unittest.TestCase):
+    def test_lookup_matches_a_scan_in_popularity_order(self):
+        entries = make_entries(500)
+        index = AutocompleteIndex(entries)
+
+        for prefix in ('', 'd', 'dar', 'dark', 'dark ', 'DARK  KN', 'star', 'stargate t', 'kni', 'x', 'up'):
+            for limit in (1, 10, AUTOCOMPLETE_TOP_N, 50):
+                with self.subTest(prefix=prefix, limit=limit):
+                    found = [index.suggestions[number]['id'] for number in index.lookup(prefix, limit)]
+                    self.assertEqual(found, brute_force(entries, prefix, limit))
+
+        self.assertIn('dar', index.tops)
+        self.assertEqual(index.lookup('dark', 0), [])
+
+    def test_suggestions_keep_the_title_field_of_their_type(self):
+        index = AutocompleteIndex([
+            ({'id': 1, 'title': 'Heat'}, 'movie'),
+            ({'id': 2, 'name': 'Heartland'}, 'tv'),
+            ({'id': 3, 'name': None}, 'tv'),
+        ])
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual([index.suggestions[n] for n in index.lookup('hea')],
+                         [{'id': 1, 'title': 'Heat'}, {'id': 2, 'name': 'Heartland'}])
+
+    def test_snapshot_orders_titles_by_trending(self):
+        movies = [{'id': 1, 'title': 'Dark City', 'popularity': 5.0, 'poster_path': '/p', 'backdrop_path': '/b'},
+                  {'id': 2, 'title': 'The Dark Knight', 'popularity': 50.0, 'poster_path': '/p', 'backdrop_path': '/b'}]
+        tv = [{'id': 3, 'name': 'Dark', 'popularity': 20.0, 'poster_path': '/p', 'backdrop_path': '/b'}]
+        snapshot = build_snapshot(movies, tv, movies, tv)
+        index = snapshot.autocomplete()
+
+        self.assertIs(snapshot.autocomplete(), index)
+        self.assertEqual([index.suggestions[n]['id'] for n in index.lookup('dark')], [2, 3, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import catalog_bundle
+from utils.catalog_bundle import CATALOG_SOURCES, bundle_path, load_catalogs, read_bundle
+
+
+class CatalogBundleTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files_dir = self.tmp.name
+        self.loaded = []
+        for index, (_, filename, _) in enumerate(CATALOG_SOURCES):
+            self.write_source(filename, [{'id': index + 1, 'title': filename}])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_source(self, filename, items):
+        with open(os.path.join(self.files_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+
+    def json_loader(self, path, media_type):
+        self.loaded.append(os.path.basename(path))
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for item in data:
+            item['media_type'] = media_type
+        return data
+
+    def test_first_boot_parses_json_and_writes_bundle(self):
+        catalogs, from_bundle = load_catalogs(self.files_dir, self.json_loader)
+
+        self.assertEqual(from_bundle, [])
+        self.assertEqual(len(self.loaded), len(CATALOG_SOURCES))
+        self.assertTrue(os.path.exists(bundle_path(self.files_dir)))
+        self.assertEqual(catalogs['movies'][0]['media_type'], 'movie')
+
+    def test_second_boot_reads_bundle_only(self):
+        first, _ = load_catalogs(self.files_dir, self.json_loader)
+        self.loaded.clear()
+
+        second, from_bundle = load_catalogs(self.files_dir, self.json_loader)
+
+        self.assertEqual(self.loaded, [])
+        self.assertEqual(sorted(from_bundle), sorted(name for name, _, _ in CATALOG_SOURCES))
+        self.assertEqual(second, first)
+
+    def test_with_images_items_are_shared_with_main_catalog(self):
+        self.write_source('movies_little_clean.json', [{'id': 1, 'title': 'Heat'}, {'id': 2, 'title': 'Ronin'}])
+        self.write_source('movies_with_images.json', [{'id': 2, 'title': 'Ronin'}])
+        load_catalogs(self.files_dir, self.json_loader)
+
+        catalogs, _ = load_catalogs(self.files_dir, self.json_loader)
+
+        self.assertIs(catalogs['movies_with_images'][0], catalogs['movies'][1])
+
+    def test_changed_source_is_reparsed(self):
+        load_catalogs(self.files_dir, self.json_loader)
+        self.loaded.clear()
+        self.write_source('tv_little_clean.json', [{'id': 99, 'name': 'Dark'}, {'id': 100, 'name': 'Ozark'}])
+
+        catalogs, from_bundle = load_catalogs(self.files_dir, self.json_loader)
+
+        self.assertEqual(self.loaded, ['tv_little_clean.json'])
+        self.assertNotIn('tv_series', from_bundle)
+        self.assertEqual([item['id'] for item in catalogs['tv_series']], [99, 100])
+        self.assertEqual(len(read_bundle(self.files_dir)), len(CATALOG_SOURCES))
+
+    def test_touched_source_with_same_content_stays_fresh(self):
+        load_catalogs(self.files_dir, self.json_loader)
+        self.loaded.clear()
+        path = os.path.join(self.files_dir, 'movies_little_clean.json')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+        load_catalogs(self.files_dir, self.json_loader)
+
+        self.assertEqual(self.loaded, [])
+
+    def test_corrupt_bundle_falls_back_to_json(self):
+        load_catalogs(self.files_dir, self.json_loader)
+        self.loaded.clear()
+        with open(bundle_path(self.files_dir), 'wb') as f:
+            f.write(catalog_bundle.BUNDLE_MAGIC + b'not a pickle')
+
+        catalogs, from_bundle = load_catalogs(self.files_dir, self.json_loader)
+
+        self.assertEqual(from_bundle, [])
+        self.assertEqual(len(self.loaded), len(CATALOG_SOURCES))
+        self.assertEqual(catalogs['movies'][0]['id'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
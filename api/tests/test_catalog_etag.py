@@ -0,0 +1,177 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask, jsonify, request
+from werkzeug.datastructures import MultiDict
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import api.cache as api_cache
+import utils.catalog_etag as catalog_etag_module
+from api.cache import ResponseCache, catalog_response_cache, invalidate_movie_cache
+from utils import catalog_image, catalog_journal
+from utils.catalog_etag import (SOURCE_CONTENT, bump_catalog_version, catalog_etag, catalog_etag_for,
+                                catalog_generation, get_catalog_version)
+
+
+class CatalogEtagTests(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+        catalog_response_cache.clear()
+        app = Flask(__name__)
+
+        @app.route('/items')
+        @catalog_etag()
+        def items():
+            self.calls += 1
+            return jsonify([1, 2, 3])
+
+        @app.route('/shuffled')
+        @catalog_etag(random_arg='random')
+        def shuffled():
+            self.calls += 1
+            response = jsonify([3, 1, 2])
+            response.headers['X-Random-Seed'] = request.args.get('seed', '')
+            return response
+
+        @app.route('/uncached')
+        @catalog_etag(cache=False)
+        def uncached():
+            self.calls += 1
+            return jsonify([4])
+
+        @app.route('/missing')
+        @catalog_etag()
+        def missing():
+            return jsonify(message='not found'), 404
+
+        self.client = app.test_client()
+
+    def test_matching_tag_is_answered_without_running_the_view(self):
+        first = self.client.get('/items?page=2&per_page=10')
+        etag = first.headers['ETag']
+
+        second = self.client.get('/items?per_page=10&page=2', headers={'If-None-Match': etag})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers['ETag'], etag)
+        self.assertEqual(second.data, b'')
+        self.assertEqual(self.calls, 1)
+
+    def test_tags_differ_by_args_and_version(self):
+        etag = self.client.get('/items?page=1').headers['ETag']
+
+        self.assertNotEqual(self.client.get('/items?page=2').headers['ETag'], etag)
+        self.assertEqual(self.client.get('/items?page=1', headers={'If-None-Match': etag}).status_code, 304)
+
+        version = get_catalog_version()
+        invalidate_movie_cache()
+        self.assertEqual(get_catalog_version(), version + 1)
+        self.assertEqual(self.client.get('/items?page=1', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_personal_and_unseeded_random_responses_are_not_tagged(self):
+        self.assertNotIn('ETag', self.client.get('/items?include_watch_history=1').headers)
+        self.assertNotIn('ETag', self.client.get('/shuffled?random=1').headers)
+        self.assertIn('ETag', self.client.get('/shuffled?random=1&seed=5').headers)
+        self.assertIn('ETag', self.client.get('/shuffled').headers)
+        self.assertNotIn('ETag', self.client.get('/missing').headers)
+
+    def test_any_listed_tag_matches(self):
+        etag = self.client.get('/items').headers['ETag']
+        bump_catalog_version()
+        current = self.client.get('/items').headers['ETag']
+
+        response = self.client.get('/items', headers={'If-None-Match': f'{etag}, W/{current}'})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_repeat_requests_are_served_from_the_response_cache(self):
+        first = self.client.get('/shuffled?random=1&seed=7')
+        second = self.client.get('/shuffled?seed=7&random=1')
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['X-Random-Seed'], '7')
+        self.assertEqual(second.headers['Content-Type'], 'application/json')
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+
+        # Personal responses skip the cache; a new catalog version drops it
+        self.client.get('/shuffled?random=1&seed=7&include_watch_history=1')
+        bump_catalog_version()
+        self.client.get('/shuffled?random=1&seed=7')
+        self.assertEqual(self.calls, 3)
+
+    def test_cache_can_be_turned_off(self):
+        self.client.get('/uncached')
+        self.client.get('/uncached')
+
+        self.assertEqual(self.calls, 2)
+
+
+class CatalogGenerationTests(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, catalog_image, '_base', catalog_image._base)
+        self.addCleanup(setattr, catalog_journal, '_applied_seq', catalog_journal._applied_seq)
+        self.addCleanup(setattr, catalog_etag_module, '_PROCESS_TAG', catalog_etag_module._PROCESS_TAG)
+
+    def test_workers_on_the_same_catalog_issue_the_same_tags(self):
+        catalog_image._base, catalog_journal._applied_seq = None, 4
+        unshared = catalog_etag_for('/cdn/movies', MultiDict())
+
+        catalog_image._base = 'base1'
+        etag = catalog_etag_for('/cdn/movies', MultiDict())
+        # Another worker: its own process tag and version, the same base and journal position
+        catalog_etag_module._PROCESS_TAG = 'other'
+        bump_catalog_version()
+
+        self.assertNotEqual(unshared, etag)
+        self.assertEqual(catalog_etag_for('/cdn/movies', MultiDict()), etag)
+        catalog_journal._applied_seq = 5
+        self.assertNotEqual(catalog_etag_for('/cdn/movies', MultiDict()), etag)
+        catalog_image._base, catalog_journal._applied_seq = 'base2', 4
+        self.assertNotEqual(catalog_etag_for('/cdn/movies', MultiDict()), etag)
+
+    def test_content_tags_follow_the_cached_rows(self):
+        rows = [{'id': 1, 'title': 'Heat', 'genres': 'Crime'}]
+        with patch.object(api_cache, '_get_serialized_movies', return_value=rows), \
+                patch.object(api_cache, '_get_serialized_shows', return_value=[]):
+            generation = catalog_generation(SOURCE_CONTENT)
+        # Another worker loaded equal rows into other objects
+        with patch.object(api_cache, '_get_serialized_movies', return_value=[dict(rows[0])]), \
+                patch.object(api_cache, '_get_serialized_shows', return_value=[]):
+            self.assertEqual(catalog_generation(SOURCE_CONTENT), generation)
+        with patch.object(api_cache, '_get_serialized_movies', return_value=[dict(rows[0], title='Ronin')]), \
+                patch.object(api_cache, '_get_serialized_shows', return_value=[]):
+            self.assertNotEqual(catalog_generation(SOURCE_CONTENT), generation)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_is_bounded_by_bytes_and_evicts_least_recently_used(self):
+        cache = ResponseCache(max_bytes=3 * (100 + 1 + ResponseCache.ENTRY_OVERHEAD), max_entry_bytes=1000)
+        for key in 'abc':
+            self.assertTrue(cache.set(key, 1, b'x' * 100, []))
+        cache.get('a', 1)
+
+        cache.set('d', 1, b'x' * 100, [])
+
+        self.assertIsNone(cache.get('b', 1))
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertFalse(cache.set('e', 1, b'x' * 1000, []))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_newer_version_drops_older_entries(self):
+        cache = ResponseCache()
+        cache.set('a', 1, b'[]', [])
+
+        self.assertIsNone(cache.get('a', 2))
+        self.assertFalse(cache.set('a', 1, b'[]', []))
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.catalog import apply_edit, build_snapshot, encode_json
+from utils import catalog_image, catalog_journal, data_helpers
+from utils.catalog_image import CatalogImage, open_current_image, publish_image, read_pointer, write_image
+from utils.projection import CARD_FIELDS, project
+
+
+def make_item(item_id, title, kind='movie'):
+    return {
+        'id': item_id,
+        'title': title,
+        'genres': 'Drama',
+        'vote_average': 7.5,
+        'poster_path': f'/p{item_id}.jpg',
+        'overview': f'Overview of {title} é',
+        'media_type': kind,
+    }
+
+
+def make_snapshot():
+    movies = [make_item(1, 'Heat'), make_item(2, 'Ronin'), make_item(3, 'Thief')]
+    tv = [make_item(1, 'Dark', 'tv'), make_item(2, 'Lost', 'tv')]
+    return build_snapshot(movies, tv, [make_item(2, 'Ronin')], [make_item(1, 'Dark', 'tv')])
+
+
+class CatalogImageTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_image_serves_the_snapshot_texts(self):
+        snapshot = make_snapshot()
+        path = os.path.join(self.tmp.name, 'image.bin')
+
+        self.assertTrue(write_image(path, snapshot, generation=1))
+        image = CatalogImage(path)
+        self.assertTrue(image.bind(snapshot))
+
+        # Movie 1 and show 1 share an id but not a text
+        self.assertEqual(len(image), 5)
+        for item in snapshot.movies + snapshot.tv_series:
+            self.assertEqual(image.item_json(item), encode_json(item))
+            self.assertEqual(image.item_json(item, CARD_FIELDS), encode_json(project(item, CARD_FIELDS)))
+        self.assertIsNone(image.item_json(snapshot.movies[0], ('id', 'title')))
+        self.assertIsNone(image.item_json(make_item(1, 'Heat')))
+
+        snapshot.image = image
+        self.assertEqual(snapshot.item_json(snapshot.movies[2]), encode_json(snapshot.movies[2]))
+        self.assertEqual(snapshot.fragments, {})
+
+        # An edit keeps the image for the items it did not touch
+        edited = apply_edit(snapshot, 'movie', 2, make_item(2, 'Ronin (1998)'))
+        self.assertIs(edited.image, image)
+        self.assertIsNone(image.item_json(edited.movies[1]))
+        self.assertEqual(edited.item_json(edited.movies[1]), encode_json(make_item(2, 'Ronin (1998)')))
+        self.assertEqual(edited.item_json(edited.movies[0]), image.item_json(snapshot.movies[0]))
+
+    def test_lists_round_trip_and_bind_the_rebuilt_snapshot(self):
+        snapshot = make_snapshot()
+        path = os.path.join(self.tmp.name, 'image.bin')
+        write_image(path, snapshot, generation=1)
+        image = CatalogImage(path)
+
+        lists = image.load_lists()
+        rebuilt = build_snapshot(lists['movies'], lists['tv_series'],
+                                 lists['movies_with_images'], lists['tv_series_with_images'])
+
+        self.assertEqual(rebuilt.movies, snapshot.movies)
+        self.assertEqual(rebuilt.tv_series_with_images, snapshot.tv_series_with_images)
+        self.assertIs(lists['movies_with_images'][0], lists['movies'][1])
+        self.assertTrue(image.bind(rebuilt))
+        self.assertFalse(image.bind(apply_edit(rebuilt, 'movie', 3, None)))
+
+    def test_publish_swaps_the_current_generation(self):
+        first = publish_image(self.tmp.name, make_snapshot())
+        edited = apply_edit(make_snapshot(), 'movie', 4, make_item(4, 'Collateral'))
+        second = publish_image(self.tmp.name, edited)
+
+        self.assertEqual((first.generation, second.generation), (1, 2))
+        self.assertEqual(read_pointer(self.tmp.name), second.name)
+        self.assertEqual(open_current_image(self.tmp.name).counts['movies'], 4)
+        images = [name for name in os.listdir(self.tmp.name) if name.endswith('.bin')]
+        if os.name != 'nt':
+            self.assertEqual(images, [second.name])
+
+
+class CatalogImageSwitchTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for module, names in ((catalog_image, ('_files_dir', '_get_snapshot', '_decode', '_install',
+                                               '_current_name', '_base', '_next_poll')),
+                              (catalog_journal, ('_applied_seq',)),
+                              (data_helpers, ('_snapshot',))):
+            for name in names:
+                self.addCleanup(setattr, module, name, getattr(module, name))
+        patcher = patch.dict(sys.modules, {'app': types.ModuleType('app')})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.decoded = []
+        catalog_image._files_dir = self.tmp.name
+        catalog_image._get_snapshot = data_helpers.get_catalog_snapshot
+        catalog_image._decode = self.decode
+        catalog_image._install = lambda snapshot: setattr(data_helpers, '_snapshot', snapshot)
+        catalog_image._next_poll = float('inf')
+
+        # This worker holds base b1, journal position 3
+        data_helpers._snapshot = make_snapshot()
+        catalog_image._base, catalog_journal._applied_seq = 'b1', 3
+
+    def decode(self, image):
+        self.decoded.append(image.name)
+        lists = image.load_lists()
+        return build_snapshot(lists['movies'], lists['tv_series'],
+                              lists['movies_with_images'], lists['tv_series_with_images'])
+
+    def test_an_image_of_the_same_base_is_bound_without_decoding(self):
+        snapshot = data_helpers._snapshot
+        # Another worker compacted the journal at the same position
+        image = publish_image(self.tmp.name, make_snapshot(), 'b1', 3)
+
+        catalog_image._switch(image)
+
+        self.assertEqual(self.decoded, [])
+        self.assertIs(data_helpers._snapshot, snapshot)
+        self.assertIs(snapshot.image, image)
+        self.assertEqual(snapshot.item_json(snapshot.movies[0]), encode_json(snapshot.movies[0]))
+
+        # An image of a position this worker has not reached yet is not bound
+        later = publish_image(self.tmp.name, make_snapshot(), 'b1', 4)
+        catalog_image._switch(later)
+        self.assertEqual(self.decoded, [])
+        self.assertIs(snapshot.image, image)
+        self.assertEqual(catalog_image._current_name, later.name)
+
+    def test_an_image_of_another_base_is_decoded_and_the_journal_replayed(self):
+        imported = apply_edit(make_snapshot(), 'movie', 4, make_item(4, 'Collateral'))
+        image = publish_image(self.tmp.name, imported, 'b2', 5)
+        catalog_journal._append_record(self.tmp.name, {'op': 'put', 'seq': 6, 'type': 'movie', 'id': 5,
+                                                       'item': make_item(5, 'Casino'), 'with_images': False})
+
+        catalog_image._switch(image)
+
+        current = data_helpers._snapshot
+        self.assertEqual(self.decoded, [image.name])
+        self.assertEqual([item['id'] for item in current.movies], [1, 2, 3, 4, 5])
+        self.assertEqual((catalog_image.catalog_base(), catalog_journal.applied_seq()), ('b2', 6))
+        self.assertIs(current.image, image)
+        self.assertEqual(image.item_json(current.movies[3]), encode_json(make_item(4, 'Collateral')))
+        self.assertIsNone(image.item_json(current.movies[4]))
+
+if __name__ == '__main__':
+    unittest.main()
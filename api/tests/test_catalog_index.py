@@ -0,0 +1,149 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cdn.utils import filter_valid_genres
+from utils import catalog_index
+from utils.catalog_index import ColumnarIndex
+
+
+GENRE_VALUES = [
+    'Action, Drama',
+    'Drama',
+    'comedy ,  ACTION',
+    '',
+    [{'id': 1, 'name': 'Science Fiction'}, {'id': 2, 'name': 'Drama'}],
+    [{'id': 3, 'name': 'Action'}],
+    [],
+    None,
+]
+RATING_VALUES = [7.5, '6.1', 'n/a', None, 0, 9, '10']
+DATE_VALUES = ['1999-03-31', '2010-07-16', '', None, 'unknown']
+GENRE_QUERIES = ['', 'action', 'Action, Drama', 'drama', 'fiction', 'horror', 'action,horror']
+
+
+def reference_filter(items, date_field, min_rating, max_rating, genre, year):
+    """The per-item filtering the index replaces."""
+    results = []
+    for item in items:
+        vote_average = item.get('vote_average', 0) or 0
+        if isinstance(vote_average, str):
+            try:
+                vote_average = float(vote_average)
+            except ValueError:
+                continue
+        if not (min_rating <= vote_average <= max_rating):
+            continue
+        if genre and not filter_valid_genres(item, genre):
+            continue
+        if year is not None:
+            try:
+                item_year = int(str(item.get(date_field, '') or '')[:4])
+            except (ValueError, TypeError):
+                item_year = None
+            if item_year != year:
+                continue
+        results.append(item)
+    return results
+
+
+def make_catalog(count=300, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i,
+            'title': f'Title {i}',
+            'genres': rng.choice(GENRE_VALUES),
+            'vote_average': rng.choice(RATING_VALUES),
+            'release_date': rng.choice(DATE_VALUES),
+            'poster_path': rng.choice(['/p.jpg', '']),
+            'backdrop_path': '/b.jpg',
+        }
+        for i in range(count)
+    ]
+
+
+class ColumnarIndexTests(unittest.TestCase):
+    def assert_matches_reference(self, items):
+        index = ColumnarIndex(items, 'movie')
+        for genre in GENRE_QUERIES:
+            for year in (None, 1999, 2010):
+                for min_rating, max_rating in ((0, 10), (6, 8)):
+                    expected = reference_filter(items, 'release_date', min_rating, max_rating, genre, year)
+                    actual = index.filter(min_rating=min_rating, max_rating=max_rating, genre=genre, year=year)
+                    self.assertEqual([m['id'] for m in actual], [m['id'] for m in expected],
+                                     msg=f'genre={genre!r} year={year} rating={min_rating}-{max_rating}')
+
+    def test_filters_match_per_item_helpers(self):
+        self.assert_matches_reference(make_catalog())
+
+    def test_pure_python_fallback_matches_per_item_helpers(self):
+        with mock.patch.object(catalog_index, 'np', None):
+            self.assert_matches_reference(make_catalog())
+
+    def test_more_than_64_genres(self):
+        items = [{'id': i, 'genres': f'genre{i}, shared', 'vote_average': 5} for i in range(100)]
+        index = ColumnarIndex(items, 'movie')
+
+        self.assertEqual([m['id'] for m in index.filter(genre='genre90, shared')], [90])
+        self.assertEqual(len(index.filter(genre='shared')), 100)
+
+    def test_genre_postings_use_canonical_ids(self):
+        movies = ColumnarIndex([{'id': 1, 'genres': 'Drama, Action'}], 'movie')
+        shows = ColumnarIndex([{'id': 2, 'genres': [{'name': 'Drama'}]}, {'id': 3}], 'tv')
+
+        self.assertEqual(set(movies.genre_names) & set(shows.genre_names), {catalog_index.genre_id('drama')})
+        self.assertEqual(movies.genres(), {'drama', 'action'})
+        self.assertEqual(shows.genres(), {'drama'})
+        self.assertEqual(list(shows.genre_positions('dram')), [0])
+
+    def test_with_images_and_media_type(self):
+        items = [{'id': i, 'vote_average': 5} for i in range(50)]
+        index = ColumnarIndex(items, 'movie', has_images={1, 2, 3})
+
+        self.assertEqual([m['id'] for m in index.filter(with_images=True)], [1, 2, 3])
+        self.assertEqual(index.filter(media_type='tv'), [])
+        self.assertEqual(len(index.filter(media_type='movie')), 50)
+
+    def assert_same_index(self, actual, expected):
+        for name in catalog_index.COLUMNS:
+            self.assertEqual(repr(list(getattr(actual, name))), repr(list(getattr(expected, name))), msg=name)
+        for postings in ('string_postings', 'list_postings'):
+            self.assertEqual(
+                {gid: list(p) for gid, p in getattr(actual, postings).items()},
+                {gid: list(p) for gid, p in getattr(expected, postings).items()},
+            )
+        self.assertEqual(actual.genre_names, expected.genre_names)
+
+    def test_incremental_updates_match_a_rebuild(self):
+        for backend in (catalog_index.np, None):
+            with mock.patch.object(catalog_index, 'np', backend):
+                items = make_catalog(count=60)
+                index = ColumnarIndex(items, 'movie')
+                edited = dict(items[10], genres='Western, Drama', vote_average='8.2')
+
+                replaced = items[:10] + [edited] + items[11:]
+                self.assert_same_index(index.replaced(10, edited, replaced), ColumnarIndex(replaced, 'movie'))
+
+                appended = items + [edited]
+                self.assert_same_index(index.appended(edited, appended), ColumnarIndex(appended, 'movie'))
+
+                removed = [item for i, item in enumerate(items) if i not in (0, 10, 59)]
+                self.assert_same_index(index.removed([59, 0, 10], removed), ColumnarIndex(removed, 'movie'))
+                self.assertEqual(len(index), 60)
+
+    def test_tv_year_uses_first_air_date(self):
+        items = [{'id': 1, 'first_air_date': '2008-01-20', 'release_date': '1990-01-01'}]
+        index = ColumnarIndex(items, 'tv')
+
+        self.assertEqual(len(index.filter(year=2008)), 1)
+        self.assertEqual(index.filter(year=1990), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import json
+import os
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import catalog_journal, data_helpers
+from utils.catalog_journal import (applied_seq, compact_journal, journal_path, read_journal, rebase_journal,
+                                   record_edit, replay_journal, sync_journal)
+
+
+def make_movie(movie_id, title, genres='Drama'):
+    return {'id': movie_id, 'title': title, 'genres': genres, 'vote_average': 7.0, 'media_type': 'movie'}
+
+
+class CatalogJournalTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files_dir = self.tmp.name
+
+        self.original_app = sys.modules.get('app')
+        self.fake_app = types.ModuleType('app')
+        self.fake_app.movies = [make_movie(1, 'Heat'), make_movie(2, 'Ronin')]
+        self.fake_app.tv_series = []
+        self.fake_app.movies_with_images = [make_movie(2, 'Ronin')]
+        self.fake_app.tv_series_with_images = []
+        self.rebuilds = []
+        self.fake_app.rebuild_content_indexes = lambda clear_cache=True: self.rebuilds.append(clear_cache)
+        sys.modules['app'] = self.fake_app
+        data_helpers.clear_data_cache()
+        catalog_journal._applied_seq = 0
+
+    def tearDown(self):
+        if self.original_app is not None:
+            sys.modules['app'] = self.original_app
+        else:
+            sys.modules.pop('app', None)
+        data_helpers.clear_data_cache()
+        self.tmp.cleanup()
+
+    def write_file(self, filename, items):
+        with open(os.path.join(self.files_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+
+    def write_base_files(self):
+        self.write_file('movies_little_clean.json', [{'id': 1, 'title': 'Heat'}, {'id': 2, 'title': 'Ronin'}])
+        self.write_file('movies_with_images.json', [{'id': 2, 'title': 'Ronin'}])
+
+    def read_file(self, filename):
+        with open(os.path.join(self.files_dir, filename), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_edits_are_journaled_and_applied_in_memory(self):
+        first = data_helpers.get_catalog_snapshot()
+
+        record_edit(self.files_dir, 'movie', 1, make_movie(1, 'Heat (Director\'s Cut)', 'Crime'), with_images=True)
+        record_edit(self.files_dir, 'movie', 2)
+
+        snapshot = data_helpers.get_catalog_snapshot()
+        self.assertGreater(snapshot.version, first.version)
+        self.assertEqual([m['title'] for m in self.fake_app.movies], ["Heat (Director's Cut)"])
+        self.assertIs(self.fake_app.movies_with_images[0], self.fake_app.movies[0])
+        self.assertEqual(snapshot.genres['movies'], ['crime'])
+        self.assertEqual([m['id'] for m in snapshot.indexes['movies'].filter(with_images=True)], [1])
+        self.assertEqual(self.rebuilds, [False, False])
+        self.assertEqual([(r['op'], r['id']) for r in read_journal(self.files_dir)], [('put', 1), ('delete', 2)])
+
+    def test_replay_is_idempotent(self):
+        record_edit(self.files_dir, 'movie', 3, make_movie(3, 'Alien'), with_images=True)
+        record_edit(self.files_dir, 'movie', 2)
+        catalogs = {
+            'movies': [make_movie(1, 'Heat'), make_movie(2, 'Ronin')],
+            'tv_series': [],
+            'movies_with_images': [make_movie(2, 'Ronin')],
+            'tv_series_with_images': [],
+        }
+
+        self.assertEqual(replay_journal(self.files_dir, catalogs), 2)
+        replay_journal(self.files_dir, catalogs)
+
+        self.assertEqual([m['id'] for m in catalogs['movies']], [1, 3])
+        self.assertEqual([m['id'] for m in catalogs['movies_with_images']], [3])
+
+    def test_compaction_folds_journal_into_base_files(self):
+        self.write_base_files()
+        compacted = []
+        record_edit(self.files_dir, 'movie', 2, make_movie(2, 'Ronin (1998)'))
+
+        self.assertEqual(compact_journal(self.files_dir, on_compacted=lambda: compacted.append(True)), 1)
+
+        self.assertEqual([m['title'] for m in self.read_file('movies_little_clean.json')], ['Heat', 'Ronin (1998)'])
+        self.assertNotIn('media_type', self.read_file('movies_little_clean.json')[1])
+        self.assertEqual([m['title'] for m in self.read_file('movies_with_images.json')], ['Ronin (1998)'])
+        self.assertFalse(os.path.exists(os.path.join(self.files_dir, 'tv_little_clean.json')))
+        self.assertEqual(read_journal(self.files_dir), [])
+        self.assertEqual(compacted, [True])
+
+    def test_compaction_keeps_edits_of_other_workers(self):
+        self.write_base_files()
+        record_edit(self.files_dir, 'movie', 1, make_movie(1, 'Heat (1995)'))
+        # Journaled by another worker: not in this worker's snapshot
+        catalog_journal._append_record(self.files_dir, {'op': 'put', 'type': 'movie', 'id': 5,
+                                                        'item': {'id': 5, 'title': 'Casino'}, 'with_images': True})
+
+        self.assertEqual(compact_journal(self.files_dir), 2)
+
+        self.assertEqual([m['title'] for m in self.read_file('movies_little_clean.json')],
+                         ['Heat (1995)', 'Ronin', 'Casino'])
+        self.assertEqual([m['id'] for m in self.read_file('movies_with_images.json')], [2, 5])
+
+    def test_only_one_process_compacts_at_a_time(self):
+        self.write_base_files()
+        record_edit(self.files_dir, 'movie', 2)
+
+        with catalog_journal.compaction_lock(self.files_dir):
+            self.assertEqual(compact_journal(self.files_dir, blocking=False), 0)
+        self.assertEqual(len(read_journal(self.files_dir)), 1)
+        self.assertEqual(compact_journal(self.files_dir, blocking=False), 1)
+
+    def test_interrupted_compaction_is_replayed(self):
+        self.write_base_files()
+        record_edit(self.files_dir, 'movie', 1)
+        os.replace(journal_path(self.files_dir), journal_path(self.files_dir) + catalog_journal.ROTATED_SUFFIX)
+        record_edit(self.files_dir, 'movie', 4, make_movie(4, 'Up'))
+
+        self.assertEqual([r['id'] for r in read_journal(self.files_dir)], [1, 4])
+        self.assertEqual(compact_journal(self.files_dir), 2)
+        self.assertEqual([m['id'] for m in self.read_file('movies_little_clean.json')], [2, 4])
+
+    def test_records_of_other_workers_are_applied_in_journal_order(self):
+        record_edit(self.files_dir, 'movie', 1)
+        # Appended by another worker
+        catalog_journal._append_record(self.files_dir, {'op': 'put', 'seq': 2, 'type': 'movie', 'id': 5,
+                                                        'item': make_movie(5, 'Casino'), 'with_images': False})
+        self.assertTrue(sync_journal(self.files_dir))
+        self.assertEqual([m['id'] for m in self.fake_app.movies], [2, 5])
+
+        catalog_journal._append_record(self.files_dir, {'op': 'delete', 'seq': 3, 'type': 'movie', 'id': 5})
+        # Caught up before appending, so the new record comes after the other worker's
+        record_edit(self.files_dir, 'movie', 6, make_movie(6, 'Thief'))
+
+        self.assertEqual([m['id'] for m in self.fake_app.movies], [2, 6])
+        self.assertEqual([r['seq'] for r in read_journal(self.files_dir)], [1, 2, 3, 4])
+        self.assertEqual(applied_seq(), 4)
+
+    def test_worker_behind_a_compaction_rebases(self):
+        self.write_base_files()
+        record_edit(self.files_dir, 'movie', 1)
+        catalog_journal._append_record(self.files_dir, {'op': 'delete', 'seq': 2, 'type': 'movie', 'id': 2})
+        compact_journal(self.files_dir)
+        catalog_journal._append_record(self.files_dir, {'op': 'put', 'seq': 3, 'type': 'movie', 'id': 7,
+                                                        'item': make_movie(7, 'Up'), 'with_images': False})
+
+        # Record 2 was folded into the files before this worker read it
+        self.assertFalse(sync_journal(self.files_dir))
+        self.assertEqual([m['id'] for m in self.fake_app.movies], [2])
+
+        # A catalog that includes the journal up to 2 (decoded from the compaction image)
+        def install():
+            self.fake_app.movies = []
+            self.fake_app.movies_with_images = []
+            data_helpers.clear_data_cache()
+
+        self.assertTrue(rebase_journal(self.files_dir, install, 2))
+        self.assertEqual([m['id'] for m in self.fake_app.movies], [7])
+        self.assertEqual(applied_seq(), 3)
+
+    def test_torn_last_line_is_skipped(self):
+        record_edit(self.files_dir, 'movie', 1)
+        with open(journal_path(self.files_dir), 'a', encoding='utf-8') as f:
+            f.write('{"op": "put", "ty')
+
+        self.assertEqual(len(read_journal(self.files_dir)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import catalog_loader
+from utils.catalog_bundle import CATALOG_SOURCES
+from utils.catalog_loader import catalog_status, load_catalog_file, load_catalog_files, start_catalog_load
+
+
+class CatalogLoaderTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.files_dir = self.tmp.name
+        for index, (_, filename, _) in enumerate(CATALOG_SOURCES):
+            self.write_source(filename, [{'id': index + 1, 'title': filename, 'watch_history': {'progress': 1}}])
+
+        # Fresh loader state for every test
+        catalog_loader._ready = threading.Event()
+        catalog_loader._callbacks = []
+        catalog_loader._catalogs = None
+        catalog_loader._state = dict(catalog_loader._state, state=catalog_loader.STATE_PENDING,
+                                     started_at=None, finished_at=None, error=None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_source(self, filename, items):
+        with open(os.path.join(self.files_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+
+    def test_load_catalog_file_cleans_and_tags_items(self):
+        items = load_catalog_file(os.path.join(self.files_dir, 'tv_little_clean.json'), 'tv')
+
+        self.assertEqual(items, [{'id': 2, 'title': 'tv_little_clean.json', 'media_type': 'tv', 'dir_type': 'cdn'}])
+        self.assertEqual(load_catalog_file(os.path.join(self.files_dir, 'missing.json'), 'tv'), [])
+
+    def test_parallel_load_matches_sequential_load(self):
+        jobs = [(os.path.join(self.files_dir, filename), media_type) for _, filename, media_type in CATALOG_SOURCES]
+        jobs.append((os.path.join(self.files_dir, 'missing.json'), 'movie'))
+
+        self.assertEqual(load_catalog_files(jobs), [load_catalog_file(path, media_type) for path, media_type in jobs])
+
+    def test_background_load_reports_readiness_and_calls_back(self):
+        installed = []
+        self.assertFalse(catalog_status()['ready'])
+
+        start_catalog_load(self.files_dir, on_ready=lambda catalogs, status: installed.append(catalogs))
+        self.assertTrue(catalog_loader.wait_for_catalog(10))
+        start_catalog_load(self.files_dir, on_ready=lambda catalogs, status: installed.append(catalogs))
+
+        status = catalog_status()
+        self.assertTrue(status['ready'])
+        self.assertEqual(status['counts']['movies'], 1)
+        self.assertEqual(len(installed), 2)
+        self.assertIs(installed[0], installed[1])
+        self.assertEqual(installed[0]['movies_with_images'][0]['id'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.catalog import apply_edit, build_snapshot
+from utils.catalog_rankings import RANK_FEATURED, RANK_TRENDING
+
+
+def make_item(item_id, vote_average=7.0, vote_count=500, popularity=None, media_type='movie'):
+    item = {'id': item_id, 'title': f'Title {item_id}', 'vote_average': vote_average,
+            'vote_count': vote_count, 'media_type': media_type}
+    if popularity is not None:
+        item['popularity'] = popularity
+    return item
+
+
+class RankedViewTests(unittest.TestCase):
+    def setUp(self):
+        self.movies = [
+            make_item(1, 8.0, 1000, popularity=5.0),
+            make_item(2, 6.0, 10),                  # no popularity: 6 * 10 = 60
+            make_item(3, 9.0, 50, popularity=80.0),
+            make_item(4, 7.5, 200, popularity=5.0),
+        ]
+        self.tv = [
+            make_item(10, 8.5, 300, popularity=70.0, media_type='tv'),
+            make_item(11, '7.2', 150, media_type='tv'),
+        ]
+        self.snapshot = build_snapshot(self.movies, self.tv, [], [])
+
+    def test_trending_matches_a_full_sort(self):
+        def score(item):
+            if item.get('popularity', 0) > 0:
+                return item['popularity']
+            return float(item['vote_average']) * item['vote_count']
+
+        expected = sorted(self.movies + self.tv, key=score, reverse=True)
+        ranking = self.snapshot.ranked(RANK_TRENDING)
+
+        self.assertEqual([item['id'] for item, _ in ranking.entries], [item['id'] for item in expected])
+        self.assertEqual([item['id'] for item, _ in ranking.page(2, 2)], [item['id'] for item in expected[2:4]])
+        self.assertEqual(ranking.page(0, 2), [])
+
+    def test_featured_is_a_min_votes_ranking_cut_by_rating(self):
+        ranking = self.snapshot.ranked(RANK_FEATURED, 'movie')
+
+        # Movie 2 and 3 have fewer than 100 votes
+        self.assertEqual([item['id'] for item, _ in ranking.entries], [1, 4])
+        self.assertEqual(ranking.count_at_least(7.5), 2)
+        self.assertEqual(ranking.count_at_least(7.6), 1)
+        self.assertEqual([item['id'] for item, _ in ranking.page(1, 5, limit=1)], [1])
+
+    def test_shuffled_page_is_repeatable_per_seed(self):
+        ranking = self.snapshot.ranked(RANK_TRENDING)
+
+        first = ranking.shuffled_page(1, 2, 4, seed=7)
+        second = ranking.shuffled_page(2, 2, 4, seed=7)
+
+        self.assertEqual(first, ranking.shuffled_page(1, 2, 4, seed=7))
+        self.assertEqual(sorted(item['id'] for item, _ in first + second),
+                         sorted(item['id'] for item, _ in ranking.entries[:4]))
+
+    def test_rankings_are_cached_per_version(self):
+        ranking = self.snapshot.ranked(RANK_TRENDING, 'tv')
+        self.assertIs(self.snapshot.ranked(RANK_TRENDING, 'tv'), ranking)
+        self.assertEqual([media_type for _, media_type in ranking.entries], ['tv', 'tv'])
+
+        edited = apply_edit(self.snapshot, 'tv', 11, make_item(11, 9.9, 150, popularity=99.0, media_type='tv'))
+
+        self.assertIs(self.snapshot.ranked(RANK_TRENDING, 'tv'), ranking)
+        self.assertEqual([item['id'] for item, _ in edited.ranked(RANK_TRENDING, 'tv').entries], [11, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
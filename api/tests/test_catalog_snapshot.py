@@ -0,0 +1,222 @@
+import copy
+import json
+import pickle
+import sys
+import types
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import data_helpers
+from utils.catalog import FrozenDict, FrozenList, apply_edit, build_snapshot, freeze, thaw
+from utils.catalog_memory import catalog_memory_report
+
+
+def make_movie(movie_id, title, genres='Drama'):
+    return {
+        'id': movie_id,
+        'title': title,
+        'genres': genres,
+        'vote_average': 7.5,
+        'production_companies': [{'name': 'Studio'}],
+        'media_type': 'movie',
+    }
+
+
+class FrozenCatalogTests(unittest.TestCase):
+    def test_freeze_blocks_mutation(self):
+        item = freeze(make_movie(1, 'Heat'))
+
+        with self.assertRaises(TypeError):
+            item['title'] = 'Changed'
+        with self.assertRaises(TypeError):
+            item.update(title='Changed')
+        with self.assertRaises(TypeError):
+            item['production_companies'].append({'name': 'Other'})
+        with self.assertRaises(TypeError):
+            item['production_companies'][0]['name'] = 'Other'
+
+    def test_copy_on_write_leaves_original_untouched(self):
+        item = freeze(make_movie(1, 'Heat'))
+
+        tagged = dict(item, watch_history={'progress': 10})
+
+        self.assertEqual(tagged['watch_history'], {'progress': 10})
+        self.assertNotIn('watch_history', item)
+
+    def test_frozen_items_serialize_like_plain_data(self):
+        plain = make_movie(1, 'Heat')
+        frozen = freeze(plain)
+
+        self.assertEqual(json.dumps(frozen, sort_keys=True), json.dumps(plain, sort_keys=True))
+        self.assertEqual(pickle.loads(pickle.dumps(frozen)), plain)
+        self.assertIsInstance(pickle.loads(pickle.dumps(frozen)), FrozenDict)
+
+    def test_deepcopy_and_thaw_return_mutable_data(self):
+        frozen = freeze([make_movie(1, 'Heat')])
+
+        for writable in (copy.deepcopy(frozen), thaw(frozen)):
+            self.assertNotIsInstance(writable, FrozenList)
+            writable[0]['title'] = 'Changed'
+            writable[0]['production_companies'].append({'name': 'Other'})
+
+        self.assertEqual(frozen[0]['title'], 'Heat')
+        self.assertEqual(len(frozen[0]['production_companies']), 1)
+
+    def test_list_operations_return_plain_lists(self):
+        frozen = freeze([make_movie(1, 'Heat'), make_movie(2, 'Ronin')])
+
+        for result in (frozen[:1], frozen.copy(), frozen + frozen, sorted(frozen, key=lambda m: m['id'])):
+            self.assertIs(type(result), list)
+
+    def test_rebuild_reuses_already_frozen_items(self):
+        first = build_snapshot([make_movie(1, 'Heat')], [], [], [])
+        second = build_snapshot(list(first.movies) + [make_movie(2, 'Ronin')], [], [], [])
+
+        self.assertGreater(second.version, first.version)
+        self.assertIs(second.movies[0], first.movies[0])
+        self.assertIsInstance(second.movies[1], FrozenDict)
+
+    def test_with_images_lists_are_views_of_the_main_catalog(self):
+        snapshot = build_snapshot(
+            [make_movie(1, 'Heat'), make_movie(2, 'Ronin')],
+            [],
+            [make_movie(2, 'Ronin (stale copy)'), make_movie(3, 'Orphan')],
+            [],
+        )
+
+        self.assertIs(snapshot.movies_with_images[0], snapshot.movies[1])
+        self.assertEqual(snapshot.movies_with_images[0]['title'], 'Ronin')
+        self.assertEqual(snapshot.movies_with_images[1]['title'], 'Orphan')
+        self.assertTrue(snapshot.has_images('movie', 2))
+        self.assertFalse(snapshot.has_images('movie', 1))
+        self.assertIs(snapshot.movies_by_id[2], snapshot.movies[1])
+        self.assertEqual(snapshot.stats()['shared_with_images_items'], 1)
+
+    def test_genre_lists_are_precomputed_per_version(self):
+        snapshot = build_snapshot(
+            [make_movie(1, 'Heat', 'Crime, Drama')],
+            [{'id': 10, 'name': 'Dark', 'genres': [{'id': 1, 'name': 'Mystery'}]}],
+            [],
+            [],
+        )
+
+        self.assertEqual(snapshot.genres['movies'], ['crime', 'drama'])
+        self.assertEqual(snapshot.genres['tv'], ['mystery'])
+        self.assertEqual(snapshot.genres['all'], ['crime', 'drama', 'mystery'])
+
+    def test_item_json_is_encoded_once_and_dropped_on_edit(self):
+        snapshot = build_snapshot([make_movie(1, 'Heat'), make_movie(2, 'Ronin')], [], [], [])
+        heat, ronin = snapshot.movies
+
+        text = snapshot.item_json(heat)
+        self.assertIs(snapshot.item_json(heat), text)
+        self.assertEqual(json.loads(text), heat)
+        snapshot.item_json(ronin)
+
+        edited = apply_edit(snapshot, 'movie', 2, make_movie(2, 'Ronin (1998)'))
+
+        self.assertIs(edited.item_json(heat), text)
+        self.assertNotIn((id(ronin), None), edited.fragments)
+        self.assertEqual(json.loads(edited.item_json(edited.movies[1]))['title'], 'Ronin (1998)')
+        self.assertIn((id(ronin), None), snapshot.fragments)
+
+
+    def test_items_share_repeated_values_through_the_pool(self):
+        # Separately decoded, like items from different JSON files
+        movies = [json.loads(json.dumps(make_movie(movie_id, f'Title {movie_id}'))) for movie_id in (1, 2)]
+        snapshot = build_snapshot(movies, [], [], [])
+        heat, ronin = snapshot.movies
+
+        self.assertEqual(thaw(heat), movies[0])
+        self.assertIs(heat['genres'], ronin['genres'])
+        self.assertIs(heat['production_companies'], ronin['production_companies'])
+        self.assertIsInstance(ronin['production_companies'][0], FrozenDict)
+
+        # Edits are frozen through the same pool; different scalar types are not merged
+        edited = apply_edit(snapshot, 'movie', 3, dict(make_movie(3, 'Up'), production_companies=[{'name': 'Studio'}]))
+        self.assertIs(edited.movies[2]['production_companies'], heat['production_companies'])
+        self.assertIsNot(freeze([{'a': [1]}], snapshot.pool)[0]['a'], freeze([{'a': [1.0]}], snapshot.pool)[0]['a'])
+
+    def test_memory_report_counts_shared_values_once(self):
+        movies = [json.loads(json.dumps(make_movie(movie_id, f'Title {movie_id}'))) for movie_id in range(50)]
+        snapshot = build_snapshot(movies, [], movies[:10], [])
+
+        report = catalog_memory_report(snapshot)
+
+        self.assertEqual(report['titles'], 50)
+        self.assertEqual(report['lists']['movies_with_images']['titles'], 10)
+        self.assertLess(report['bytes_per_title'], report['unshared_bytes_per_title'])
+        self.assertGreater(report['saved_percent'], 0)
+
+
+class DataHelpersSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.original_app = sys.modules.get('app')
+        self.fake_app = types.ModuleType('app')
+        self.fake_app.movies = [make_movie(1, 'Heat')]
+        self.fake_app.tv_series = [{'id': 10, 'name': 'Dark', 'media_type': 'tv'}]
+        self.fake_app.movies_with_images = []
+        self.fake_app.tv_series_with_images = []
+        sys.modules['app'] = self.fake_app
+        data_helpers.clear_data_cache()
+
+    def tearDown(self):
+        if self.original_app is not None:
+            sys.modules['app'] = self.original_app
+        else:
+            sys.modules.pop('app', None)
+        data_helpers.clear_data_cache()
+
+    def test_getters_share_the_snapshot_without_copying(self):
+        first = data_helpers.get_movies()
+        second = data_helpers.get_movies()
+
+        self.assertIs(first, second)
+        self.assertIsInstance(first, FrozenList)
+        self.assertIs(self.fake_app.movies, first)
+
+    def test_get_catalog_item_looks_up_by_id(self):
+        self.assertEqual(data_helpers.get_catalog_item('movies', 1)['title'], 'Heat')
+        self.assertEqual(data_helpers.get_catalog_item('tv_series', 10)['name'], 'Dark')
+        self.assertIsNone(data_helpers.get_catalog_item('movies', 10))
+        self.assertIsNone(data_helpers.get_catalog_item('movies_with_images', 1))
+
+    def test_force_clean_returns_writable_copy(self):
+        cleaned = data_helpers.get_movies(force_clean=True)
+
+        cleaned[0]['title'] = 'Changed'
+
+        self.assertEqual(data_helpers.get_movies()[0]['title'], 'Heat')
+
+    def test_clear_data_cache_publishes_new_version(self):
+        first = data_helpers.get_catalog_snapshot()
+
+        self.fake_app.movies = list(first.movies) + [make_movie(2, 'Ronin')]
+        data_helpers.clear_data_cache()
+        second = data_helpers.get_catalog_snapshot()
+
+        self.assertGreater(second.version, first.version)
+        self.assertEqual([m['id'] for m in data_helpers.get_movies()], [1, 2])
+
+    def test_encode_catalog_items_splices_per_request_fields(self):
+        movies = data_helpers.get_movies()
+        plain = {'id': 3, 'title': 'Plain'}
+        extras = [{'watch_history': {'progress': 0.5}, 'media_type': 'movie'}, {}, {'media_type': 'tv'}]
+
+        encoded = data_helpers.encode_catalog_items([movies[0], {}, plain], extras)
+
+        self.assertEqual(json.loads(encoded), [
+            dict(movies[0], watch_history={'progress': 0.5}),
+            {},
+            dict(plain, media_type='tv'),
+        ])
+        self.assertEqual(json.loads(data_helpers.encode_catalog_items(movies, [{'media_type': 'tv'}])),
+                         [dict(movies[0], media_type='tv')])
+        self.assertEqual(data_helpers.encode_catalog_items([]), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
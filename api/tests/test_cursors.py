@@ -0,0 +1,158 @@
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import jwt
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import utils.data_helpers as data_helpers
+from api.cache import catalog_response_cache
+from cdn.discovery_cdn import discovery_cdn_bp
+from cdn.movies_cdn import movie_cdn_bp
+from cdn.search_cdn import search_cdn_bp
+from utils.catalog import build_snapshot
+from utils.catalog_index import ColumnarIndex
+from utils.catalog_rankings import RankedView
+from utils.cursors import (
+    MAX_PER_PAGE, POSITION_CURSOR, RANKED_CURSOR, InvalidCursor, clamp_per_page, decode_cursor, encode_cursor,
+    page_positions, page_ranked, read_cursor,
+)
+
+
+def make_movies(ids):
+    return [{'id': movie_id, 'title': f'Movie {movie_id}', 'vote_average': movie_id % 10} for movie_id in ids]
+
+
+def walk(index, positions, per_page):
+    pages, cursor = [], None
+    while True:
+        selected, token = page_positions(index, positions, 1, per_page, cursor)
+        pages.append([index.items[position]['id'] for position in selected])
+        if token is None:
+            return pages
+        cursor = decode_cursor(token, POSITION_CURSOR)
+
+
+class CursorTokenTests(unittest.TestCase):
+    def test_round_trip_and_rejects_foreign_tokens(self):
+        token = encode_cursor(3, 7.5, 'tv', 1001)
+
+        self.assertEqual(decode_cursor(token, RANKED_CURSOR), (3, 7.5, 'tv', 1001))
+        self.assertEqual(read_cursor(MultiDict({'cursor': token}), RANKED_CURSOR), (3, 7.5, 'tv', 1001))
+        self.assertIsNone(read_cursor(MultiDict(), RANKED_CURSOR))
+        for bad in ('!!', encode_cursor(3, 7.5, 'tv'), encode_cursor('x', 1), 'bm90IGpzb24'):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(bad, POSITION_CURSOR)
+
+    def test_every_key_value_is_type_checked(self):
+        for bad in (encode_cursor(99, 'x', 'movie', 7), encode_cursor(True, 8.0, 'movie', 7),
+                    encode_cursor(1, 8.0, 2, 7), encode_cursor(1, 8.0, 'movie', [7]),
+                    encode_cursor(1, 8.0, 'movie', None), 'WzEsTmFOLCJtb3ZpZSIsN10'):  # [1,NaN,"movie",7]
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(bad, RANKED_CURSOR)
+        for bad in (encode_cursor(1.5, 7), encode_cursor(1, {'id': 7})):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(bad, POSITION_CURSOR)
+
+    def test_per_page_is_capped(self):
+        self.assertEqual(clamp_per_page(10_000), MAX_PER_PAGE)
+        self.assertEqual(clamp_per_page(0), 20)
+        self.assertEqual(clamp_per_page(-5, default=1), 1)
+        self.assertEqual(clamp_per_page(12), 12)
+
+
+class KeysetPositionTests(unittest.TestCase):
+    def test_cursor_pages_match_offset_pages(self):
+        index = ColumnarIndex(make_movies(range(1, 24)), 'movie')
+        positions = index.positions(min_rating=5)
+        offset_pages = [[index.items[p]['id'] for p in page_positions(index, positions, page, 4)[0]]
+                        for page in range(1, 4)]
+
+        self.assertEqual(walk(index, positions, 4), offset_pages)
+        self.assertIsNone(page_positions(index, positions, 3, 4)[1])
+
+    def test_resumes_after_the_same_title_when_the_list_changes(self):
+        index = ColumnarIndex(make_movies(range(1, 11)), 'movie')
+        selected, token = page_positions(index, range(len(index)), 1, 4)
+        cursor = decode_cursor(token, POSITION_CURSOR)
+
+        # Inserting a title before the cursor does not repeat one; removing the cursor's title skips none
+        inserted = ColumnarIndex(make_movies([0] + list(range(1, 11))), 'movie')
+        removed = ColumnarIndex(make_movies([1, 2, 3, 5, 6, 7, 8, 9, 10]), 'movie')
+
+        self.assertEqual([index.items[p]['id'] for p in selected], [1, 2, 3, 4])
+        self.assertEqual([inserted.items[p]['id'] for p in page_positions(inserted, range(11), 1, 3, cursor)[0]],
+                         [5, 6, 7])
+        self.assertEqual([removed.items[p]['id'] for p in page_positions(removed, range(9), 1, 3, cursor)[0]],
+                         [5, 6, 7])
+        self.assertEqual(removed.position_of(5), 3)
+        self.assertIsNone(removed.position_of(4))
+
+
+class KeysetRankingTests(unittest.TestCase):
+    def test_cursor_walks_the_ranking_and_survives_reranking(self):
+        items = make_movies(range(1, 8))
+        scores = [9.0, 8.0, 8.0, 8.0, 7.0, 6.0, 5.0]
+        ranking = RankedView([(item, 'movie') for item in items], scores)
+
+        first, token = page_ranked(ranking, 1, 3)
+        cursor = decode_cursor(token, RANKED_CURSOR)
+        second, _ = page_ranked(ranking, 1, 3, cursor)
+
+        self.assertEqual([item['id'] for item, _ in first], [1, 2, 3])
+        self.assertEqual([item['id'] for item, _ in second], [4, 5, 6])
+
+        # A new title ranked first shifts every rank; the tie block still finds title 3
+        new = {'id': 99, 'title': 'New'}
+        reranked = RankedView([(new, 'movie')] + ranking.entries, [10.0] + scores)
+        self.assertEqual(reranked.index_after(*cursor), 4)
+        self.assertEqual(reranked.index_after(2, 8.0, 'tv', 3), 5)
+
+
+class ForgedCursorRouteTests(unittest.TestCase):
+    def setUp(self):
+        movies = make_movies(range(1, 6))
+        self.addCleanup(setattr, data_helpers, '_snapshot', data_helpers._snapshot)
+        data_helpers._snapshot = build_snapshot(movies, [], movies, [])
+        catalog_response_cache.clear()
+        self.addCleanup(catalog_response_cache.clear)
+        app = Flask(__name__)
+        for blueprint in (movie_cdn_bp, search_cdn_bp, discovery_cdn_bp):
+            app.register_blueprint(blueprint)
+        self.client = app.test_client()
+        user = SimpleNamespace(id=1, is_banned=False)
+        for name, value in (('get_cached_user', lambda user_id: user), ('is_token_blacklisted', lambda token: False)):
+            patcher = patch(f'api.utils.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.headers = {'Authorization': f"Bearer {jwt.encode({'sub': '1'}, 'test', algorithm='HS256')}"}
+
+    def get(self, url):
+        return self.client.get(url, headers=self.headers)
+
+    def test_forged_cursors_are_answered_with_400(self):
+        forged = {
+            '/cdn/movies': (encode_cursor('x', 1), encode_cursor(0, [1])),
+            '/cdn/search': (encode_cursor(0, 'x', 1), encode_cursor(0, 0, {'id': 1})),
+            '/cdn/discovery/trending': (encode_cursor(99, 'x', 'movie', 7), encode_cursor(0, 8.0, 'movie', [7])),
+        }
+        for path, tokens in forged.items():
+            for token in tokens:
+                with self.subTest(path=path, token=token):
+                    self.assertEqual(self.get(f'{path}?cursor={token}').status_code, 400)
+
+    def test_issued_cursors_are_accepted(self):
+        token = self.get('/cdn/movies?per_page=2').headers['X-Next-Cursor']
+        response = self.get(f'/cdn/movies?per_page=2&cursor={token}')
+
+        self.assertEqual([item['id'] for item in response.get_json()], [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.fuzzy import _lcs_length, _lcs_length_dp, _lcs_masks, _lcs_ratio, fuzzy_filter_and_rank, fuzzy_score, top_scored
+
+
+class BitParallelLcsTests(unittest.TestCase):
+    def test_matches_the_dynamic_programming_reference(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            a = ''.join(rng.choice('abcde é') for _ in range(rng.randint(0, 90)))
+            b = ''.join(rng.choice('abcde é') for _ in range(rng.randint(0, 90)))
+            with self.subTest(a=a, b=b):
+                self.assertEqual(_lcs_length(a, b), _lcs_length_dp(a, b))
+
+    def test_ratio_with_precomputed_query_masks(self):
+        query = 'drk knight rses'
+        masks = _lcs_masks(query)
+        for text in ('the dark knight rises', 'dark', 'knight rider', 'zzz', 'x' * 200):
+            expected = _lcs_length_dp(query, text) / max(len(query), len(text))
+            self.assertEqual(_lcs_ratio(query, text, masks), expected)
+            self.assertEqual(_lcs_ratio(query, text), expected)
+        self.assertEqual(_lcs_ratio('', 'abc'), 0.0)
+
+    def test_fuzzy_score_is_unchanged(self):
+        self.assertEqual(fuzzy_score('Dark', 'The Dark Knight'), 1.0)
+        self.assertEqual(fuzzy_score('drk nite', 'The Dark Knight'), 0.1748)
+
+
+
+class TopScoredTests(unittest.TestCase):
+    def test_limit_matches_slicing_the_full_ranking(self):
+        rng = random.Random(5)
+        entries = [(rng.choice([0.3, 0.5, 0.5, 0.8, 1.0]), position) for position in range(60)]
+        for limit in (0, 1, 3, 10, 60, 100):
+            self.assertEqual(top_scored(iter(entries), limit), top_scored(iter(entries))[:limit])
+
+    def test_stops_after_limit_exact_matches(self):
+        consumed = []
+
+        def entries():
+            for position in range(100):
+                consumed.append(position)
+                yield (1.0 if position % 10 == 0 else 0.9), position
+
+        self.assertEqual(top_scored(entries(), 3), [(1.0, 0), (1.0, 10), (1.0, 20)])
+        self.assertEqual(len(consumed), 21)
+
+    def test_fuzzy_filter_and_rank_limit(self):
+        titles = ['The Dark Knight', 'Dark City', 'Darkman', 'Knight Rider', 'Dirk Gently', 'Drake']
+        items = [{'title': title} for title in titles]
+        getter = lambda item: item['title']
+
+        for query in ('dark', 'drk nite', ''):
+            full = fuzzy_filter_and_rank(query, items, getter)
+            self.assertEqual(fuzzy_filter_and_rank(query, items, getter, limit=2), full[:2])
+
+
+if __name__ == '__main__':
+    unittest.main()
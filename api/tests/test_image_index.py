@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from cdn.utils import check_images_existence
+from utils import image_index
+
+
+class ImageIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ('p1.jpg', 'b1.jpg'):
+            Path(self.tmp.name, name).touch()
+        os.mkdir(os.path.join(self.tmp.name, 'seasons'))
+        Path(self.tmp.name, 'seasons', 's1.jpg').touch()
+
+        patcher = mock.patch.object(image_index, 'CDN_POSTERS_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        image_index.rescan_images()
+
+    def tearDown(self):
+        image_index._names = None
+        self.tmp.cleanup()
+
+    def test_existence_checks_use_the_scanned_names(self):
+        with mock.patch('os.path.exists', side_effect=AssertionError('stat called')):
+            self.assertTrue(image_index.image_exists('/p1.jpg'))
+            self.assertFalse(image_index.image_exists('missing.jpg'))
+            self.assertFalse(image_index.image_exists('seasons'))
+            self.assertTrue(check_images_existence({'poster_path': '/p1.jpg', 'backdrop_path': '/b1.jpg'}))
+            self.assertFalse(check_images_existence({'poster_path': '/p1.jpg', 'backdrop_path': '/b2.jpg'}))
+            self.assertFalse(check_images_existence({'poster_path': '/p1.jpg', 'backdrop_path': None}))
+
+    def test_nested_paths_fall_back_to_the_filesystem(self):
+        self.assertTrue(image_index.image_exists('seasons/s1.jpg'))
+        self.assertFalse(image_index.image_exists('seasons/s2.jpg'))
+
+    def test_added_and_removed_images_update_the_set(self):
+        Path(self.tmp.name, 'b2.jpg').touch()
+        self.assertFalse(image_index.image_exists('b2.jpg'))
+
+        image_index.add_images(['b2.jpg'])
+        image_index.remove_images(['p1.jpg'])
+
+        self.assertTrue(image_index.image_exists('b2.jpg'))
+        self.assertFalse(image_index.image_exists('p1.jpg'))
+
+    def test_stale_set_is_rescanned(self):
+        Path(self.tmp.name, 'b3.jpg').touch()
+        with mock.patch.object(image_index, '_scanned_at', 0.0):
+            image_index.image_names()
+            image_index._rescan_thread.join()
+
+        self.assertTrue(image_index.image_exists('b3.jpg'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+from werkzeug.datastructures import MultiDict
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.catalog import apply_edit, build_snapshot
+from utils.projection import CARD_FIELDS, project, resolve_fields
+
+
+def make_movie(movie_id, title):
+    return {
+        'id': movie_id,
+        'title': title,
+        'genres': 'Crime, Drama',
+        'vote_average': 8.3,
+        'poster_path': f'/p{movie_id}.jpg',
+        'overview': 'A long overview ' * 20,
+        'production_companies': [{'name': 'Studio'}],
+        'budget': 60000000,
+    }
+
+
+class ResolveFieldsTests(unittest.TestCase):
+    def test_views_and_field_lists(self):
+        self.assertIsNone(resolve_fields(MultiDict()))
+        self.assertIsNone(resolve_fields(MultiDict({'view': 'detail'})))
+        self.assertIsNone(resolve_fields(MultiDict({'view': 'unknown'})))
+        self.assertEqual(resolve_fields(MultiDict({'view': 'Card'})), CARD_FIELDS)
+
+        # fields= wins over view=, is normalized and always keeps the id
+        self.assertEqual(resolve_fields(MultiDict({'fields': ' title,poster_path,title,', 'view': 'card'})),
+                         ('id', 'poster_path', 'title'))
+        self.assertIsNone(resolve_fields(MultiDict({'fields': ','})))
+
+    def test_project_keeps_only_present_fields(self):
+        movie = make_movie(1, 'Heat')
+
+        self.assertIs(project(movie, None), movie)
+        self.assertEqual(project(movie, CARD_FIELDS), {
+            'id': 1, 'title': 'Heat', 'genres': 'Crime, Drama', 'vote_average': 8.3, 'poster_path': '/p1.jpg',
+        })
+
+    def test_project_keeps_the_id_of_database_records(self):
+        # Serialized TVShow/Movie rows (models.py) are keyed by show_id/movie_id
+        show = {'show_id': 7, 'title': 'Dark', 'overview': 'Time travel', 'vote_average': 8.7}
+        fields = resolve_fields(MultiDict({'fields': 'title'}))
+
+        self.assertEqual(project(show, fields), {'title': 'Dark', 'show_id': 7})
+        self.assertEqual(project({'movie_id': 3, 'title': 'Heat'}, ('title',)), {'title': 'Heat', 'movie_id': 3})
+        self.assertEqual(project(make_movie(1, 'Heat'), ('title',)), {'title': 'Heat', 'id': 1})
+
+
+class ProjectedFragmentTests(unittest.TestCase):
+    def test_named_views_are_cached_per_version(self):
+        snapshot = build_snapshot([make_movie(1, 'Heat'), make_movie(2, 'Ronin')], [], [], [])
+        heat, ronin = snapshot.movies
+
+        card = snapshot.item_json(heat, CARD_FIELDS)
+        adhoc = snapshot.item_json(heat, ('id', 'budget'))
+
+        self.assertIs(snapshot.item_json(heat, CARD_FIELDS), card)
+        self.assertEqual(json.loads(card), project(heat, CARD_FIELDS))
+        self.assertEqual(json.loads(adhoc), {'id': 1, 'budget': 60000000})
+        self.assertNotIn((id(heat), ('id', 'budget')), snapshot.fragments)
+        self.assertLess(len(card), len(snapshot.item_json(heat)) / 3)
+
+        snapshot.item_json(ronin, CARD_FIELDS)
+        edited = apply_edit(snapshot, 'movie', 2, None)
+
+        self.assertIs(edited.item_json(heat, CARD_FIELDS), card)
+        self.assertNotIn((id(ronin), CARD_FIELDS), edited.fragments)
+
+
+if __name__ == '__main__':
+    unittest.main()
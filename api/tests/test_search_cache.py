@@ -0,0 +1,121 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import api.cache as api_cache
+import utils.data_helpers as data_helpers
+from api.cache import RankingCache, cdn_search_cache, content_search_cache
+from api.routes.search import search_bp
+from cdn.search_cdn import _perform_search
+from utils.catalog import apply_edit, build_snapshot
+
+MOVIES = [{'id': item_id, 'title': title, 'vote_average': rating, 'genres': [{'name': 'Drama'}]}
+          for item_id, title, rating in ((1, 'Dark City', 7.0), (2, 'The Dark Knight', 9.0),
+                                         (3, 'Heat', 8.0), (4, 'Up', 8.3))]
+TV = [{'id': 9, 'name': 'Dark', 'vote_average': 8.7, 'genres': [{'name': 'Drama'}]}]
+
+
+def search(query, page=1, per_page=2, is_random=False, fuzzy=True, media_type='all'):
+    results = _perform_search(query=query, genre='', min_rating=0, max_rating=10, media_type=media_type,
+                              is_random=is_random, with_images=False, page=page, per_page=per_page,
+                              fuzzy=fuzzy, fields=('id',))
+    return [(item['type'], item['id']) for item in results]
+
+
+class RankingCacheTests(unittest.TestCase):
+    def test_is_bounded_by_items_and_evicts_least_recently_used(self):
+        cache = RankingCache(max_items=16)
+        for key in 'abcd':
+            self.assertTrue(cache.set(key, 1, ('x',) * 4, bytes(4)))
+        cache.get('a', 1)
+
+        cache.set('e', 1, ('x',) * 4, bytes(4))
+
+        self.assertIsNone(cache.get('b', 1))
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertFalse(cache.set('f', 1, ('x',) * 5, bytes(5)))
+        self.assertEqual(cache.stats()['items'], 16)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_newer_version_drops_older_entries(self):
+        cache = RankingCache()
+        cache.set('a', 1, ('x',), bytes(1))
+
+        self.assertIsNone(cache.get('a', 2))
+        self.assertFalse(cache.set('a', 1, ('x',), bytes(1)))
+        self.assertEqual(cache.stats()['items'], 0)
+
+
+class PerformSearchCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.previous = data_helpers._snapshot
+        data_helpers._snapshot = build_snapshot(MOVIES, TV, MOVIES, TV)
+        cdn_search_cache.clear()
+
+    def tearDown(self):
+        data_helpers._snapshot = self.previous
+        cdn_search_cache.clear()
+
+    def test_pages_are_cut_from_one_cached_ranking(self):
+        before = cdn_search_cache.stats()
+        first = search('dark', page=1)
+        second = search('  DARK ', page=2)
+
+        self.assertEqual(first + second, [('movie', 1), ('movie', 2), ('tv_series', 9)])
+        after = cdn_search_cache.stats()
+        self.assertEqual((after['hits'] - before['hits'], after['misses'] - before['misses'], after['size']),
+                         (1, 1, 1))
+
+        # Substring searches keep their own (case-insensitive) ranking
+        self.assertEqual(search('Dark', fuzzy=False, per_page=5), [('movie', 1), ('movie', 2), ('tv_series', 9)])
+        self.assertEqual(cdn_search_cache.stats()['size'], 2)
+
+    def test_random_shuffles_a_copy_of_the_ranking(self):
+        ranked = search('', per_page=10, fuzzy=False)
+        for _ in range(5):
+            self.assertCountEqual(search('', per_page=10, fuzzy=False, is_random=True), ranked)
+
+        self.assertEqual(search('', per_page=10, fuzzy=False), ranked)
+
+    def test_new_snapshot_version_is_ranked_again(self):
+        self.assertEqual(search('heat', media_type='movies'), [('movie', 3)])
+
+        data_helpers._snapshot = apply_edit(data_helpers._snapshot, 'movie', 3, None)
+
+        self.assertEqual(search('heat', media_type='movies'), [])
+        self.assertEqual(cdn_search_cache.stats()['catalog_version'], data_helpers._snapshot.version)
+
+
+class ContentSearchCacheTests(unittest.TestCase):
+    def setUp(self):
+        content_search_cache.clear()
+        self.addCleanup(content_search_cache.clear)
+        app = Flask(__name__)
+        app.register_blueprint(search_bp)
+        self.client = app.test_client()
+        self.shows = []
+
+    def search(self, movies, query):
+        with patch.object(api_cache, '_get_serialized_movies', return_value=movies), \
+                patch.object(api_cache, '_get_serialized_shows', return_value=self.shows):
+            return [item['id'] for item in self.client.get(f'/api/search?q={query}').get_json()]
+
+    def test_reloaded_rows_are_ranked_again(self):
+        movies = [{'id': 1, 'title': 'Heat', 'vote_average': 8.0, 'genres': 'Crime'},
+                  {'id': 2, 'title': 'Heat Wave', 'vote_average': 6.0, 'genres': 'Drama'}]
+        self.assertEqual(self.search(movies, 'heat'), [1, 2])
+        hits = content_search_cache.stats()['hits']
+        self.assertEqual(self.search(movies, 'heat'), [1, 2])
+        self.assertEqual(content_search_cache.stats()['hits'], hits + 1)
+
+        # The cached rows expired and were reloaded without movie 1, with no invalidation in this worker
+        self.assertEqual(self.search([dict(movies[1])], 'heat'), [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
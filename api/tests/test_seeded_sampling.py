@@ -0,0 +1,59 @@
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.catalog_index import ColumnarIndex
+from utils.seeded_sampling import SeededPermutation, sample_items, sample_page
+
+
+class SeededPermutationTests(unittest.TestCase):
+    def test_is_a_permutation_for_any_size_and_seed(self):
+        for size in (0, 1, 2, 3, 7, 64, 1000):
+            for seed in (0, 1, -12, 2 ** 40):
+                permutation = SeededPermutation(size, seed)
+                self.assertEqual(sorted(permutation[i] for i in range(size)), list(range(size)))
+
+    def test_same_seed_same_order(self):
+        first = [SeededPermutation(500, 42)[i] for i in range(500)]
+
+        self.assertEqual(first, [SeededPermutation(500, 42)[i] for i in range(500)])
+        self.assertNotEqual(first, [SeededPermutation(500, 43)[i] for i in range(500)])
+        self.assertNotEqual(first, list(range(500)))
+
+    def test_pages_do_not_overlap_and_cover_everything(self):
+        permutation = SeededPermutation(95, 7)
+        pages = [permutation.page(page, 20) for page in range(1, 6)]
+
+        self.assertEqual([len(page) for page in pages], [20, 20, 20, 20, 15])
+        self.assertEqual(sorted(value for page in pages for value in page), list(range(95)))
+        self.assertEqual(permutation.page(6, 20), [])
+        self.assertEqual(permutation.page(0, 20), [])
+
+
+class SamplePageTests(unittest.TestCase):
+    def test_samples_only_the_filtered_positions(self):
+        movies = [{'id': i, 'vote_average': i % 10, 'media_type': 'movie'} for i in range(50)]
+        index = ColumnarIndex(movies, 'movie')
+        positions = index.positions(min_rating=5)
+
+        sampled = sample_items(index.items, positions, 1, 100, seed=3)
+
+        self.assertEqual(sorted(m['id'] for m in sampled), [m['id'] for m in index.filter(min_rating=5)])
+
+    def test_combines_sources_including_empty_ones(self):
+        movies = [{'id': 1}, {'id': 2}, {'id': 3}]
+        shows = [{'id': 10}, {'id': 11}]
+        sources = [(movies, [0, 2], 'movie'), ([], [], 'movie'), (shows, [0, 1], 'tv')]
+
+        first = sample_page(sources, 1, 2, seed=9)
+        second = sample_page(sources, 2, 2, seed=9)
+
+        self.assertEqual(sorted((item['id'], media_type) for item, media_type in first + second),
+                         [(1, 'movie'), (3, 'movie'), (10, 'tv'), (11, 'tv')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import catalog_index, similarity
+from utils.catalog import apply_edit, build_snapshot
+from utils.similarity import SimilarityIndex, item_features
+
+GENRES = ['Action', 'Drama', 'Comedy', 'Crime', 'Horror', 'Romance', 'Thriller', 'War']
+
+
+def make_movie(rng, movie_id):
+    movie = {
+        'id': movie_id,
+        'genres': ', '.join(rng.sample(GENRES, rng.randint(0, 3))),
+        'original_language': rng.choice(['en', 'fr', 'he', None]),
+        'media_type': 'movie',
+    }
+    if rng.random() < 0.3:
+        movie['keywords'] = [{'name': k} for k in rng.sample(['heist', 'space', 'dog', 'robot'], rng.randint(1, 2))]
+    return movie
+
+
+def brute_force_neighbors(items, top_k):
+    """The old per-request scan: score every other title, sort, keep the best."""
+    features = [item_features(item) for item in items]
+    result = {}
+    for i, item in enumerate(items):
+        scored = []
+        for j, other in enumerate(items):
+            if other['id'] == item['id']:
+                continue
+            score = len(features[i][0] & features[j][0]) + len(features[i][1] & features[j][1])
+            if score > 0:
+                scored.append((-score, j, other['id']))
+        result[item['id']] = tuple(other_id for _, _, other_id in sorted(scored)[:top_k])
+    return result
+
+
+class SimilarityIndexTests(unittest.TestCase):
+    def backends(self):
+        for backend in (catalog_index.np, None):
+            with mock.patch.object(catalog_index, 'np', backend), mock.patch.object(similarity, 'np', backend):
+                yield
+
+    def test_features_normalize_genres_and_keywords(self):
+        signature, keywords = item_features({
+            'genres': 'Crime, Drama',
+            'original_language': 'en',
+            'keywords': {'keywords': [{'name': 'Heist '}, {'name': 'bank'}]},
+        })
+
+        self.assertEqual(signature, {('genre', 'crime'), ('genre', 'drama'), ('language', 'en')})
+        self.assertEqual(keywords, {'heist', 'bank'})
+
+    def test_neighbors_match_a_full_scan(self):
+        rng = random.Random(1)
+        movies = [make_movie(rng, i) for i in range(120)]
+        expected = brute_force_neighbors(movies, 6)
+
+        for _ in self.backends():
+            index = SimilarityIndex(movies, top_k=6)
+            for movie_id, neighbor_ids in expected.items():
+                self.assertEqual(index.neighbors(movie_id)[0], neighbor_ids)
+        self.assertEqual(index.neighbors('missing'), ((), ()))
+
+    def test_all_neighbors_rank_past_top_k(self):
+        rng = random.Random(4)
+        movies = [make_movie(rng, i) for i in range(40)]
+        expected = brute_force_neighbors(movies, len(movies))
+
+        for _ in self.backends():
+            index = SimilarityIndex(movies, top_k=3)
+            for movie_id, neighbor_ids in expected.items():
+                ranked = index.all_neighbors(movie_id)[0]
+                self.assertEqual(ranked, neighbor_ids)
+                self.assertEqual(ranked[:3], index.neighbors(movie_id)[0])
+        self.assertEqual(index.all_neighbors('missing'), ((), ()))
+
+    def test_edits_update_neighbors_incrementally(self):
+        for _ in self.backends():
+            rng = random.Random(2)
+            current = [make_movie(rng, i) for i in range(80)]
+            snapshot = build_snapshot(current, [], [], [])
+            snapshot.similarity['movies'] = SimilarityIndex(snapshot.movies, top_k=5)
+            next_id = 1000
+
+            for _ in range(60):
+                roll = rng.random()
+                if roll < 0.4:
+                    edited = make_movie(rng, rng.choice(current)['id'])
+                    snapshot = apply_edit(snapshot, 'movie', edited['id'], edited)
+                    current = [edited if m['id'] == edited['id'] else m for m in current]
+                elif roll < 0.7:
+                    added = make_movie(rng, next_id)
+                    next_id += 1
+                    snapshot = apply_edit(snapshot, 'movie', added['id'], added)
+                    current.append(added)
+                else:
+                    removed_id = rng.choice(current)['id']
+                    snapshot = apply_edit(snapshot, 'movie', removed_id)
+                    current = [m for m in current if m['id'] != removed_id]
+
+                index = snapshot.similarity['movies']
+                self.assertIs(index.items, snapshot.movies)
+                for movie_id, neighbor_ids in brute_force_neighbors(current, 5).items():
+                    self.assertEqual(index.neighbors(movie_id)[0], neighbor_ids)
+
+    def test_neighbor_tables_are_persisted_by_fingerprint(self):
+        rng = random.Random(3)
+        movies = [make_movie(rng, i) for i in range(40)]
+
+        with tempfile.TemporaryDirectory() as files_dir, \
+                mock.patch.object(similarity, '_store_dir', files_dir), \
+                mock.patch.object(similarity, '_persisted', None):
+            index = SimilarityIndex(movies, name='movies')
+            self.assertTrue(similarity.save_similarity(files_dir, {'movies': index}))
+            self.assertFalse(similarity.save_similarity(files_dir, {'movies': index}))
+
+            similarity._persisted = None
+            with mock.patch.object(SimilarityIndex, '_compute_all', side_effect=AssertionError('recomputed')):
+                reloaded = SimilarityIndex(movies, name='movies')
+            self.assertEqual(reloaded.neighbors(0), index.neighbors(0))
+
+            # A changed catalog does not reuse the stored table
+            changed = movies[:-1]
+            self.assertIsNone(similarity.persisted_neighbors('movies', SimilarityIndex(changed).fingerprint()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import sys
+import unittest
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.catalog import apply_edit, build_snapshot
+from utils.fuzzy import fuzzy_filter_and_rank
+from utils.trigram_index import TrigramIndex, title_text
+
+WORDS = ['the', 'dark', 'knight', 'rises', 'heat', 'alien', 'aliens', 'city', 'up', 'lost', 'office',
+         'breaking', 'bad', 'star', 'wars', 'return', 'of', 'jedi', 'night', 'king']
+QUERIES = ['dark knight', 'drk nite', 'a', 'up', 'aliens', 'the', 'star wrs', 'knight of the city', 'xyz',
+           '  Heat ', 'ret jed', 'night king', 'rk']
+
+
+def make_titles(count, seed=7):
+    rng = random.Random(seed)
+    items = []
+    for item_id in range(1, count + 1):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        items.append({'id': item_id, 'title': title})
+    items.append({'id': count + 1, 'title': ''})
+    return items
+
+
+def fuzzy_ids(query, items, threshold):
+    return [item['id'] for item in fuzzy_filter_and_rank(query, items, title_text, threshold)]
+
+
+def index_ids(index, query, threshold, positions=None):
+    return [index.items[position]['id'] for _, position in index.search(query, threshold, positions)]
+
+
+class TrigramIndexTests(unittest.TestCase):
+    def test_search_matches_the_full_scan(self):
+        items = make_titles(400)
+        index = TrigramIndex(items)
+
+        for query in QUERIES:
+            for threshold in (0.25, 0.5, 0.7, 0.9):
+                with self.subTest(query=query, threshold=threshold):
+                    self.assertEqual(index_ids(index, query, threshold), fuzzy_ids(query, items, threshold))
+
+        self.assertEqual(len(index.search('')), len(items))
+        for query in ('dark knight', 'the', 'a', 'xyz'):
+            self.assertEqual(index.search(query, limit=5), index.search(query)[:5])
+
+    def test_repeated_trigrams_count_like_the_multisets(self):
+        titles = ['Banana Bandana', 'Nana', 'Ananas', 'Aaaa Aaaa', 'Baa Baa', 'Ana', 'Bandana Banana Nana']
+        items = [{'id': item_id, 'title': title} for item_id, title in enumerate(titles, 1)]
+        index = TrigramIndex(items)
+
+        for query in ('banana nana', 'anana', 'aaaa', 'aaa aaa', 'baa baa baa', 'nanan'):
+            for threshold in (0.25, 0.6):
+                with self.subTest(query=query, threshold=threshold):
+                    self.assertEqual(index_ids(index, query, threshold), fuzzy_ids(query, items, threshold))
+
+        edited = index.removed([1], items[:1] + items[2:]).appended(items[1], items[:1] + items[2:] + items[1:2])
+        self.assertEqual(edited.repeats, TrigramIndex(edited.items).repeats)
+
+    def test_search_is_limited_to_the_given_positions(self):
+        items = make_titles(200)
+        index = TrigramIndex(items)
+        positions = list(range(0, len(items), 3))
+
+        self.assertEqual(index_ids(index, 'dark knight', 0.25, positions),
+                         fuzzy_ids('dark knight', [items[p] for p in positions], 0.25))
+
+    def test_edits_update_the_snapshot_index(self):
+        movies = make_titles(50)
+        snapshot = build_snapshot(movies, [], [], [])
+        before = snapshot.text_index('movies')
+
+        edited = apply_edit(snapshot, 'movie', 3, None)
+        edited = apply_edit(edited, 'movie', 5, {'id': 5, 'title': 'Dark Knight Returns'})
+        edited = apply_edit(edited, 'movie', 99, {'id': 99, 'title': 'The Dark Knight'})
+        index = edited.text_index('movies')
+
+        self.assertIsNot(index, before)
+        self.assertIs(snapshot.text_index('movies'), before)
+        for query in ('dark knight', 'alien', 'up'):
+            rebuilt = TrigramIndex(edited.movies)
+            self.assertEqual(index.search(query), rebuilt.search(query))
+        self.assertIn(99, index_ids(index, 'the dark knight', 0.9))
+        self.assertNotIn(3, index_ids(index, '', 0.25))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Prefix index for search-box autocomplete.
+
+/cdn/autocomplete is called on every keystroke. Fuzzy-ranking the catalog
+per keystroke (even through the trigram index) costs more as the catalog
+grows, and most keystrokes only extend a word the user is typing.
+AutocompleteIndex answers those from a prefix index built once per catalog
+version (CatalogSnapshot.autocomplete):
+
+- every title is indexed under each of its word suffixes, normalized
+  ("The Dark Knight" -> "the dark knight", "dark knight", "knight"), in one
+  sorted array, so the titles matching a typed prefix at any word boundary
+  are one contiguous range (two binary searches)
+- titles are numbered by popularity (the trending ranking of the with_images
+  lists), and every prefix matching more than AUTOCOMPLETE_TOP_N keys keeps
+  its top AUTOCOMPLETE_TOP_N titles precomputed. A lookup is a dict hit or a
+  scan of at most AUTOCOMPLETE_TOP_N keys, whatever the catalog size.
+
+Successive keystrokes narrow the same range deeper in the index, so no
+per-session state is kept; repeated prefixes are also answered from the ETag
+response cache. When the prefix matches fewer titles than requested (typos,
+words typed out of order) the route fills up with fuzzy matches from the
+trigram index.
+"""
+
+import bisect
+
+# Titles precomputed per prefix (requests for more scan the prefix's range)
+AUTOCOMPLETE_TOP_N = 20
+
+# Sorts after every character a title can contain
+_RANGE_END = '\U0010ffff'
+
+
+def normalize_prefix(text):
+    """Lowercase, collapse whitespace; a trailing space (finished word) is kept."""
+    normalized = ' '.join(text.lower().split())
+    if normalized and text[-1:].isspace():
+        normalized += ' '
+    return normalized
+
+
+def _suggestion(item, media_type):
+    """The suggestion of a title ({id, title} for movies, {id, name} for TV), or None."""
+    if media_type == 'movie':
+        title = item.get('title')
+        return {"id": item.get('id'), "title": title} if isinstance(title, str) else None
+    name = item.get('name')
+    return {"id": item.get('id'), "name": name} if isinstance(name, str) else None
+
+
+class AutocompleteIndex:
+    """
+    Read-only prefix index over the titles of a ranking.
+
+    Args:
+        entries (list): (item, media_type) pairs, most popular first (a
+            RankedView's entries); the index keeps references to the items
+    """
+
+    def __init__(self, entries):
+        # Suggestion per title, in popularity order; a title's number is its index
+        self.suggestions = []
+        self.items = []
+        pairs = []
+        for item, media_type in entries:
+            suggestion = _suggestion(item, media_type)
+            if suggestion is None:
+                continue
+            number = len(self.suggestions)
+            self.suggestions.append(suggestion)
+            self.items.append(item)
+            words = (suggestion.get('title') or suggestion.get('name')).lower().split()
+            for start in range(len(words)):
+                pairs.append((' '.join(words[start:]), number))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.numbers = [number for _, number in pairs]
+
+        # prefix -> best AUTOCOMPLETE_TOP_N title numbers, for prefixes matching more keys
+        self.tops = {}
+        self._build(0, len(self.keys), '')
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def _best(self, lo, hi, limit):
+        """Best `limit` distinct title numbers among keys[lo:hi]."""
+        return sorted(set(self.numbers[lo:hi]))[:limit]
+
+    def _build(self, lo, hi, prefix):
+        """Precompute the tops of `prefix` (keys[lo:hi]) and its longer prefixes; returns its top."""
+        if hi - lo <= AUTOCOMPLETE_TOP_N:
+            return self._best(lo, hi, AUTOCOMPLETE_TOP_N)
+        keys, depth = self.keys, len(prefix)
+        candidates = []
+        # Keys equal to the prefix sort first, then one child range per next character
+        position = lo
+        while position < hi and len(keys[position]) == depth:
+            candidates.append(self.numbers[position])
+            position += 1
+        while position < hi:
+            child = prefix + keys[position][depth]
+            end = bisect.bisect_left(keys, child + _RANGE_END, position, hi)
+            candidates.extend(self._build(position, end, child))
+            position = end
+        top = sorted(set(candidates))[:AUTOCOMPLETE_TOP_N]
+        self.tops[prefix] = top
+        return top
+
+    def lookup(self, prefix, limit=10):
+        """
+        Most popular titles with a word sequence starting with `prefix`.
+
+        Args:
+            prefix (str): Typed text (normalized with normalize_prefix)
+            limit (int): Number of suggestions
+
+        Returns:
+            list: Title numbers (indexes into suggestions / items), most popular first
+        """
+        if limit <= 0:
+            return []
+        prefix = normalize_prefix(prefix)
+        top = self.tops.get(prefix)
+        if top is not None and limit <= AUTOCOMPLETE_TOP_N:
+            return top[:limit]
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + _RANGE_END, lo)
+        return self._best(lo, hi, limit)
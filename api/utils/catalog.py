@@ -0,0 +1,522 @@
+"""
+Immutable, versioned catalog snapshots.
+
+The CDN catalog (movies, TV series and their "with images" subsets) is loaded
+once and shared by every request as a read-only, versioned CatalogSnapshot:
+
+- FrozenDict / FrozenList are dict / list subclasses whose mutating methods
+  raise TypeError; handlers that need to change an item copy it first, e.g.
+  dict(item, watch_history=wh).
+- Each content type has one store keyed by id; the "with images" lists are
+  views onto the same item objects.
+- Indexes, rankings and encoded responses derived from the catalog are kept
+  with the snapshot, built once per version or on first use.
+- apply_edit derives the next version from a single-item edit, sharing
+  everything the edit does not touch.
+"""
+
+import itertools
+import json
+import threading
+import time
+from utils.autocomplete import AutocompleteIndex
+from utils.catalog_index import ColumnarIndex
+from utils.catalog_rankings import RANK_TRENDING, featured_scores, popularity_scores, rank_indexes
+from utils.projection import NAMED_PROJECTIONS, project
+from utils.similarity import SimilarityIndex
+from utils.trigram_index import TrigramIndex
+
+
+class FrozenDict(dict):
+    """Read-only dict used for catalog items."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Catalog items are read-only; copy the item (dict(item)) before changing it")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __ior__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    """Read-only list used for catalog collections."""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Catalog lists are read-only; copy the list (list(items)) before changing it")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    __iadd__ = _readonly
+    __imul__ = _readonly
+    append = _readonly
+    extend = _readonly
+    insert = _readonly
+    pop = _readonly
+    remove = _readonly
+    reverse = _readonly
+    sort = _readonly
+    clear = _readonly
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value, pool=None):
+    """
+    Recursively convert dicts and lists into their read-only counterparts.
+
+    Values that are already frozen are returned as-is, which lets a new
+    snapshot share unchanged items with the previous one.
+
+    Args:
+        value: The value to freeze
+        pool (ValuePool): Share keys and repeated values with other frozen items
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if pool is not None:
+        if isinstance(value, list):
+            return FrozenList(freeze(val, pool) for val in value)
+        return pool.freeze_item(value)
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(val) for key, val in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(val) for val in value)
+    return value
+
+
+class ValuePool:
+    """
+    Shares equal keys and values between frozen catalog items.
+
+    Items loaded from JSON each hold their own copy of every value, although
+    most of them repeat across the catalog: genre strings, language codes,
+    statuses, dates, and nested lists/dicts such as {'id': 18, 'name': 'Drama'}.
+    Items frozen through a pool keep a single shared object for each distinct
+    key, short string (up to MAX_SHARED_STRING characters) and nested
+    container. Items stay FrozenDicts, so readers do not change. Long text such
+    as overviews and numbers are kept as they are.
+
+    The pool lives with the catalog snapshot and is carried over to derived
+    versions, so edited items share values with the rest of the catalog.
+    """
+
+    __slots__ = ('_values',)
+
+    MAX_SHARED_STRING = 64
+
+    def __init__(self):
+        # str -> the shared str; container signature tuple -> the shared container
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def freeze_item(self, item):
+        """Freeze one catalog item; the item itself is not shared, its keys and values are."""
+        if isinstance(item, dict):
+            return FrozenDict({self._string(key): self._share(val) for key, val in item.items()})
+        return self._share(item)
+
+    def _string(self, value):
+        if type(value) is not str or len(value) > self.MAX_SHARED_STRING:
+            return value
+        return self._values.setdefault(value, value)
+
+    def _share(self, value):
+        if isinstance(value, str):
+            return self._string(value)
+        if not isinstance(value, (dict, list)):
+            return value
+        if isinstance(value, dict):
+            frozen = FrozenDict({self._string(key): self._share(val) for key, val in value.items()})
+            signature = (FrozenDict,) + tuple((key, self._token(val)) for key, val in frozen.items())
+        else:
+            frozen = FrozenList(self._share(val) for val in value)
+            signature = (FrozenList,) + tuple(self._token(val) for val in frozen)
+        return self._values.setdefault(signature, frozen)
+
+    @staticmethod
+    def _token(value):
+        # Nested containers all come from the pool, which keeps them alive, so their id() is a stable stand-in;
+        # scalars compare by type and value (1, 1.0 and True are different JSON)
+        if isinstance(value, (FrozenDict, FrozenList)):
+            return (id(value),)
+        return (type(value), value)
+
+
+def thaw(value):
+    """Recursively convert frozen containers back into plain, mutable dicts and lists."""
+    if isinstance(value, dict):
+        return {key: thaw(val) for key, val in value.items()}
+    if isinstance(value, list):
+        return [thaw(val) for val in value]
+    return value
+
+
+def encode_json(value):
+    """Encode a value as compact JSON, with the settings of Flask's jsonify (sorted keys, ASCII)."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=True, separators=(',', ':'))
+
+
+_version_counter = itertools.count(1)
+# Serializes first-use builds of similarity indexes (they take a while on big catalogs)
+_similarity_lock = threading.Lock()
+
+
+def index_by_id(items):
+    """Map id -> item. The first occurrence wins, like a linear next(...) scan would."""
+    store = {}
+    for item in items:
+        store.setdefault(item.get('id'), item)
+    return store
+
+
+def share_items(store, with_images_items):
+    """
+    Replace the items of a "with images" list by the canonical items of the same id.
+
+    Items that only exist in the with_images list are kept as they are.
+
+    Returns:
+        tuple: (list of items, frozenset of ids with images)
+    """
+    view = []
+    ids = set()
+    for item in with_images_items:
+        item_id = item.get('id')
+        view.append(store.get(item_id, item))
+        ids.add(item_id)
+    return view, frozenset(ids)
+
+
+class CatalogSnapshot:
+    """A read-only, versioned view of the whole CDN catalog."""
+
+    __slots__ = ('version', 'created_at', 'movies', 'tv_series',
+                 'movies_with_images', 'tv_series_with_images',
+                 'movies_by_id', 'tv_series_by_id',
+                 'movie_ids_with_images', 'tv_ids_with_images', 'by_id', 'indexes', 'genres',
+                 'rankings', 'autocomplete_index', 'similarity', 'text_indexes', 'fragments', 'pool', 'image')
+
+    def __init__(self, version, movies, tv_series, movies_with_images, tv_series_with_images, pool=None):
+        self.version = version
+        # Shared keys and values of the frozen items (carried over to derived versions)
+        self.pool = pool if pool is not None else ValuePool()
+        self.created_at = time.time()
+        self.movies = movies
+        self.tv_series = tv_series
+        self.movies_by_id = index_by_id(movies)
+        self.tv_series_by_id = index_by_id(tv_series)
+
+        view, self.movie_ids_with_images = share_items(self.movies_by_id, movies_with_images)
+        self.movies_with_images = freeze(view, self.pool)
+        view, self.tv_ids_with_images = share_items(self.tv_series_by_id, tv_series_with_images)
+        self.tv_series_with_images = freeze(view, self.pool)
+
+        # id -> item lookup per list, used by the single-title endpoints
+        self.by_id = {
+            'movies': self.movies_by_id,
+            'tv_series': self.tv_series_by_id,
+            'movies_with_images': index_by_id(self.movies_with_images),
+            'tv_series_with_images': index_by_id(self.tv_series_with_images),
+        }
+
+        self.indexes = {
+            'movies': ColumnarIndex(self.movies, 'movie', self.movie_ids_with_images),
+            'tv_series': ColumnarIndex(self.tv_series, 'tv', self.tv_ids_with_images),
+            'movies_with_images': ColumnarIndex(self.movies_with_images, 'movie', True),
+            'tv_series_with_images': ColumnarIndex(self.tv_series_with_images, 'tv', True),
+        }
+
+        self._compute_genres()
+        # (kind, content_type, with_images) -> RankedView, computed on first use
+        self.rankings = {}
+        # AutocompleteIndex over the with_images lists, built on first use
+        self.autocomplete_index = None
+        # list name -> SimilarityIndex, built on first use (or by the background refresh)
+        self.similarity = {}
+        # list name -> TrigramIndex for fuzzy title search, built on first use
+        self.text_indexes = {}
+        # (id(item), fields) -> (item, JSON text), encoded on first use (see item_json)
+        self.fragments = {}
+        # Memory-mapped texts shared with the other workers (utils/catalog_image.py)
+        self.image = None
+
+    def _compute_genres(self):
+        # Precomputed /cdn/genres responses for this version
+        movie_genres = self.indexes['movies'].genres()
+        tv_genres = self.indexes['tv_series'].genres()
+        self.genres = {
+            'movies': sorted(movie_genres),
+            'tv': sorted(tv_genres),
+            'all': sorted(movie_genres | tv_genres),
+        }
+
+    def _derive(self):
+        """Shallow copy of this snapshot under a new version, for apply_edit()."""
+        snapshot = object.__new__(CatalogSnapshot)
+        for name in self.__slots__:
+            setattr(snapshot, name, getattr(self, name))
+        snapshot.version = next(_version_counter)
+        snapshot.created_at = time.time()
+        snapshot.by_id = dict(self.by_id)
+        snapshot.indexes = dict(self.indexes)
+        snapshot.rankings = {}
+        snapshot.autocomplete_index = None
+        snapshot.similarity = dict(self.similarity)
+        snapshot.text_indexes = dict(self.text_indexes)
+        snapshot.fragments = dict(self.fragments)
+        # The image keeps serving the items this version shares with the one it
+        # was bound to; edited items are encoded per process until the next image
+        return snapshot
+
+    def _edit_list(self, name, item_id, item, has_images):
+        """Replace (or append) the item with `item_id` in one list, or remove it if item is None."""
+        items = getattr(self, name)
+        by_id = dict(self.by_id[name])
+        index = self.indexes[name]
+        similar = self.similarity.get(name)
+        text_index = self.text_indexes.get(name)
+        old = by_id.get(item_id)
+
+        if item is None:
+            if old is None:
+                return
+            positions = [i for i, existing in enumerate(items) if existing.get('id') == item_id]
+            for i in positions:
+                self._drop_fragments(items[i])
+            removed = set(positions)
+            items = FrozenList(existing for i, existing in enumerate(items) if i not in removed)
+            index = index.removed(positions, items)
+            if similar is not None:
+                similar = similar.removed(positions, items)
+            if text_index is not None:
+                text_index = text_index.removed(positions, items)
+            del by_id[item_id]
+        elif old is None:
+            items = FrozenList(itertools.chain(items, (item,)))
+            index = index.appended(item, items, has_images)
+            if similar is not None:
+                similar = similar.appended(item, items)
+            if text_index is not None:
+                text_index = text_index.appended(item, items)
+            by_id[item_id] = item
+        else:
+            position = next(i for i, existing in enumerate(items) if existing is old)
+            self._drop_fragments(old)
+            items = FrozenList(itertools.chain(items[:position], (item,), items[position + 1:]))
+            index = index.replaced(position, item, items, has_images)
+            if similar is not None:
+                similar = similar.replaced(position, item, items)
+            if text_index is not None:
+                text_index = text_index.replaced(position, item, items)
+            by_id[item_id] = item
+
+        setattr(self, name, items)
+        self.by_id[name] = by_id
+        self.indexes[name] = index
+        if similar is not None:
+            self.similarity[name] = similar
+        if text_index is not None:
+            self.text_indexes[name] = text_index
+        if name == 'movies':
+            self.movies_by_id = by_id
+        elif name == 'tv_series':
+            self.tv_series_by_id = by_id
+
+    def ranked(self, kind, content_type='', with_images=False):
+        """
+        Get the discovery ranking of this version (see utils/catalog_rankings.py).
+
+        Args:
+            kind (str): RANK_TRENDING or RANK_FEATURED
+            content_type (str): 'movie', 'tv', or anything else for both
+            with_images (bool): Rank the with_images lists
+
+        Returns:
+            RankedView: Ranked (item, media_type) entries
+        """
+        if content_type not in ('movie', 'tv'):
+            content_type = ''
+        key = (kind, content_type, bool(with_images))
+        view = self.rankings.get(key)
+        if view is None:
+            suffix = '_with_images' if with_images else ''
+            sources = []
+            if content_type != 'tv':
+                sources.append((self.indexes['movies' + suffix], 'movie'))
+            if content_type != 'movie':
+                sources.append((self.indexes['tv_series' + suffix], 'tv'))
+            score = popularity_scores if kind == RANK_TRENDING else featured_scores
+            # Concurrent first requests may both compute it; either result is the same
+            view = self.rankings[key] = rank_indexes(sources, score)
+        return view
+
+    def autocomplete(self):
+        """
+        Get the autocomplete prefix index of this version (see utils/autocomplete.py).
+
+        Covers the with_images lists, titles ordered by the trending ranking.
+        """
+        index = self.autocomplete_index
+        if index is None:
+            # Concurrent first requests may both build it; either result is the same
+            ranking = self.ranked(RANK_TRENDING, '', with_images=True)
+            index = self.autocomplete_index = AutocompleteIndex(ranking.entries)
+        return index
+
+    def similar(self, name):
+        """
+        Get the similarity index of a catalog list (see utils/similarity.py).
+
+        Built on first use unless the background refresh already built it;
+        edits update an existing index incrementally.
+        """
+        index = self.similarity.get(name)
+        if index is None:
+            with _similarity_lock:
+                index = self.similarity.get(name)
+                if index is None:
+                    index = self.similarity[name] = SimilarityIndex(getattr(self, name), name=name)
+        return index
+
+    def text_index(self, name):
+        """
+        Get the trigram index of a catalog list's titles (see utils/trigram_index.py).
+
+        Built on first use; edits update an existing index incrementally.
+        """
+        index = self.text_indexes.get(name)
+        if index is None:
+            # Concurrent first requests may both build it; either result is the same
+            index = self.text_indexes[name] = TrigramIndex(getattr(self, name))
+        return index
+
+    def item_json(self, item, fields=None):
+        """
+        Get the JSON text of a catalog item, encoded once and reused by later requests.
+
+        Items are read-only, so the text stays valid for as long as the item is in
+        the catalog; derived versions carry it over for the items they share.
+
+        Args:
+            item (dict): The catalog item
+            fields (tuple): Projection of the item (see utils/projection.py); only
+                the full item and the named views are kept
+
+        Returns:
+            str: Compact JSON of the (projected) item
+        """
+        if self.image is not None:
+            text = self.image.item_json(item, fields)
+            if text is not None:
+                return text
+        key = (id(item), fields)
+        entry = self.fragments.get(key)
+        if entry is not None and entry[0] is item:
+            return entry[1]
+        text = encode_json(project(item, fields))
+        if isinstance(item, FrozenDict) and (fields is None or fields in NAMED_PROJECTIONS):
+            # The item is kept with its text so a reused id() never matches
+            self.fragments[key] = (item, text)
+        return text
+
+    def _drop_fragments(self, item):
+        self.fragments.pop((id(item), None), None)
+        for fields in NAMED_PROJECTIONS:
+            self.fragments.pop((id(item), fields), None)
+
+    def has_images(self, media_type, item_id):
+        """Check the "has images" flag of a title without scanning the with_images list."""
+        ids = self.movie_ids_with_images if media_type == 'movie' else self.tv_ids_with_images
+        return item_id in ids
+
+    def stats(self):
+        shared = sum(1 for item in self.movies_with_images if self.movies_by_id.get(item.get('id')) is item)
+        shared += sum(1 for item in self.tv_series_with_images if self.tv_series_by_id.get(item.get('id')) is item)
+        return {
+            'version': self.version,
+            'created_at': self.created_at,
+            'movies': len(self.movies),
+            'tv_series': len(self.tv_series),
+            'movies_with_images': len(self.movies_with_images),
+            'tv_series_with_images': len(self.tv_series_with_images),
+            'shared_with_images_items': shared,
+            'pooled_values': len(self.pool),
+        }
+
+
+def apply_edit(snapshot, media_type, item_id, item=None, with_images=False):
+    """
+    Derive the next snapshot version from a single-item put or delete.
+
+    Args:
+        snapshot (CatalogSnapshot): The current version (left untouched)
+        media_type (str): 'movie' or 'tv'
+        item_id: Id of the edited item
+        item (dict): For a put, the new item; it replaces the first item with the
+            same id or is appended. None deletes every item with that id.
+        with_images (bool): For a put, whether the item belongs in the with_images
+            list (an item already listed there is always replaced)
+
+    Returns:
+        CatalogSnapshot: The new version
+    """
+    if media_type == 'movie':
+        main, images, ids_attr = 'movies', 'movies_with_images', 'movie_ids_with_images'
+    else:
+        main, images, ids_attr = 'tv_series', 'tv_series_with_images', 'tv_ids_with_images'
+
+    new = snapshot._derive()
+    ids_with_images = getattr(snapshot, ids_attr)
+    if item is None:
+        ids_with_images = ids_with_images - {item_id}
+        new._edit_list(images, item_id, None, has_images=True)
+        new._edit_list(main, item_id, None, has_images=False)
+    else:
+        item = freeze(item, snapshot.pool)
+        if with_images or item_id in snapshot.by_id[images]:
+            ids_with_images = ids_with_images | {item_id}
+            new._edit_list(images, item_id, item, has_images=True)
+        new._edit_list(main, item_id, item, has_images=item_id in ids_with_images)
+    setattr(new, ids_attr, ids_with_images)
+    new._compute_genres()
+    return new
+
+
+def build_snapshot(movies, tv_series, movies_with_images, tv_series_with_images):
+    """Freeze the given catalog lists (sharing repeated values) and wrap them in a new snapshot version."""
+    pool = ValuePool()
+    return CatalogSnapshot(
+        version=next(_version_counter),
+        movies=freeze(movies or [], pool),
+        tv_series=freeze(tv_series or [], pool),
+        movies_with_images=movies_with_images or [],
+        tv_series_with_images=tv_series_with_images or [],
+        pool=pool,
+    )
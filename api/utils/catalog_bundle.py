@@ -0,0 +1,242 @@
+"""
+Compiled (binary) catalog bundle for fast API startup.
+
+Parsing the four catalog JSON files and walking every item takes most of the
+boot time. After a successful JSON load the parsed catalogs are written to a
+single versioned pickle bundle next to the JSON files; the next boot loads the
+bundle instead and only falls back to JSON for catalogs whose source file has
+changed since the bundle was written.
+
+Bundle layout:
+    MAGIC | pickle(header) | pickle(payload)
+
+The header is small and is read first, so staleness can be checked without
+unpickling the catalog payload. Each catalog records the size, mtime and
+SHA-1 of the JSON file it was built from; a differing mtime only invalidates
+the catalog when the content hash differs too (e.g. files copied by a deploy).
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from utils.catalog import index_by_id, share_items
+from utils.logger import log_info, log_warning, log_error
+
+BUNDLE_FILENAME = 'catalog_snapshot.bin'
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_MAGIC = b'AMANFLIX-CATALOG\n'
+
+# (catalog name, JSON file, media type)
+CATALOG_SOURCES = (
+    ('movies', 'movies_little_clean.json', 'movie'),
+    ('tv_series', 'tv_little_clean.json', 'tv'),
+    ('movies_with_images', 'movies_with_images.json', 'movie'),
+    ('tv_series_with_images', 'tv_with_images.json', 'tv'),
+)
+
+# Delay before rewriting the bundle after a change, so bursts of edits are coalesced
+REFRESH_DELAY_SECONDS = 5
+
+_refresh_timer = None
+_refresh_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_signature(path, with_hash=True):
+    """Return the signature used to detect changes to a JSON source file, or None if missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        signature['sha1'] = _file_sha1(path)
+    return signature
+
+
+def _is_fresh(recorded, path):
+    """Check a recorded signature against the current file (hash only when mtime moved)."""
+    if not recorded:
+        return False
+    current = source_signature(path, with_hash=False)
+    if current is None or current['size'] != recorded.get('size'):
+        return False
+    if current['mtime_ns'] == recorded.get('mtime_ns'):
+        return True
+    return recorded.get('sha1') is not None and _file_sha1(path) == recorded['sha1']
+
+
+def bundle_path(files_dir):
+    return os.path.join(files_dir, BUNDLE_FILENAME)
+
+
+def read_bundle_header(files_dir):
+    """Read only the bundle header. Returns None if the bundle is missing or unreadable."""
+    path = bundle_path(files_dir)
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                return None
+            header = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log_warning(f"Could not read catalog bundle header {path}: {e}")
+        return None
+    if header.get('format') != BUNDLE_FORMAT_VERSION:
+        return None
+    return header
+
+
+def read_bundle(files_dir, names=None):
+    """
+    Load catalogs from the bundle.
+
+    Args:
+        files_dir (str): Directory holding the JSON sources and the bundle
+        names (iterable): Catalog names to return (default: all fresh catalogs)
+
+    Returns:
+        dict: {catalog name: list} for every requested catalog that is still fresh
+    """
+    header = read_bundle_header(files_dir)
+    if header is None:
+        return {}
+
+    fresh = set()
+    for name, filename, _ in CATALOG_SOURCES:
+        if names is not None and name not in names:
+            continue
+        if _is_fresh(header['sources'].get(name), os.path.join(files_dir, filename)):
+            fresh.add(name)
+    if not fresh:
+        return {}
+
+    path = bundle_path(files_dir)
+    try:
+        with open(path, 'rb') as f:
+            f.read(len(BUNDLE_MAGIC))
+            pickle.load(f)  # header
+            payload = pickle.load(f)
+    except Exception as e:
+        log_warning(f"Could not read catalog bundle {path}: {e}")
+        return {}
+    return {name: payload[name] for name in fresh if name in payload}
+
+
+def write_bundle(files_dir, catalogs, signatures):
+    """
+    Atomically write the bundle (temp file + rename).
+
+    Args:
+        catalogs (dict): {catalog name: list of items}
+        signatures (dict): {catalog name: source signature taken BEFORE the source was read}
+    """
+    path = bundle_path(files_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    header = {
+        'format': BUNDLE_FORMAT_VERSION,
+        'created_at': time.time(),
+        'sources': signatures,
+        'counts': {name: len(items) for name, items in catalogs.items()},
+    }
+    with _write_lock:
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(BUNDLE_MAGIC)
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(catalogs, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            log_error(f"Error writing catalog bundle {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+    log_info(f"Catalog bundle written: {path}")
+    return True
+
+
+def load_catalogs(files_dir, json_loader, load_many=None):
+    """
+    Load all catalogs, preferring the bundle and falling back to JSON for stale entries.
+
+    Args:
+        files_dir (str): Directory holding the JSON sources
+        json_loader (callable): json_loader(file_path, media_type) -> list
+        load_many (callable): Optional load_many([(file_path, media_type), ...]) -> [list, ...]
+            used to load all stale sources at once (e.g. in parallel)
+
+    Returns:
+        tuple: ({catalog name: list}, list of catalog names loaded from the bundle)
+    """
+    catalogs = read_bundle(files_dir)
+    from_bundle = sorted(catalogs)
+    stale = len(catalogs) < len(CATALOG_SOURCES)
+
+    if stale:
+        header = read_bundle_header(files_dir) or {}
+        signatures = dict(header.get('sources', {}))
+        jobs = []
+        for name, filename, media_type in CATALOG_SOURCES:
+            if name in catalogs:
+                continue
+            file_path = os.path.join(files_dir, filename)
+            # Take the signature before reading so a concurrent write marks the bundle stale
+            signatures[name] = source_signature(file_path)
+            jobs.append((name, file_path, media_type))
+
+        if load_many is None:
+            loaded = [json_loader(file_path, media_type) for _, file_path, media_type in jobs]
+        else:
+            loaded = load_many([(file_path, media_type) for _, file_path, media_type in jobs])
+        for (name, _, _), items in zip(jobs, loaded):
+            catalogs[name] = items
+
+    # The with_images lists reuse the main catalog items instead of holding a second copy
+    # (pickle keeps the sharing, so the bundle stores every item once)
+    for main_name, images_name in (('movies', 'movies_with_images'), ('tv_series', 'tv_series_with_images')):
+        catalogs[images_name], _ = share_items(index_by_id(catalogs[main_name]), catalogs[images_name])
+
+    if stale:
+        write_bundle(files_dir, catalogs, signatures)
+
+    return catalogs, from_bundle
+
+
+def refresh_bundle(files_dir, json_loader):
+    """Re-compile catalogs whose JSON source changed since the bundle was written."""
+    catalogs = read_bundle(files_dir)
+    if len(catalogs) == len(CATALOG_SOURCES):
+        return False
+    load_catalogs(files_dir, json_loader)
+    return True
+
+
+def schedule_bundle_refresh(files_dir, json_loader, delay=REFRESH_DELAY_SECONDS):
+    """Rewrite the bundle in the background after the JSON sources were changed."""
+    global _refresh_timer
+
+    def _run():
+        try:
+            refresh_bundle(files_dir, json_loader)
+        except Exception as e:
+            log_error(f"Catalog bundle refresh failed: {e}")
+
+    with _refresh_lock:
+        if _refresh_timer is not None:
+            _refresh_timer.cancel()
+        _refresh_timer = threading.Timer(delay, _run)
+        _refresh_timer.daemon = True
+        _refresh_timer.start()
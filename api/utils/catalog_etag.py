@@ -0,0 +1,176 @@
+"""
+Catalog versioning and conditional GETs for the catalog endpoints.
+
+Catalog responses only change when the catalog does, so clients that already
+hold a page do not need it again:
+
+- the catalog version is a process-wide counter, bumped whenever the CDN
+  catalog is rebuilt or edited (app.rebuild_content_indexes) and whenever the
+  cached database movies/shows are invalidated (api.cache)
+- catalog_etag tags each response with an ETag made of the catalog
+  generation, the request path and the normalized query args. The generation
+  names the data the process serves the same way in every worker serving the
+  same data, so a tag one worker issued still matches on another: the CDN
+  catalog base and the edit journal position the catalog includes
+  (utils/catalog_image.py, utils/catalog_journal.py), or a digest of the
+  cached database movies/shows (api.cache.get_content_digest). A CDN catalog
+  with no shared base (single process, whole-catalog change not published
+  yet) falls back to a per-process tag and the version.
+- a request whose If-None-Match already holds the current tag is answered with
+  304 Not Modified before the view runs, so no filtering, ranking or
+  serialization is done and no body is sent
+- other requests for a tag that was served before get the encoded body from
+  the catalog response cache (api.cache.catalog_response_cache), which also
+  skips the view and the JSON encoding
+
+Responses that are not a pure function of the catalog are never tagged or
+cached: ones carrying the user's watch history, and shuffled ones without a
+`seed`.
+"""
+
+import hashlib
+import os
+import threading
+from functools import wraps
+
+from flask import current_app, request
+
+from api.cache import catalog_response_cache
+
+_catalog_version = 0
+_version_lock = threading.Lock()
+
+# Versions restart at 0 with the process; this keeps tags from an earlier run
+# from matching a different catalog with the same version number
+_PROCESS_TAG = os.urandom(4).hex()
+
+# What a tagged endpoint serves: the CDN catalog or the database movies/shows
+SOURCE_CDN = 'cdn'
+SOURCE_CONTENT = 'content'
+
+
+def get_catalog_version():
+    """Get the current catalog version."""
+    return _catalog_version
+
+
+def bump_catalog_version():
+    """
+    Start a new catalog version, invalidating every tag issued so far.
+
+    Call this after the new data is in place, so a tag with the new version is
+    never attached to the old data.
+
+    Returns:
+        int: The new version
+    """
+    global _catalog_version
+    with _version_lock:
+        _catalog_version += 1
+        return _catalog_version
+
+
+def catalog_generation(source=SOURCE_CDN, version=None):
+    """
+    Name the catalog data this process serves, alike in every worker serving it.
+
+    Args:
+        source (str): SOURCE_CDN or SOURCE_CONTENT
+        version (int): Catalog version (default: the current one), used when
+            the CDN catalog has no shared base
+
+    Returns:
+        str: The generation part of the ETag
+    """
+    if source == SOURCE_CONTENT:
+        from api.cache import get_content_digest
+        return f'db{get_content_digest()}'
+
+    from utils.catalog_image import catalog_base
+    from utils.catalog_journal import applied_seq
+    # Journal records are applied before the position moves past them, so the
+    # position read here is never ahead of the data the view will serve
+    seq = applied_seq()
+    base = catalog_base()
+    if base is not None:
+        return f'cat{base}-{seq}'
+    return f'{_PROCESS_TAG}-{_catalog_version if version is None else version}'
+
+
+def catalog_etag_for(path, args, generation=None):
+    """
+    Build the ETag value of a catalog response.
+
+    Args:
+        path (str): Request path
+        args (MultiDict): Query args; their order does not matter
+        generation (str): Catalog generation (default: the current CDN one,
+            see catalog_generation)
+
+    Returns:
+        str: The (unquoted) entity tag
+    """
+    if generation is None:
+        generation = catalog_generation()
+    normalized = '&'.join(f'{key}={value}' for key, value in sorted(args.items(multi=True)))
+    digest = hashlib.sha1(f'{path}?{normalized}'.encode('utf-8')).hexdigest()[:16]
+    return f'{generation}-{digest}'
+
+
+def _is_cacheable(args, random_arg, seeded, watch_history_default):
+    """Whether the response to these args depends on nothing but the catalog."""
+    if args.get('include_watch_history', watch_history_default, type=bool):
+        return False
+    if random_arg is True or (random_arg and args.get(random_arg, False, type=bool)):
+        return seeded and args.get('seed', None, type=int) is not None
+    return True
+
+
+def catalog_etag(random_arg=None, seeded=True, watch_history_default=False, cache=True, source=SOURCE_CDN):
+    """
+    Decorator that adds catalog-version ETags, If-None-Match handling and the
+    response cache to a GET endpoint.
+
+    Args:
+        random_arg (str|bool): Query flag that makes the response shuffled, or
+            True for endpoints that always shuffle
+        seeded (bool): Whether a `seed` arg makes a shuffled response repeatable
+        watch_history_default (bool): The endpoint's default for include_watch_history
+        cache (bool): Whether to keep encoded responses in the response cache;
+            off for endpoints whose response is a single lookup or too large
+        source (str): SOURCE_CDN for endpoints serving the CDN catalog,
+            SOURCE_CONTENT for ones serving the database movies/shows
+
+    Only successful responses are tagged or cached; responses are sent with
+    Cache-Control: no-cache so clients revalidate them on every use.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not _is_cacheable(request.args, random_arg, seeded, watch_history_default):
+                return f(*args, **kwargs)
+
+            # Read the version before the view, so a catalog change while it
+            # runs gives a tag that is already stale rather than one that is wrong
+            version = _catalog_version
+            etag = catalog_etag_for(request.path, request.args, catalog_generation(source, version))
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                cached = catalog_response_cache.get(etag, version) if cache else None
+                if cached is not None:
+                    body, headers = cached
+                    response = current_app.response_class(body, headers=headers)
+                else:
+                    response = current_app.make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if cache and not response.is_streamed:
+                        headers = [(key, value) for key, value in response.headers if key != 'Content-Length']
+                        catalog_response_cache.set(etag, version, response.get_data(), headers)
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,598 @@
+"""
+Shared, memory-mapped catalog image for several worker processes on one host.
+
+What is shared is the encoded catalog: the JSON text of every item, in full
+and in the card view (utils/projection.py), which each worker used to encode
+and keep on its own (the fragment cache of CatalogSnapshot.item_json). List
+responses are assembled from these texts, mapped read-only (mmap) from one
+file per image generation, so their pages are held once per host in the OS
+page cache.
+
+The decoded catalog is not shared: every worker still holds its own snapshot
+of dicts, with its own indexes and rankings, which the request handlers work
+on directly.
+
+Catalog changes reach the other workers two ways:
+
+- Single-item edits go through the edit journal (utils/catalog_journal.py):
+  every worker follows it and applies new records to its own snapshot with
+  catalog.apply_edit. No image is written for them; until the next image,
+  each worker encodes the edited items itself.
+- Whole-catalog changes (admin import, rebuild, files changed on disk) start a
+  new catalog base: the worker writes a new image file and replaces the small
+  pointer file naming the current image (temp file + rename), holding the
+  image lock file (utils/file_lock.py). The other workers check the pointer
+  every POLL_INTERVAL_SECONDS, decode the new image in the background, replay
+  the journal records after it, and switch in one step.
+
+After each compaction of the journal the compacting worker publishes an image
+of the same base. Workers on that base do not decode it: once their journal
+position matches the image's, they map its texts onto the items they already
+hold (CatalogImage.bind). Decoding an image of the same base only happens to
+a worker that fell behind a compaction (its records were folded away before it
+read them).
+
+Every image records its base and the journal position its catalog includes,
+so the (base, position) pair names the same catalog in every worker.
+
+Old image files are deleted once replaced; a worker that still maps one keeps
+reading it (on Windows the delete is retried at the next publish).
+"""
+
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import uuid
+from array import array
+from utils.catalog import encode_json
+from utils.file_lock import file_lock, lock_path
+from utils.logger import log_info, log_warning, log_error
+from utils.projection import CARD_FIELDS, project
+
+IMAGE_PREFIX = 'catalog_image-'
+IMAGE_SUFFIX = '.bin'
+POINTER_FILENAME = 'catalog_image.current'
+IMAGE_FORMAT_VERSION = 2
+IMAGE_MAGIC = b'AMANFLIX-IMAGE\n'
+
+# How often a worker checks whether another worker published a new image
+POLL_INTERVAL_SECONDS = 2
+# Delay before publishing after a whole-catalog change, so bursts are coalesced
+PUBLISH_DELAY_SECONDS = 1
+
+IMAGE_LISTS = ('movies', 'tv_series', 'movies_with_images', 'tv_series_with_images')
+# Stored for items whose id is not an integer
+NO_ID = -1
+
+_HEADER_LENGTH = struct.Struct('<Q')
+
+_files_dir = None
+_get_snapshot = None
+_decode = None
+_install = None
+# File name of the image this process published or switched to last
+_current_name = None
+# Base of the catalog this process holds (None while a new one is unpublished)
+_base = None
+# Number of whole-catalog changes scheduled so far
+_base_changes = 0
+_next_poll = 0.0
+_busy = False
+_publish_pending = False
+_publish_timer = None
+_lock = threading.Lock()
+# Held while this worker moves onto another image
+_switch_lock = threading.RLock()
+
+
+class CatalogImage:
+    """
+    A read-only, memory-mapped catalog image.
+
+    Args:
+        path (str): The image file
+
+    Raises:
+        ValueError: If the file is not a catalog image of this format
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+
+        magic_end = len(IMAGE_MAGIC)
+        if bytes(view[:magic_end]) != IMAGE_MAGIC:
+            raise ValueError(f"Not a catalog image: {path}")
+        (header_length,) = _HEADER_LENGTH.unpack_from(view, magic_end)
+        header_start = magic_end + _HEADER_LENGTH.size
+        header = pickle.loads(view[header_start:header_start + header_length])
+        if header.get('format') != IMAGE_FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+            raise ValueError(f"Unsupported catalog image: {path}")
+
+        self.generation = header['generation']
+        self.base = header['base']
+        self.journal_seq = header['journal_seq']
+        self.created_at = header['created_at']
+        self.sources = header['sources']
+        self.counts = header['counts']
+        self._sections = {}
+        for section, (offset, length) in header['sections'].items():
+            part = view[offset:offset + length]
+            self._sections[section] = part if section.startswith('text_') else part.cast('q')
+        # id(item) -> item number, for the snapshot the image is bound to; the
+        # items are kept so their ids are not reused while the image serves them
+        self._numbers = {}
+        self._items = ()
+
+    def __len__(self):
+        return len(self._sections['ids'])
+
+    def bind(self, snapshot):
+        """
+        Match the items of a snapshot to the texts of the image.
+
+        The snapshot must have been written to the image or decoded from it
+        (load_lists): its items are numbered the same way, which is checked
+        against the stored ids.
+
+        Returns:
+            bool: True if the snapshot matches the image
+        """
+        items, lists = _image_entries(snapshot)
+        ids = self._sections['ids']
+        if len(items) != len(ids) or any(len(lists[name]) != self.counts[name] for name in IMAGE_LISTS):
+            return False
+        for number, item in enumerate(items):
+            if _stored_id(item) != ids[number]:
+                return False
+        self._numbers = {id(item): number for number, item in enumerate(items)}
+        self._items = items
+        return True
+
+    def _text_of(self, table, number):
+        offsets = self._sections[table]
+        return bytes(self._sections[f'text_{table}'][offsets[number]:offsets[number + 1]]).decode('ascii')
+
+    def item_json(self, item, fields=None):
+        """
+        JSON text of a catalog item, as CatalogSnapshot.item_json encodes it.
+
+        Args:
+            item (dict): An item of the snapshot the image is bound to (or of a
+                version derived from it by apply_edit)
+            fields (tuple): Projection of the item
+
+        Returns:
+            str: The text, or None when the image does not have it (other
+                projections, edited items, items of other snapshots)
+        """
+        if fields is None:
+            table = 'full'
+        elif fields == CARD_FIELDS:
+            table = 'card'
+        else:
+            return None
+        number = self._numbers.get(id(item))
+        if number is None or self._items[number] is not item:
+            return None
+        return self._text_of(table, number)
+
+    def load_lists(self):
+        """
+        Decode the catalog lists of the image.
+
+        Returns:
+            dict: {list name: list of item dicts}; an item in several lists is
+                one shared dict
+        """
+        items = [json.loads(self._text_of('full', number)) for number in range(len(self))]
+        return {name: [items[number] for number in self._sections[f'list_{name}']] for name in IMAGE_LISTS}
+
+
+def _stored_id(item):
+    item_id = item.get('id')
+    return item_id if type(item_id) is int and -2 ** 63 < item_id < 2 ** 63 else NO_ID
+
+
+def _image_entries(snapshot):
+    """Distinct items of a snapshot's lists, and each list as item numbers."""
+    numbers, items, lists = {}, [], {}
+    for name in IMAGE_LISTS:
+        positions = array('q')
+        for item in getattr(snapshot, name):
+            number = numbers.get(id(item))
+            if number is None:
+                number = numbers[id(item)] = len(items)
+                items.append(item)
+            positions.append(number)
+        lists[name] = positions
+    return items, lists
+
+
+def write_image(path, snapshot, generation, sources=None, base='', journal_seq=0):
+    """
+    Write the image of a snapshot (temp file + atomic rename).
+
+    Args:
+        path (str): The image file
+        snapshot (CatalogSnapshot): The catalog to write
+        generation (int): Generation number recorded in the image
+        sources (dict): Signatures of the files the catalog was loaded from
+        base (str): Catalog base the snapshot belongs to
+        journal_seq (int): Last edit journal record the snapshot includes
+
+    Returns:
+        bool: True if the image was written
+    """
+    items, lists = _image_entries(snapshot)
+
+    sections = {}
+    for table, fields in (('full', None), ('card', CARD_FIELDS)):
+        text = bytearray()
+        offsets = array('q', [0])
+        for item in items:
+            text += encode_json(project(item, fields)).encode('ascii')
+            offsets.append(len(text))
+        sections[table] = offsets
+        sections[f'text_{table}'] = text
+    sections['ids'] = array('q', (_stored_id(item) for item in items))
+    for name, positions in lists.items():
+        sections[f'list_{name}'] = positions
+
+    header = {
+        'format': IMAGE_FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'generation': generation,
+        'base': base,
+        'journal_seq': journal_seq,
+        'created_at': time.time(),
+        'sources': sources or {},
+        'counts': {name: len(positions) for name, positions in lists.items()},
+    }
+    # Section offsets depend on the header length, which depends on the offsets:
+    # reserve room for the offsets first, then lay the sections out after it
+    header['sections'] = {section: (0, 0) for section in sections}
+    header_room = len(pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)) + 16 * len(sections) + 64
+    offset = len(IMAGE_MAGIC) + _HEADER_LENGTH.size + header_room
+    layout = {}
+    for section, data in sections.items():
+        offset += -offset % 8
+        size = len(data) * data.itemsize if isinstance(data, array) else len(data)
+        layout[section] = (offset, size)
+        offset += size
+    header['sections'] = layout
+    header_bytes = pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(header_bytes) > header_room:
+        log_error(f"Catalog image header does not fit its reserved room ({len(header_bytes)} > {header_room})")
+        return False
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(IMAGE_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for section, data in sections.items():
+                f.seek(layout[section][0])
+                f.write(data.tobytes() if isinstance(data, array) else data)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        log_error(f"Error writing catalog image {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def source_signatures(files_dir):
+    """Size and mtime of the catalog JSON files the catalog is loaded from (the journal is tracked by position)."""
+    from utils.catalog_bundle import CATALOG_SOURCES, source_signature
+
+    paths = [os.path.join(files_dir, filename) for _, filename, _ in CATALOG_SOURCES]
+    return {os.path.basename(path): source_signature(path, with_hash=False) for path in paths}
+
+
+def _pointer_path(files_dir):
+    return os.path.join(files_dir, POINTER_FILENAME)
+
+
+def read_pointer(files_dir):
+    """File name of the current image, or None if no image was published."""
+    try:
+        with open(_pointer_path(files_dir), 'r', encoding='utf-8') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    if not name.startswith(IMAGE_PREFIX) or os.sep in name or (os.altsep and os.altsep in name):
+        return None
+    return name
+
+
+def open_current_image(files_dir):
+    """Map the current image, or None if there is none or it cannot be read."""
+    name = read_pointer(files_dir)
+    if name is None:
+        return None
+    try:
+        return CatalogImage(os.path.join(files_dir, name))
+    except (OSError, ValueError) as e:
+        log_warning(f"Could not map catalog image {name}: {e}")
+        return None
+
+
+def publish_image(files_dir, snapshot, base='', journal_seq=0):
+    """
+    Write a new image generation of a snapshot and make it the current one.
+
+    Args:
+        files_dir (str): Directory holding the catalog files
+        snapshot (CatalogSnapshot): The catalog to publish
+        base (str): Catalog base the snapshot belongs to
+        journal_seq (int): Last edit journal record the snapshot includes
+
+    Returns:
+        CatalogImage: The new image, mapped; None if it could not be written
+    """
+    current = open_current_image(files_dir)
+    generation = (current.generation if current is not None else 0) + 1
+    name = f'{IMAGE_PREFIX}{generation}-{uuid.uuid4().hex[:8]}{IMAGE_SUFFIX}'
+    path = os.path.join(files_dir, name)
+    if not write_image(path, snapshot, generation, source_signatures(files_dir), base, journal_seq):
+        return None
+
+    pointer = _pointer_path(files_dir)
+    tmp_pointer = f"{pointer}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_pointer, 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(tmp_pointer, pointer)
+    except OSError as e:
+        log_error(f"Error publishing catalog image {name}: {e}")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    _remove_old_images(files_dir, keep=name)
+    log_info(f"Catalog image generation {generation} published: {name}")
+    return CatalogImage(path)
+
+
+def _remove_old_images(files_dir, keep):
+    for filename in os.listdir(files_dir):
+        if filename.startswith(IMAGE_PREFIX) and filename.endswith(IMAGE_SUFFIX) and filename != keep:
+            try:
+                os.remove(os.path.join(files_dir, filename))
+            except OSError:
+                pass  # Still mapped by a worker (Windows): removed at a later publish
+
+
+def _attach(snapshot, image):
+    """
+    Serve item JSON from an image written from (or decoded into) a snapshot's items.
+
+    The current snapshot gets the image too: when edits were applied since,
+    it still shares the unedited items with `snapshot`.
+    """
+    global _current_name
+    _current_name = image.name
+    if not image.bind(snapshot):
+        log_warning(f"Catalog image {image.name} does not match the loaded catalog")
+        return False
+    current = _get_snapshot() if _get_snapshot is not None else None
+    for target in (snapshot, current):
+        if target is not None:
+            target.image = image
+            target.fragments = {}
+    return True
+
+
+# Per-process coordination
+
+def catalog_base():
+    """Base of the catalog this process holds; None if images are not shared or a new base is unpublished."""
+    return _base
+
+
+def start_catalog_image(files_dir, get_snapshot, decode, install):
+    """
+    Share the catalog of this process through the image, once it is loaded.
+
+    Maps the current image if it was written from the same catalog files (a
+    worker that loaded the same files holds the same base); otherwise
+    publishes the loaded catalog as a new base.
+
+    Args:
+        files_dir (str): Directory holding the catalog files
+        get_snapshot (callable): Returns the current CatalogSnapshot
+        decode (callable): decode(image) -> CatalogSnapshot of an image's catalog
+        install (callable): install(snapshot) makes a snapshot the current one
+    """
+    global _files_dir, _get_snapshot, _decode, _install, _next_poll, _base, _current_name
+    from utils.catalog_journal import journal_state
+
+    _files_dir, _get_snapshot, _decode, _install = files_dir, get_snapshot, decode, install
+    _next_poll = time.monotonic() + POLL_INTERVAL_SECONDS
+
+    image = open_current_image(files_dir)
+    if image is None or image.sources != source_signatures(files_dir):
+        schedule_image_publish(delay=0)
+        return
+    _base = image.base
+    snapshot, seq = journal_state()
+    if seq == image.journal_seq and _attach(snapshot, image):
+        log_info(f"Mapped catalog image generation {image.generation}")
+    else:
+        # Journal edits since the image: their items are encoded here until the next one
+        _current_name = image.name
+
+
+def schedule_image_publish(delay=PUBLISH_DELAY_SECONDS):
+    """
+    Publish the current snapshot as a new catalog base in the background, after
+    a whole-catalog change (single-item edits travel through the journal).
+
+    Args:
+        delay (float): Seconds to wait, coalescing the changes made meanwhile
+    """
+    global _base, _base_changes
+    if _files_dir is None:
+        return
+    with _lock:
+        _base = None
+        _base_changes += 1
+    _schedule_publish(delay)
+
+
+def publish_compacted_image():
+    """
+    Publish this worker's catalog as an image of its base, after a journal
+    compaction folded records the other workers may not have read yet.
+
+    Returns:
+        bool: False if the image could not be written; True once it is, or
+            when there is nothing to publish (images not shared, or a new base
+            is about to be published anyway)
+    """
+    if _files_dir is None:
+        return True
+    with _lock:
+        if _publish_pending or _base is None:
+            return True
+    return _publish(new_base=False)
+
+
+def recover_from_image():
+    """
+    Rebuild this worker's catalog from the current image, for a worker that
+    fell behind a compaction.
+
+    Returns:
+        bool: False if there is no image to rebuild from
+    """
+    image = open_current_image(_files_dir) if _files_dir is not None else None
+    if image is None:
+        return False
+    _switch(image, decode=True)
+    return True
+
+
+def _switch(image, decode=False):
+    """Move this worker onto an image another worker published."""
+    global _base, _current_name
+    from utils.catalog_journal import journal_state, rebase_journal, sync_journal
+
+    with _switch_lock:
+        if image.base == _base and not decode and sync_journal(_files_dir):
+            # Same base: this worker has the catalog already, so only the texts
+            # are taken over, once its journal position matches the image's
+            snapshot, seq = journal_state()
+            if seq != image.journal_seq or not _attach(snapshot, image):
+                _current_name = image.name
+            return
+
+        snapshot = _decode(image)
+        _attach(snapshot, image)
+        caught_up = rebase_journal(_files_dir, lambda: _install(snapshot), image.journal_seq)
+        with _lock:
+            _base = image.base
+        log_info(f"Switched to catalog image generation {image.generation}")
+        if not caught_up:
+            log_warning(f"Catalog image {image.name} is older than the edit journal; waiting for a newer one")
+
+
+def _publish(new_base):
+    global _base
+    from utils.catalog_journal import journal_state, sync_journal
+
+    with _lock:
+        changes = _base_changes
+    with file_lock(lock_path(_files_dir, 'catalog_image')):
+        current = open_current_image(_files_dir)
+        if not new_base and current is not None and current.base != _base:
+            # Another worker changed the whole catalog: build on that one
+            _switch(current, decode=True)
+        sync_journal(_files_dir)
+        snapshot, seq = journal_state()
+        base = uuid.uuid4().hex[:12] if new_base else _base
+        image = publish_image(_files_dir, snapshot, base, seq)
+    if image is None:
+        return False
+    _attach(snapshot, image)
+    with _lock:
+        # Unless another whole-catalog change is already waiting for its image
+        if _base_changes == changes:
+            _base = base
+    return True
+
+
+def _schedule_publish(delay):
+    global _publish_timer, _publish_pending
+
+    def _run():
+        global _publish_pending
+        try:
+            _publish(new_base=True)
+        except Exception as e:
+            log_error(f"Catalog image publish failed: {e}")
+        finally:
+            with _lock:
+                # Still pending if another change was scheduled meanwhile
+                if _publish_timer is timer:
+                    _publish_pending = False
+
+    with _lock:
+        _publish_pending = True
+        if _publish_timer is not None:
+            _publish_timer.cancel()
+        timer = _publish_timer = threading.Timer(delay, _run)
+        timer.daemon = True
+        timer.start()
+
+
+def poll_catalog_image():
+    """
+    Switch to an image another worker published, at most every POLL_INTERVAL_SECONDS.
+
+    Cheap enough for the request path: the pointer file is read at most once
+    per interval and the switch runs in the background.
+    """
+    global _next_poll, _busy
+    if _files_dir is None or time.monotonic() < _next_poll:
+        return
+    with _lock:
+        if _busy or time.monotonic() < _next_poll:
+            return
+        _next_poll = time.monotonic() + POLL_INTERVAL_SECONDS
+        # A whole-catalog change of this worker is about to be published over it
+        if _publish_pending:
+            return
+        name = read_pointer(_files_dir)
+        if name is None or name == _current_name:
+            return
+        _busy = True
+
+    def _run():
+        global _busy
+        try:
+            image = open_current_image(_files_dir)
+            if image is not None and image.name != _current_name:
+                _switch(image)
+        except Exception as e:
+            log_error(f"Catalog image switch failed: {e}")
+        finally:
+            with _lock:
+                _busy = False
+
+    threading.Thread(target=_run, name='catalog-image', daemon=True).start()
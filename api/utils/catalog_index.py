@@ -0,0 +1,399 @@
+"""
+Columnar filter index over a catalog list.
+
+The list endpoints filter the catalog by rating, year, genre, media type and
+"has images" on every request. Doing that over the item dicts means re-parsing
+vote_average strings, date prefixes and genre strings per item per request.
+ColumnarIndex parses every item once and keeps the filterable fields as
+columns (NumPy arrays when NumPy is installed), so a filter becomes a few
+boolean-mask operations whose cost stays flat as the catalog grows.
+
+Genres are normalized once into canonical genre ids (shared by every index)
+with an inverted index genre id -> sorted item positions. A genre filter is a
+set intersection/union of those postings, and the remaining filters are only
+evaluated on the matching positions.
+
+Single-item edits (replaced/appended/removed) return a new index that copies
+the columns and only touches the postings of the edited item's genres.
+
+Filter semantics match the per-item helpers they replace:
+- vote_average: missing/None counts as 0, unparseable strings never match
+- year: first four characters of release_date (movies) / first_air_date (tv),
+  items without a date never match a year filter
+- genre: comma separated request; "Action, Drama" style strings must contain
+  ALL requested genres, list-of-dict genres must contain ANY requested genre as
+  a substring of a genre name (see cdn.utils.filter_valid_genres)
+"""
+
+import bisect
+import math
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+from utils.cursors import item_id
+
+GENRES_NONE = 0
+GENRES_STRING = 1
+GENRES_LIST = 2
+
+MEDIA_TYPE_CODES = {'movie': 0, 'tv': 1}
+
+_MISSING_YEAR = -(2 ** 31)
+
+# Per-item columns, in the order ColumnarIndex._row() returns them
+COLUMNS = ('rating', 'year', 'popularity', 'vote_count', 'media_type_code', 'has_images')
+COLUMN_DTYPES = {} if np is None else {
+    'rating': np.float64,
+    'year': np.int32,
+    'popularity': np.float64,
+    'vote_count': np.float64,
+    'media_type_code': np.int8,
+    'has_images': bool,
+}
+
+# Canonical genre ids: normalized genre name -> id, stable for the process lifetime
+_genre_ids = {}
+_genre_ids_lock = threading.Lock()
+
+
+def genre_id(name):
+    """Return the canonical id of a normalized (lowercased) genre name."""
+    gid = _genre_ids.get(name)
+    if gid is None:
+        with _genre_ids_lock:
+            gid = _genre_ids.setdefault(name, len(_genre_ids))
+    return gid
+
+
+def _parse_number(value, default=0.0):
+    value = value or default
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    return math.nan
+
+
+def _parse_year(item, date_fields):
+    date_str = next((item.get(field) for field in date_fields if item.get(field)), '')
+    try:
+        return int(str(date_str)[:4])
+    except (ValueError, TypeError):
+        return _MISSING_YEAR
+
+
+def normalize_genres(value):
+    """Return (form, set of normalized genre names) for an item's genres field."""
+    if isinstance(value, str):
+        return GENRES_STRING, {g.strip().lower() for g in value.split(',')}
+    if isinstance(value, list):
+        return GENRES_LIST, {(g['name'] or '').lower() for g in value if isinstance(g, dict) and 'name' in g}
+    return GENRES_NONE, set()
+
+
+def parse_genre_query(genre):
+    """Split a ?genre= value the same way filter_valid_genres does."""
+    return [g.strip().lower() for g in genre.split(',')]
+
+
+def _insert_position(postings, position):
+    """Return ascending postings with `position` added (postings may be None)."""
+    if np is not None:
+        if postings is None:
+            return np.array([position], dtype=np.int64)
+        return np.insert(postings, np.searchsorted(postings, position), position)
+    values = list(postings or ())
+    bisect.insort(values, position)
+    return tuple(values)
+
+
+def _discard_position(postings, position):
+    if np is not None:
+        return postings[postings != position]
+    return tuple(p for p in postings if p != position)
+
+
+def _drop_positions(postings, removed):
+    """Remove the sorted `removed` positions from postings and renumber the rest."""
+    if np is not None:
+        removed = np.asarray(removed, dtype=np.int64)
+        kept = postings[~np.isin(postings, removed)]
+        return kept - np.searchsorted(removed, kept)
+    removed_set = set(removed)
+    return tuple(p - bisect.bisect_left(removed, p) for p in postings if p not in removed_set)
+
+
+def _default_has_images(item):
+    return bool(item.get('poster_path')) and bool(item.get('backdrop_path'))
+
+
+class ColumnarIndex:
+    """
+    Read-only column store for one catalog list.
+
+    Args:
+        items (list): Catalog items; the index keeps a reference and never mutates them
+        media_type (str): 'movie' or 'tv' (decides which date field gives the year)
+        has_images (callable|set|bool): per-item "has images" flag; a set is
+            matched against item ids, True marks every item (with_images lists)
+        date_fields (tuple): fields tried in order for the year (default by media type)
+    """
+
+    def __init__(self, items, media_type, has_images=None, date_fields=None):
+        self.items = items
+        self.media_type = media_type
+        if date_fields is None:
+            date_fields = ('release_date',) if media_type == 'movie' else ('first_air_date',)
+        self.date_fields = date_fields
+
+        if has_images is None:
+            has_images = _default_has_images
+        elif has_images is True:
+            has_images = lambda item: True
+        elif isinstance(has_images, (set, frozenset)):
+            ids_with_images = has_images
+            has_images = lambda item: item.get('id') in ids_with_images
+        self._has_images = has_images
+
+        columns = tuple([] for _ in COLUMNS)
+        # Inverted index per genre form: canonical genre id -> ascending item positions
+        string_postings, list_postings = {}, {}
+        # Canonical genre id -> normalized name, for the genres present in this list
+        self.genre_names = {}
+
+        for position, item in enumerate(items):
+            for column, value in zip(columns, self._row(item)):
+                column.append(value)
+
+            form, names = normalize_genres(item.get('genres'))
+            postings = string_postings if form == GENRES_STRING else list_postings
+            for name in names:
+                gid = genre_id(name)
+                self.genre_names[gid] = name
+                postings.setdefault(gid, []).append(position)
+
+        if np is not None:
+            for name, values in zip(COLUMNS, columns):
+                setattr(self, name, np.array(values, dtype=COLUMN_DTYPES[name]))
+            to_postings = lambda positions: np.array(positions, dtype=np.int64)
+        else:
+            for name, values in zip(COLUMNS, columns):
+                setattr(self, name, values)
+            to_postings = tuple
+        self.string_postings = {gid: to_postings(p) for gid, p in string_postings.items()}
+        self.list_postings = {gid: to_postings(p) for gid, p in list_postings.items()}
+
+    def _row(self, item, has_images=None):
+        """Parse the column values of one item, in COLUMNS order."""
+        return (
+            _parse_number(item.get('vote_average', 0)),
+            _parse_year(item, self.date_fields),
+            _parse_number(item.get('popularity'), default=math.nan),
+            _parse_number(item.get('vote_count'), default=math.nan),
+            MEDIA_TYPE_CODES.get(item.get('media_type') or self.media_type, -1),
+            self._has_images(item) if has_images is None else bool(has_images),
+        )
+
+    # Incremental updates: each returns a new index for the edited list and leaves
+    # this one untouched, sharing every posting list that did not change.
+
+    def _derive(self, items):
+        index = object.__new__(ColumnarIndex)
+        index.__dict__.update(self.__dict__)
+        index.items = items
+        index.string_postings = dict(self.string_postings)
+        index.list_postings = dict(self.list_postings)
+        index.genre_names = dict(self.genre_names)
+        index.__dict__.pop('_positions_by_id', None)
+        return index
+
+    def _add_genres(self, position, item):
+        form, names = normalize_genres(item.get('genres'))
+        postings = self.string_postings if form == GENRES_STRING else self.list_postings
+        for name in names:
+            gid = genre_id(name)
+            self.genre_names[gid] = name
+            postings[gid] = _insert_position(postings.get(gid), position)
+
+    def _remove_genres(self, position, item):
+        form, names = normalize_genres(item.get('genres'))
+        postings = self.string_postings if form == GENRES_STRING else self.list_postings
+        for name in names:
+            gid = genre_id(name)
+            remaining = _discard_position(postings[gid], position)
+            if len(remaining):
+                postings[gid] = remaining
+            else:
+                del postings[gid]
+                if gid not in self.string_postings and gid not in self.list_postings:
+                    del self.genre_names[gid]
+
+    def replaced(self, position, item, items, has_images=None):
+        """Return the index of `items`: this list with the item at `position` replaced by `item`."""
+        index = self._derive(items)
+        for name, value in zip(COLUMNS, self._row(item, has_images)):
+            column = getattr(self, name).copy()
+            column[position] = value
+            setattr(index, name, column)
+        index._remove_genres(position, self.items[position])
+        index._add_genres(position, item)
+        return index
+
+    def appended(self, item, items, has_images=None):
+        """Return the index of `items`: this list with `item` appended."""
+        index = self._derive(items)
+        for name, value in zip(COLUMNS, self._row(item, has_images)):
+            column = getattr(self, name)
+            if np is not None:
+                column = np.concatenate((column, np.array([value], dtype=column.dtype)))
+            else:
+                column = column + [value]
+            setattr(index, name, column)
+        index._add_genres(len(self.items), item)
+        return index
+
+    def removed(self, positions, items):
+        """Return the index of `items`: this list without the items at `positions`."""
+        positions = sorted(positions)
+        index = self._derive(items)
+        if np is not None:
+            removed = np.array(positions, dtype=np.int64)
+            for name in COLUMNS:
+                setattr(index, name, np.delete(getattr(self, name), removed))
+        else:
+            removed = set(positions)
+            for name in COLUMNS:
+                setattr(index, name, [v for i, v in enumerate(getattr(self, name)) if i not in removed])
+
+        # Drop the removed positions and shift the ones after them
+        for postings in (index.string_postings, index.list_postings):
+            for gid, values in list(postings.items()):
+                remaining = _drop_positions(values, positions)
+                if len(remaining):
+                    postings[gid] = remaining
+                else:
+                    del postings[gid]
+        index.genre_names = {
+            gid: name for gid, name in self.genre_names.items()
+            if gid in index.string_postings or gid in index.list_postings
+        }
+        return index
+
+    def __len__(self):
+        return len(self.items)
+
+    def position_of(self, last_id):
+        """
+        Position of the item with the given id (utils.cursors.item_id), or None.
+
+        The id -> position map is built on first use and kept with this index,
+        which is replaced rather than changed when the list changes.
+        """
+        positions = self.__dict__.get('_positions_by_id')
+        if positions is None:
+            positions = {item_id(item): position for position, item in enumerate(self.items)}
+            self._positions_by_id = positions
+        return positions.get(last_id)
+
+    def genres(self):
+        """Return the set of normalized genre names present in this list."""
+        return set(self.genre_names.values())
+
+    def _genre_postings(self, genre):
+        """
+        Return the postings to combine for a genre query.
+
+        Returns:
+            tuple: (postings that must ALL contain a string-genre item, or None if
+                    a requested genre is unknown; postings of which ANY must contain
+                    a list-genre item)
+        """
+        requested = parse_genre_query(genre)
+        required = []
+        for name in requested:
+            postings = self.string_postings.get(_genre_ids.get(name))
+            if postings is None:
+                required = None
+                break
+            required.append(postings)
+        accepted = [
+            postings for gid, postings in self.list_postings.items()
+            if any(g in self.genre_names[gid] for g in requested)
+        ]
+        return required, accepted
+
+    def genre_positions(self, genre):
+        """Return the ascending positions of the items matching a genre query."""
+        required, accepted = self._genre_postings(genre)
+        if np is None:
+            matches = set()
+            if required:
+                matches = set.intersection(*(set(p) for p in required))
+            for postings in accepted:
+                matches.update(postings)
+            return sorted(matches)
+
+        parts = []
+        if required:
+            required.sort(key=len)
+            matches = required[0]
+            for postings in required[1:]:
+                matches = np.intersect1d(matches, postings, assume_unique=True)
+            parts.append(matches)
+        parts.extend(accepted)
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    def positions(self, min_rating=0, max_rating=10, genre='', year=None, media_type=None, with_images=False):
+        """Return the ascending positions of the items that pass every filter."""
+        if np is None:
+            return self._positions_python(min_rating, max_rating, genre, year, media_type, with_images)
+
+        # Narrow to the genre postings first, then evaluate the columns on those rows only
+        candidates = self.genre_positions(genre) if genre else None
+
+        def column(values):
+            return values if candidates is None else values[candidates]
+
+        rating = column(self.rating)
+        mask = (rating >= min_rating) & (rating <= max_rating)
+        if year is not None:
+            mask &= column(self.year) == year
+        if media_type is not None:
+            mask &= column(self.media_type_code) == MEDIA_TYPE_CODES.get(media_type, -2)
+        if with_images:
+            mask &= column(self.has_images)
+
+        if candidates is None:
+            return np.flatnonzero(mask).tolist()
+        return candidates[mask].tolist()
+
+    def _positions_python(self, min_rating, max_rating, genre, year, media_type, with_images):
+        candidates = self.genre_positions(genre) if genre else range(len(self.items))
+        type_code = MEDIA_TYPE_CODES.get(media_type, -2) if media_type is not None else None
+
+        result = []
+        for i in candidates:
+            if not (min_rating <= self.rating[i] <= max_rating):
+                continue
+            if year is not None and self.year[i] != year:
+                continue
+            if type_code is not None and self.media_type_code[i] != type_code:
+                continue
+            if with_images and not self.has_images[i]:
+                continue
+            result.append(i)
+        return result
+
+    def filter(self, **filters):
+        """Return the items that pass every filter, in catalog order (see positions())."""
+        items = self.items
+        return [items[i] for i in self.positions(**filters)]
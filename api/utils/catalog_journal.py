@@ -0,0 +1,478 @@
+"""
+Append-only journal for single-item catalog edits.
+
+Editing one title from the CDN admin used to rewrite the whole catalog JSON
+file (and its with_images file) and rebuild every index, per click. Instead,
+each edit is now:
+
+1. appended as one JSON line to the journal file (flushed and fsync'd), then
+2. applied to the in-memory catalog incrementally (data_helpers.apply_catalog_edit).
+
+A background compactor folds the journal into the base JSON files: it rotates
+the journal, replays the rotated records onto the catalog files they touch as
+read from disk, writes those files (temp file + atomic rename) and deletes the
+rotated journal. At startup a journal left over from the previous run (rotated
+or not) is replayed on top of the loaded catalogs. Replaying a record twice
+gives the same result, so a crash at any point of a compaction loses nothing.
+
+Every worker process appends to the same journal, follows it and runs a
+compactor. Records are numbered (seq); each worker applies the records of the
+other workers, in journal order, to its own catalog: before appending one of
+its own and every FOLLOW_INTERVAL_SECONDS in the background. Appends and
+rotation hold the journal lock file, and a compaction (or a catalog load)
+holds the compaction lock file (utils/file_lock.py), so one process compacts at
+a time and no record is rotated away while another worker is appending it.
+Compaction never writes a worker's in-memory catalog, which may not have the
+edits of the other workers yet. After writing the files it publishes a catalog
+image (utils/catalog_image.py) before deleting the rotated records, so a worker
+that had not read them yet can catch up from the image.
+
+Record format (one per line):
+    {"op": "put", "seq": 7, "type": "movie", "id": 123, "item": {...}, "with_images": true}
+    {"op": "delete", "seq": 8, "type": "tv", "id": 456}
+    {"op": "start", "seq": 8}    first line after a rotation: records up to 8 are
+                                 in the catalog files
+"""
+
+import json
+import os
+import threading
+import time
+from utils.catalog_image import publish_compacted_image, recover_from_image
+from utils.data_helpers import apply_catalog_edit, get_catalog_snapshot
+from utils.file_lock import file_lock, lock_path
+from utils.logger import log_info, log_warning, log_error
+
+JOURNAL_FILENAME = 'catalog_journal.jsonl'
+ROTATED_SUFFIX = '.compacting'
+
+# The compactor runs at least this often while there are journaled edits...
+COMPACT_INTERVAL_SECONDS = 60
+# ...and right away once this many edits are pending
+COMPACT_MAX_RECORDS = 200
+# How often a worker reads the records the other workers appended
+FOLLOW_INTERVAL_SECONDS = 1
+
+EDIT_OPS = ('put', 'delete')
+
+# media type -> (main catalog name, file), (with_images catalog name, file)
+CATALOG_FILES = {
+    'movie': (('movies', 'movies_little_clean.json'), ('movies_with_images', 'movies_with_images.json')),
+    'tv': (('tv_series', 'tv_little_clean.json'), ('tv_series_with_images', 'tv_with_images.json')),
+}
+
+# Tags load_catalog_file adds to every loaded item (utils/catalog_loader.py);
+# journaled items carry them, the catalog files do not
+LOAD_TAGS = ('media_type', 'dir_type')
+
+# Orders journal appends, in-memory applies and journal rotation (within the
+# process; the journal lock file orders them between processes)
+_journal_lock = threading.Lock()
+# seq of the last record the in-memory catalog of this process includes
+_applied_seq = 0
+_pending = 0
+_wakeup = threading.Event()
+_compactor = None
+_follower = None
+
+
+def journal_path(files_dir):
+    return os.path.join(files_dir, JOURNAL_FILENAME)
+
+
+def _journal_file_lock(files_dir):
+    return file_lock(lock_path(files_dir, 'catalog_journal'))
+
+
+def compaction_lock(files_dir, blocking=True):
+    """
+    Hold the compaction lock: no process folds the journal into the catalog
+    files meanwhile, so the files and the journal can be read as one state.
+
+    Yields:
+        bool: True while the lock is held (see utils.file_lock.file_lock)
+    """
+    return file_lock(lock_path(files_dir, 'catalog_compaction'), blocking)
+
+
+def _read_records(path):
+    """Read the records of a journal file, skipping lines that are not valid JSON (torn writes)."""
+    records = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    log_warning(f"Skipping unreadable catalog journal record {path}:{line_number}")
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _read_all(files_dir):
+    """The records of the rotated journal and the journal, start lines included."""
+    path = journal_path(files_dir)
+    return _read_records(path + ROTATED_SUFFIX) + _read_records(path)
+
+
+def _is_edit(record):
+    return isinstance(record, dict) and record.get('op') in EDIT_OPS
+
+
+def _is_start(record):
+    return isinstance(record, dict) and record.get('op') == 'start'
+
+
+def _seq(record):
+    seq = record.get('seq') if isinstance(record, dict) else None
+    return seq if type(seq) is int else 0
+
+
+def _last_seq(records):
+    return max((_seq(record) for record in records), default=0)
+
+
+def read_journal(files_dir):
+    """Return every journaled edit not yet folded into the base files, oldest first."""
+    return [record for record in _read_all(files_dir) if _is_edit(record)]
+
+
+def _append_record(files_dir, record):
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    with open(journal_path(files_dir), 'a', encoding='utf-8') as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def record_edit(files_dir, media_type, item_id, item=None, with_images=False):
+    """
+    Journal a single-item edit and apply it to the in-memory catalog.
+
+    Args:
+        files_dir (str): Directory holding the catalog JSON files
+        media_type (str): 'movie' or 'tv'
+        item_id: Id of the edited item
+        item (dict): The full new item for a put, None for a delete
+        with_images (bool): For a put, whether the item belongs in the with_images list
+
+    Returns:
+        CatalogSnapshot: The catalog snapshot that includes the edit
+    """
+    global _applied_seq, _pending
+    record = {'op': 'put' if item is not None else 'delete', 'type': media_type, 'id': item_id}
+    if item is not None:
+        record['item'] = item
+        record['with_images'] = bool(with_images)
+
+    with _journal_lock:
+        with _journal_file_lock(files_dir):
+            # Apply the other workers' records first, so every worker applies them in journal order
+            caught_up, last_seq = _catch_up(files_dir)
+            record['seq'] = max(last_seq, _applied_seq) + 1
+            _append_record(files_dir, record)
+        snapshot = apply_catalog_edit(media_type, item_id, item, with_images)
+        if caught_up:
+            _applied_seq = record['seq']
+        _pending += 1
+        if _pending >= COMPACT_MAX_RECORDS:
+            _wakeup.set()
+    return snapshot
+
+
+def _catch_up(files_dir):
+    """
+    Apply the journal records this process has not applied yet (caller holds
+    _journal_lock and the journal lock file).
+
+    Returns:
+        tuple: (False if records it had not applied were already folded into
+            the files and removed, last seq in the journal)
+    """
+    global _applied_seq, _pending
+    records = _read_all(files_dir)
+    last_seq = _last_seq(records)
+    floor = _seq(records[0]) if records and _is_start(records[0]) else 0
+    if _applied_seq < floor:
+        return False, last_seq
+    for record in records:
+        if not _is_edit(record) or _seq(record) <= _applied_seq:
+            continue
+        try:
+            apply_catalog_edit(record['type'], record['id'], record.get('item'), record.get('with_images', False))
+        except (KeyError, TypeError, ValueError) as e:
+            log_warning(f"Skipping invalid catalog journal record {record!r}: {e}")
+        _applied_seq = _seq(record)
+        _pending += 1
+    if _pending >= COMPACT_MAX_RECORDS:
+        _wakeup.set()
+    return True, last_seq
+
+
+def sync_journal(files_dir):
+    """
+    Apply the records the other workers appended since this process last read the journal.
+
+    Returns:
+        bool: False if some of them were already folded into the files (the
+            catalog has to be rebuilt from an image, see rebase_journal)
+    """
+    with _journal_lock, _journal_file_lock(files_dir):
+        return _catch_up(files_dir)[0]
+
+
+def journal_state():
+    """The current catalog snapshot and the seq of the last record it includes."""
+    with _journal_lock:
+        return get_catalog_snapshot(), _applied_seq
+
+
+def applied_seq():
+    """seq of the last journal record the in-memory catalog includes."""
+    return _applied_seq
+
+
+def rebase_journal(files_dir, install, seq):
+    """
+    Install a catalog that includes the journal up to `seq` (decoded from a
+    catalog image), then apply the records after it.
+
+    Args:
+        files_dir (str): Directory holding the journal
+        install (callable): Makes the catalog the current one
+        seq (int): seq of the last record the catalog includes
+
+    Returns:
+        bool: False if records after `seq` were already folded away
+    """
+    global _applied_seq
+    with _journal_lock, _journal_file_lock(files_dir):
+        install()
+        _applied_seq = seq
+        return _catch_up(files_dir)[0]
+
+
+def _put(items, positions, item):
+    existing = positions.get(item.get('id'))
+    if existing:
+        items[existing[0]] = item
+    else:
+        positions[item.get('id')] = [len(items)]
+        items.append(item)
+
+
+def replay_journal(files_dir, catalogs):
+    """
+    Apply the journaled edits to freshly loaded catalogs, in place.
+
+    Args:
+        files_dir (str): Directory holding the catalog JSON files and the journal
+        catalogs (dict): {catalog name: list} as returned by catalog_bundle.load_catalogs
+
+    The catalogs become the catalog of this process: records after the
+    replayed ones are applied to it by sync_journal.
+
+    Returns:
+        int: Number of replayed records
+    """
+    global _applied_seq
+    records = _read_all(files_dir)
+    edits = [record for record in records if _is_edit(record)]
+    if edits:
+        _apply_records(edits, catalogs)
+    _applied_seq = _last_seq(records)
+    return len(edits)
+
+
+def _apply_records(records, catalogs):
+    """Apply journal records to {catalog name: list} in place."""
+    # id -> positions per list, built only for the lists the journal touches
+    positions = {}
+
+    def positions_of(name):
+        if name not in positions:
+            by_id = positions[name] = {}
+            for i, item in enumerate(catalogs[name]):
+                by_id.setdefault(item.get('id'), []).append(i)
+        return positions[name]
+
+    for record in records:
+        try:
+            (main, _), (images, _) = CATALOG_FILES[record['type']]
+            item_id = record['id']
+            if record['op'] == 'delete':
+                for name in (main, images):
+                    for i in positions_of(name).pop(item_id, ()):
+                        catalogs[name][i] = None
+            elif record['op'] == 'put':
+                item = record['item']
+                _put(catalogs[main], positions_of(main), item)
+                if record.get('with_images') or positions_of(images).get(item_id):
+                    _put(catalogs[images], positions_of(images), item)
+        except (KeyError, TypeError) as e:
+            log_warning(f"Skipping invalid catalog journal record {record!r}: {e}")
+
+    for name in positions:
+        catalogs[name][:] = [item for item in catalogs[name] if item is not None]
+
+
+def _without_load_tags(record):
+    item = record.get('item')
+    if not isinstance(item, dict) or not any(tag in item for tag in LOAD_TAGS):
+        return record
+    return dict(record, item={key: value for key, value in item.items() if key not in LOAD_TAGS})
+
+
+def _write_json_atomic(path, items):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def compact_journal(files_dir, on_compacted=None, blocking=True):
+    """
+    Fold the journal into the base JSON files.
+
+    Args:
+        files_dir (str): Directory holding the catalog JSON files and the journal
+        on_compacted (callable): Called after base files were rewritten
+        blocking (bool): Wait for a compaction running in another process and
+            then fold what is left; otherwise leave the journal to that one
+
+    Returns:
+        int: Number of folded records
+    """
+    global _pending
+    path = journal_path(files_dir)
+    rotated = path + ROTATED_SUFFIX
+
+    with compaction_lock(files_dir, blocking) as locked:
+        if not locked:
+            return 0
+        with _journal_lock, _journal_file_lock(files_dir):
+            if not os.path.exists(rotated) and not any(_is_edit(record) for record in _read_records(path)):
+                _pending = 0
+                return 0
+            if os.path.exists(path):
+                if os.path.exists(rotated):
+                    # A previous compaction failed: keep its records in front of the new ones
+                    with open(rotated, 'ab') as dst, open(path, 'rb') as src:
+                        dst.write(src.read())
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(path)
+                else:
+                    os.replace(path, rotated)
+            # The new journal starts where the rotated one ends
+            _append_record(files_dir, {'op': 'start', 'seq': _last_seq(_read_records(rotated))})
+            _pending = 0
+
+        records = [record for record in _read_records(rotated) if _is_edit(record)]
+        if not records:
+            if os.path.exists(rotated):
+                os.remove(rotated)
+            return 0
+
+        # Replay the records onto the files as stored, not onto this worker's
+        # snapshot, which may lack the edits journaled by other workers
+        files = {}
+        for media_type in sorted({record.get('type') for record in records} & set(CATALOG_FILES)):
+            for name, filename in CATALOG_FILES[media_type]:
+                file_path = os.path.join(files_dir, filename)
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        files[name] = (file_path, json.load(f))
+                except FileNotFoundError:
+                    files[name] = (file_path, [])
+        stored = [_without_load_tags(record) for record in records]
+        _apply_records(stored, {name: items for name, (_, items) in files.items()})
+        for file_path, items in files.values():
+            _write_json_atomic(file_path, items)
+        # Workers that have not read the rotated records yet catch up from this image
+        if publish_compacted_image():
+            os.remove(rotated)
+        else:
+            log_warning("Catalog image not published after compaction: keeping the compacted journal records")
+
+    log_info(f"Compacted {len(records)} catalog journal records into the catalog files")
+    if on_compacted is not None:
+        on_compacted()
+    return len(records)
+
+
+def request_compaction():
+    """Wake the compactor now instead of at its next interval."""
+    _wakeup.set()
+
+
+def start_compactor(files_dir, on_compacted=None, interval=COMPACT_INTERVAL_SECONDS):
+    """Start the background thread that periodically compacts the journal (once per process)."""
+    global _compactor
+
+    def _run():
+        while True:
+            _wakeup.wait(interval)
+            _wakeup.clear()
+            if not (os.path.exists(journal_path(files_dir) + ROTATED_SUFFIX) or read_journal(files_dir)):
+                continue
+            try:
+                compact_journal(files_dir, on_compacted, blocking=False)
+            except Exception as e:
+                log_error(f"Catalog journal compaction failed: {e}")
+
+    if _compactor is not None and _compactor.is_alive():
+        return _compactor
+    _compactor = threading.Thread(target=_run, name='catalog-journal-compactor', daemon=True)
+    _compactor.start()
+    return _compactor
+
+
+def start_follower(files_dir, interval=FOLLOW_INTERVAL_SECONDS):
+    """Start the background thread that applies the other workers' records (once per process)."""
+    global _follower
+    path = journal_path(files_dir)
+
+    def _signature():
+        signature = []
+        for file_path in (path, path + ROTATED_SUFFIX):
+            try:
+                stat = os.stat(file_path)
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+        return signature
+
+    def _run():
+        seen = None
+        while True:
+            time.sleep(interval)
+            try:
+                signature = _signature()
+                if signature == seen:
+                    continue
+                if sync_journal(files_dir):
+                    seen = signature
+                elif not recover_from_image():
+                    log_warning("Catalog journal records were compacted before this worker read them "
+                                "and there is no catalog image to catch up from")
+                    seen = signature
+            except Exception as e:
+                log_error(f"Following the catalog journal failed: {e}")
+
+    if _follower is not None and _follower.is_alive():
+        return _follower
+    _follower = threading.Thread(target=_run, name='catalog-journal-follower', daemon=True)
+    _follower.start()
+    return _follower
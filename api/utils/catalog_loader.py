@@ -0,0 +1,217 @@
+"""
+Background catalog loading with a readiness state.
+
+Loading the catalog used to happen at import time of app.py, so the server
+could not bind (and health checks could not answer) until all four JSON files
+were parsed, and every import of `app` paid for the load again. The loader
+runs in a background thread instead:
+
+- catalogs come from the compiled bundle when it is fresh (utils/catalog_bundle.py);
+  stale JSON files are read and decoded in a small thread pool (in this
+  process: forking from the loader thread is unsafe, and shipping the decoded
+  lists back from worker processes costs about as much as decoding them),
+  then cleaned and tagged here
+- the journal of single-item edits is replayed on top (utils/catalog_journal.py)
+- registered callbacks install the catalogs (app.install_catalogs)
+
+The load runs once per process; callbacks registered after it finished are
+called right away. catalog_status() backs the /api/service/ready probe, and
+catalog endpoints answer 503 until is_catalog_ready().
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.catalog_bundle import load_catalogs
+from utils.catalog_journal import compaction_lock, replay_journal
+from utils.logger import log_success, log_warning, log_error
+
+STATE_PENDING = 'pending'
+STATE_LOADING = 'loading'
+STATE_READY = 'ready'
+STATE_FAILED = 'failed'
+
+# Fields that belong to a user and must never be kept in the catalog
+USER_FIELDS = ('watch_history', 'user_specific_data')
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_callbacks = []
+_state = {
+    'state': STATE_PENDING,
+    'started_at': None,
+    'finished_at': None,
+    'counts': {},
+    'from_bundle': [],
+    'journaled_edits': 0,
+    'error': None,
+}
+_catalogs = None
+
+
+def decode_json_file(file_path):
+    """Decode a JSON file (runs in the loader's thread pool)."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_catalog_file(file_path, media_type, data=None):
+    """
+    Load a catalog JSON file and clean unwanted fields.
+
+    Per-user fields (watch_history, ...) are removed and every item is tagged
+    with its media type and dir_type 'cdn'.
+
+    Args:
+        file_path (str): The JSON file
+        media_type (str): 'movie' or 'tv'
+        data (list): Already decoded file content, if any
+
+    Returns:
+        list: The items, or an empty list if the file is missing or unreadable
+    """
+    try:
+        if data is None:
+            data = decode_json_file(file_path)
+
+        cleaned_count = 0
+        for item in data:
+            fields_removed = False
+            for field in USER_FIELDS:
+                if field in item:
+                    del item[field]
+                    fields_removed = True
+            if fields_removed:
+                cleaned_count += 1
+
+            # Add required metadata
+            item['media_type'] = media_type
+            item['dir_type'] = 'cdn'
+
+        if cleaned_count > 0:
+            log_warning(f"Cleaned {cleaned_count} items with unwanted fields from {file_path}")
+        return data
+    except FileNotFoundError:
+        log_warning(f"File not found: {file_path} - returning empty list")
+        return []
+    except json.JSONDecodeError as e:
+        log_warning(f"Invalid JSON in {file_path}: {e} - returning empty list")
+        return []
+    except Exception as e:
+        log_warning(f"Error loading {file_path}: {e} - returning empty list")
+        return []
+
+
+def load_catalog_files(jobs):
+    """
+    Load several catalog files concurrently.
+
+    Args:
+        jobs (list): [(file_path, media_type), ...]
+
+    Returns:
+        list: The item lists, in job order
+    """
+    if len(jobs) < 2:
+        return [load_catalog_file(file_path, media_type) for file_path, media_type in jobs]
+
+    with ThreadPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1),
+                            thread_name_prefix='catalog-decode') as executor:
+        futures = [executor.submit(decode_json_file, file_path) for file_path, _ in jobs]
+        results = []
+        for (file_path, media_type), future in zip(jobs, futures):
+            try:
+                data = future.result()
+            except Exception as e:
+                # Let the single-file path report the error the usual way
+                log_warning(f"Parallel decode of {file_path} failed ({e}), retrying in-process")
+                data = None
+            results.append(load_catalog_file(file_path, media_type, data))
+        return results
+
+
+def _load(files_dir):
+    global _catalogs
+    started = time.time()
+    try:
+        # No compaction may fold the journal into the files between the two reads
+        with compaction_lock(files_dir):
+            catalogs, from_bundle = load_catalogs(files_dir, load_catalog_file, load_many=load_catalog_files)
+            journaled_edits = replay_journal(files_dir, catalogs)
+    except Exception as e:
+        log_error(f"Catalog load failed: {e}")
+        with _lock:
+            _state.update(state=STATE_FAILED, finished_at=time.time(), error=str(e))
+        return
+
+    _catalogs = catalogs
+    # Ready only once every installer ran (including ones registered meanwhile),
+    # so requests never pass the readiness gate with empty globals
+    while True:
+        with _lock:
+            callbacks = list(_callbacks)
+            _callbacks.clear()
+            if not callbacks:
+                _state.update(
+                    state=STATE_READY,
+                    finished_at=time.time(),
+                    counts={name: len(items) for name, items in catalogs.items()},
+                    from_bundle=from_bundle,
+                    journaled_edits=journaled_edits,
+                )
+                _ready.set()
+                break
+        status = dict(_state, from_bundle=from_bundle, journaled_edits=journaled_edits)
+        for callback in callbacks:
+            _run_callback(callback, status)
+    log_success(f"Content catalog loaded in {time.time() - started:.2f}s")
+
+
+def _run_callback(callback, status):
+    try:
+        callback(_catalogs, status)
+    except Exception as e:
+        log_error(f"Catalog ready callback {getattr(callback, '__qualname__', callback)} failed: {e}")
+
+
+def start_catalog_load(files_dir, on_ready=None):
+    """
+    Load the catalogs in a background thread (once per process).
+
+    Args:
+        files_dir (str): Directory holding the catalog JSON files
+        on_ready (callable): on_ready(catalogs, status), called once the catalogs
+            are loaded (immediately if they already are)
+    """
+    with _lock:
+        if on_ready is not None and not _ready.is_set():
+            _callbacks.append(on_ready)
+            on_ready = None
+        start = _state['state'] == STATE_PENDING
+        if start:
+            _state.update(state=STATE_LOADING, started_at=time.time())
+    if on_ready is not None:
+        _run_callback(on_ready, dict(_state))
+    if start:
+        threading.Thread(target=_load, args=(files_dir,), name='catalog-loader', daemon=True).start()
+
+
+def is_catalog_ready():
+    return _ready.is_set()
+
+
+def wait_for_catalog(timeout=None):
+    """Block until the catalogs are loaded. Returns False on timeout."""
+    return _ready.wait(timeout)
+
+
+def catalog_status():
+    """Return the loader state for the readiness probe."""
+    with _lock:
+        status = dict(_state)
+    status['ready'] = status['state'] == STATE_READY
+    if status['started_at'] is not None:
+        status['elapsed'] = round((status['finished_at'] or time.time()) - status['started_at'], 3)
+    return status
@@ -0,0 +1,88 @@
+"""
+Memory footprint of the catalog snapshot.
+
+Reports how many bytes the catalog items take per title, counting every
+object reachable from them once (sys.getsizeof of the dicts, lists, strings
+and numbers). It also reports what the same titles take when every title holds
+its own copy of its values, the way items loaded from JSON do (json.load only
+shares the keys). The difference is what the snapshot's ValuePool
+(utils/catalog.py) saves.
+
+Walking the whole catalog takes a while on large catalogs, so this is only
+computed on request (GET /api/admin/catalog/memory).
+"""
+
+import sys
+
+from utils.data_helpers import CATALOG_LISTS
+
+
+def _is_cached_singleton(value):
+    # Objects every process already holds: not part of the catalog's footprint
+    return value is None or value is True or value is False or (type(value) is int and -5 <= value <= 256)
+
+
+def _deep_size(value, seen, count_keys=True):
+    """Add the size of every object reachable from value that is not in `seen` yet."""
+    size = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if _is_cached_singleton(obj) or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            if count_keys:
+                stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return size
+
+
+def catalog_memory_report(snapshot):
+    """
+    Measure the memory held by a snapshot's catalog items.
+
+    Args:
+        snapshot (CatalogSnapshot): The snapshot
+
+    Returns:
+        dict: Per list and overall byte counts; bytes_per_title is the shared
+            (actual) footprint, unshared_bytes_per_title the footprint with a
+            private copy of every value per title
+    """
+    lists = {}
+    seen = set()
+    titles = {}
+    for name in CATALOG_LISTS:
+        items = getattr(snapshot, name)
+        # Lists after the first only add what they do not share with earlier ones
+        added = _deep_size(items, seen)
+        lists[name] = {'titles': len(items), 'bytes': added}
+        for item in items:
+            titles[id(item)] = item
+
+    shared_bytes = sum(entry['bytes'] for entry in lists.values())
+
+    # Keys counted once (json.load shares them), every value once per title
+    key_seen = set()
+    key_bytes = sum(_deep_size(key, key_seen) for item in titles.values() for key in item)
+    list_bytes = sum(sys.getsizeof(getattr(snapshot, name)) for name in CATALOG_LISTS)
+    unshared_bytes = key_bytes + list_bytes + sum(
+        _deep_size(item, set(), count_keys=False) for item in titles.values()
+    )
+
+    count = len(titles)
+    return {
+        'version': snapshot.version,
+        'titles': count,
+        'lists': lists,
+        'bytes': shared_bytes,
+        'unshared_bytes': unshared_bytes,
+        'bytes_per_title': round(shared_bytes / count, 1) if count else 0,
+        'unshared_bytes_per_title': round(unshared_bytes / count, 1) if count else 0,
+        'saved_percent': round(100 * (1 - shared_bytes / unshared_bytes), 1) if unshared_bytes else 0,
+        'pooled_values': len(snapshot.pool),
+    }
@@ -0,0 +1,150 @@
+"""
+Precomputed ranked views for the discovery rows.
+
+The trending and featured rows used to copy the whole catalog into tagged
+dicts and sort all of it on every request, only to return one page. A
+RankedView is the ranking computed once per catalog version (per cached
+content list on the database-backed API side), as an array of (item,
+media_type) entries in rank order with their descending scores:
+
+- a page is a slice of the entries, tagged and copied only for that page
+- a minimum score (featured's min_rating) is a binary search for the cutoff
+- featured's shuffled top rows are a seeded sample of the top positions
+
+Scores are computed from the ColumnarIndex columns (utils/catalog_index.py),
+which already hold the parsed vote_average / popularity / vote_count values.
+"""
+
+import bisect
+import random
+
+from utils.cursors import item_id
+
+RANK_TRENDING = 'trending'
+RANK_FEATURED = 'featured'
+
+# Featured titles need at least this many votes (CDN catalog)
+FEATURED_MIN_VOTES = 100
+
+
+def _values(column):
+    return column.tolist() if hasattr(column, 'tolist') else column
+
+
+def popularity_scores(index):
+    """TMDB popularity, or vote_average * vote_count for titles without one (CDN trending)."""
+    scores = []
+    for rating, popularity, vote_count in zip(_values(index.rating), _values(index.popularity),
+                                              _values(index.vote_count)):
+        if popularity > 0:
+            scores.append(popularity)
+        elif rating and vote_count > 0:
+            scores.append(rating * vote_count)
+        else:
+            scores.append(0.0)
+    return scores
+
+
+def featured_scores(index):
+    """vote_average of the titles with at least FEATURED_MIN_VOTES votes, None for the rest."""
+    return [rating if vote_count >= FEATURED_MIN_VOTES else None
+            for rating, vote_count in zip(_values(index.rating), _values(index.vote_count))]
+
+
+def rating_scores(index):
+    """vote_average of every title."""
+    return _values(index.rating)
+
+
+def rated_scores(index):
+    """vote_average of the rated titles, None for titles without a rating."""
+    return [rating or None for rating in _values(index.rating)]
+
+
+class RankedView:
+    """
+    Read-only ranking of catalog items.
+
+    Attributes:
+        entries (list): (item, media_type) pairs, best first
+        scores (list): the entries' scores, descending
+    """
+
+    __slots__ = ('entries', 'scores', '_negated')
+
+    def __init__(self, entries, scores):
+        self.entries = entries
+        self.scores = scores
+        self._negated = [-score for score in scores]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def count_at_least(self, min_score):
+        """Number of leading entries whose score is >= min_score."""
+        return bisect.bisect_right(self._negated, -min_score)
+
+    def index_after(self, rank, score, media_type, last_id):
+        """
+        Index of the entry that follows a given one (a cursor from utils.cursors).
+
+        The entry is normally still at `rank`; after a catalog change it is
+        looked for among the entries with its score. If it left the ranking,
+        the next page starts after the entries with that score.
+        """
+        def matches(i):
+            item, entry_media_type = self.entries[i]
+            return entry_media_type == media_type and item_id(item) == last_id
+
+        if 0 <= rank < len(self.entries) and matches(rank):
+            return rank + 1
+        end = bisect.bisect_right(self._negated, -score)
+        for i in range(bisect.bisect_left(self._negated, -score), end):
+            if matches(i):
+                return i + 1
+        return end
+
+    def page(self, page, per_page, limit=None):
+        """
+        Return one page of entries, like cdn.utils.paginate over the first `limit` entries.
+        """
+        positions = range(len(self.entries) if limit is None else limit)
+        start = (page - 1) * per_page
+        return [self.entries[i] for i in positions[start:start + per_page]]
+
+    def shuffled_page(self, page, per_page, top, seed=None):
+        """
+        Return one page of the first `top` entries in a seeded random order.
+
+        The same seed gives the same order, so pages of one shuffle line up.
+        """
+        order = random.Random(seed).sample(range(top), top)
+        start = (page - 1) * per_page
+        return [self.entries[i] for i in order[start:start + per_page]]
+
+
+def rank_indexes(sources, score, with_images=False):
+    """
+    Rank the items of several indexed lists together.
+
+    Args:
+        sources (list): [(ColumnarIndex, media_type), ...]
+        score (callable): score(index) -> per-position scores; None excludes an item
+        with_images (bool): Only keep items whose has_images column is set
+
+    Returns:
+        RankedView: Items by descending score; ties keep the source order
+    """
+    entries, scores = [], []
+    for index, media_type in sources:
+        has_images = _values(index.has_images) if with_images else None
+        for position, value in enumerate(score(index)):
+            if value is None or value != value:
+                continue
+            if has_images is not None and not has_images[position]:
+                continue
+            entries.append((index.items[position], media_type))
+            scores.append(float(value))
+
+    order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+    return RankedView([entries[i] for i in order], [scores[i] for i in order])
@@ -0,0 +1,186 @@
+"""
+Opaque cursors for keyset pagination of the catalog lists.
+
+page/per_page paging slices [(page - 1) * per_page:...] out of the whole
+filtered (or ranked) result, so a deep page costs as much as the first one and
+titles shift between pages when the catalog changes. A cursor instead records
+where the previous page ended, in the order of a precomputed index:
+
+- catalog order (lists, filters, substring search): the last title's position
+  in the catalog list and its id
+- ranked order (trending): the last entry's rank, score, media type and id
+
+and the next page starts right after that title. If the catalog changed in
+the meantime, the title is looked up by id (ColumnarIndex.position_of,
+RankedView.index_after), so no title is skipped or repeated because of an
+insert or delete before it.
+
+Responses carry the cursor of the next page in the X-Next-Cursor header (none
+on the last page); clients pass it back as ?cursor=. page keeps working.
+per_page is capped at MAX_PER_PAGE on every catalog list endpoint.
+"""
+
+import base64
+import bisect
+import json
+import math
+
+from werkzeug.exceptions import BadRequest
+
+CURSOR_ARG = 'cursor'
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+MAX_PER_PAGE = 100
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_score(value):
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value))
+
+
+def _is_str(value):
+    return isinstance(value, str)
+
+
+def _is_id(value):
+    return _is_int(value) or isinstance(value, str)
+
+
+# Cursor shapes: one check per key value, in order (see read_cursor)
+POSITION_CURSOR = (_is_int, _is_id)  # (position, id)
+SEARCH_CURSOR = (_is_int, _is_int, _is_id)  # (list, position, id)
+RANKED_CURSOR = (_is_int, _is_score, _is_str, _is_id)  # (rank, score, media_type, id)
+
+
+class InvalidCursor(BadRequest):
+    """A cursor token that was not issued by this API (answered with 400)."""
+
+    description = 'Invalid cursor.'
+
+
+def clamp_per_page(per_page, default=20):
+    """Cap per_page at MAX_PER_PAGE; missing or non-positive values get the default."""
+    if per_page is None or per_page < 1:
+        per_page = default
+    return min(per_page, MAX_PER_PAGE)
+
+
+def encode_cursor(*key):
+    """Encode a sort key (JSON values) as an opaque, URL-safe token."""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, shape):
+    """
+    Decode a cursor token.
+
+    Args:
+        token (str): Token from encode_cursor
+        shape (tuple): The endpoint's cursor shape, e.g. POSITION_CURSOR
+
+    Returns:
+        tuple: The sort key
+
+    Raises:
+        InvalidCursor: If the token is malformed or does not have the shape
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key = json.loads(raw.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor()
+    if not isinstance(key, list) or len(key) != len(shape):
+        raise InvalidCursor()
+    if not all(check(value) for check, value in zip(shape, key)):
+        raise InvalidCursor()
+    return tuple(key)
+
+
+def read_cursor(args, shape):
+    """Decode the request's ?cursor= of the given shape (None if there is none); raises InvalidCursor."""
+    token = args.get(CURSOR_ARG, '', type=str)
+    return decode_cursor(token, shape) if token else None
+
+
+def item_id(item):
+    """Id of a catalog item or a serialized database movie/show."""
+    if 'id' in item:
+        return item['id']
+    return item.get('show_id', item.get('movie_id'))
+
+
+def resume_position(index, position, last_id):
+    """
+    First catalog position after the title a cursor points at.
+
+    Args:
+        index (ColumnarIndex): Index of the catalog list the cursor was issued for
+        position (int): The title's position when the cursor was issued
+        last_id: The title's id
+
+    Returns:
+        int: Position to resume at
+    """
+    items = index.items
+    if 0 <= position < len(items) and item_id(items[position]) == last_id:
+        return position + 1
+    current = index.position_of(last_id)
+    # A title that was removed since: resume where it used to be
+    return position if current is None else current + 1
+
+
+def page_positions(index, positions, page, per_page, cursor=None):
+    """
+    One page of ascending catalog positions, and the cursor of the next page.
+
+    Args:
+        index (ColumnarIndex): Index the positions belong to
+        positions (list): Ascending positions of the matching titles
+        page (int): Page number, used when there is no cursor
+        per_page (int): Page size
+        cursor (tuple): (position, id) from read_cursor, or None
+
+    Returns:
+        tuple: (positions of this page, next cursor token or None)
+    """
+    if cursor is not None:
+        start = bisect.bisect_left(positions, resume_position(index, *cursor))
+    else:
+        start = max(page - 1, 0) * per_page
+    selected = positions[start:start + per_page]
+    next_cursor = None
+    if len(selected) and start + per_page < len(positions):
+        last = selected[-1]
+        next_cursor = encode_cursor(last, item_id(index.items[last]))
+    return selected, next_cursor
+
+
+def page_ranked(ranking, page, per_page, cursor=None):
+    """
+    One page of a RankedView, and the cursor of the next page.
+
+    Args:
+        ranking (RankedView): The ranking
+        page (int): Page number, used when there is no cursor
+        per_page (int): Page size
+        cursor (tuple): (rank, score, media_type, id) from read_cursor, or None
+
+    Returns:
+        tuple: ((item, media_type) entries of this page, next cursor token or None)
+    """
+    if cursor is not None:
+        start = ranking.index_after(*cursor)
+    else:
+        start = max(page - 1, 0) * per_page
+    end = min(start + per_page, len(ranking))
+    entries = ranking.entries[start:end]
+    next_cursor = None
+    if entries and end < len(ranking):
+        item, media_type = entries[-1]
+        next_cursor = encode_cursor(end - 1, ranking.scores[end - 1], media_type, item_id(item))
+    return entries, next_cursor
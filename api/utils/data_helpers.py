@@ -1,69 +1,289 @@
 """
 Data helper utilities for safely accessing and cleaning global data variables.
 
-This module provides safe getter functions that return deep copies of the global
-data variables to prevent unwanted modifications to the original data that could
-be saved back to JSON files.
+This module provides getter functions that return the catalog from an immutable,
+versioned snapshot (see utils/catalog.py) so requests can share the in-memory
+data without copying it and without being able to modify what gets saved back
+to the JSON files.
 
 Key features:
-- Deep copying to prevent data contamination 
-- Efficient read operations with deep copy only (force_clean=False by default)
+- Zero-copy reads: getters return read-only lists of read-only items
+- Copy-on-write: handlers copy an item (dict(item, ...)) before changing it
 - Data cleaning ONLY when explicitly requested (force_clean=True) for save/export operations
-- Performance optimizations for large datasets with caching
+- Snapshot is rebuilt (with a new version) only when the source data changes
 - Comprehensive error handling
 - Global variables remain read-only in memory
 
 Optimized Performance Strategy:
-- Read operations: Deep copy only (fast, data isolation guaranteed)
+- Read operations: shared snapshot, no copying
 - Save/Export operations: Deep copy + cleaning (force_clean=True)
 - Cleaning only on import/export and explicit force_clean requests
-- Global data cleaned only during import/export cycles, not per request
-- Memory-efficient deep copying preserves data isolation without unnecessary processing
+- Rebuilding a snapshot reuses items that did not change
 """
 
 import copy
+import threading
 import time
-from functools import lru_cache
+from utils.catalog import apply_edit, build_snapshot, encode_json
+from utils.catalog_image import poll_catalog_image, start_catalog_image
 from utils.logger import log_error, log_warning, log_debug, log_info
+from utils.projection import project
 
-# Cache for performance optimization (cleared when data is updated)
-_data_cache = {}
-_cache_timestamps = {}
-CACHE_TTL = 300  # 5 minutes cache TTL
+# Current catalog snapshot (rebuilt lazily after clear_data_cache)
+_snapshot = None
+_snapshot_lock = threading.RLock()
+
+CATALOG_LISTS = ('movies', 'tv_series', 'movies_with_images', 'tv_series_with_images')
 
 # Performance testing flags
-DISABLE_CACHE_FOR_TESTING = False  # Set to True to disable cache for testing
 ENABLE_PERFORMANCE_LOGGING = False  # Set to True to enable timing logs for debugging
 
 
 def clear_data_cache():
-    """Clear the data cache when source data is updated."""
-    global _data_cache, _cache_timestamps
-    _data_cache.clear()
-    _cache_timestamps.clear()
+    """Drop the current catalog snapshot when source data is updated."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
     log_info("Data cache cleared")
 
 
-def _is_cache_valid(cache_key):
-    """Check if cached data is still valid based on TTL."""
-    if cache_key not in _cache_timestamps:
-        return False
-    return (time.time() - _cache_timestamps[cache_key]) < CACHE_TTL
+def get_catalog_snapshot():
+    """
+    Get the current catalog snapshot, building it from the app globals if needed.
+
+    The frozen lists are published back to the app module so the globals and the
+    snapshot share a single copy of the data.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None:
+        # Pick up a catalog another worker published (throttled, switches in the background)
+        poll_catalog_image()
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None:
+            import app
+            sources = tuple(getattr(app, name) for name in CATALOG_LISTS)
+            snapshot = build_snapshot(*sources)
+
+            # Only publish lists that were not replaced while the snapshot was being built
+            for name, source in zip(CATALOG_LISTS, sources):
+                if getattr(app, name) is source:
+                    setattr(app, name, getattr(snapshot, name))
+
+            _snapshot = snapshot
+            log_debug(f"Built catalog snapshot v{snapshot.version}")
+            _warm_snapshot(snapshot)
+        return _snapshot
+
+
+def current_catalog_snapshot():
+    """Get the current catalog snapshot without building it; None before the first build."""
+    return _snapshot
+
+
+def _warm_snapshot(snapshot):
+    """Build the per-version indexes used on every keystroke in the background, not on a request."""
+    def _run():
+        try:
+            snapshot.autocomplete()
+        except Exception as e:
+            log_error(f"Error building the autocomplete index: {str(e)}")
+
+    threading.Thread(target=_run, name='catalog-warmup', daemon=True).start()
+
+
+def apply_catalog_edit(media_type, item_id, item=None, with_images=False):
+    """
+    Apply a single-item put (item given) or delete (item=None) to the in-memory
+    catalog without rebuilding it (edits of this and the other workers, see
+    utils/catalog_journal.py).
+
+    Args:
+        media_type (str): 'movie' or 'tv'
+        item_id: Id of the edited item
+        item (dict): The new item, or None to delete
+        with_images (bool): Whether a put item belongs in the with_images list
+
+    Returns:
+        CatalogSnapshot: The new snapshot
+    """
+    global _snapshot
+    with _snapshot_lock:
+        snapshot = apply_edit(get_catalog_snapshot(), media_type, item_id, item, with_images)
+
+        import app
+        for name in CATALOG_LISTS:
+            setattr(app, name, getattr(snapshot, name))
+        _snapshot = snapshot
+        rebuild = getattr(app, 'rebuild_content_indexes', None)
+        if rebuild is not None:
+            rebuild(clear_cache=False)
+    _warm_snapshot(snapshot)
+    log_debug(f"Applied catalog edit to {media_type} {item_id}: snapshot v{snapshot.version}")
+    return snapshot
+
+
+def share_catalog_image(files_dir):
+    """
+    Share the loaded catalog with the other worker processes on this host.
+
+    Maps the current catalog image (or publishes one), then keeps this
+    process on the catalog base the workers last published. See
+    utils/catalog_image.py.
+
+    Args:
+        files_dir (str): Directory holding the catalog files
+    """
+    start_catalog_image(files_dir, get_catalog_snapshot, _decode_catalog_image, _install_snapshot)
+
+
+def _decode_catalog_image(image):
+    """Build a snapshot of the catalog of an image another worker published."""
+    lists = image.load_lists()
+    return build_snapshot(*(lists[name] for name in CATALOG_LISTS))
+
+
+def _install_snapshot(snapshot):
+    """Make a snapshot decoded from an image the current catalog (the journal records after it follow)."""
+    global _snapshot
+    with _snapshot_lock:
+        import app
+        for name in CATALOG_LISTS:
+            setattr(app, name, getattr(snapshot, name))
+        _snapshot = snapshot
+        rebuild = getattr(app, 'rebuild_content_indexes', None)
+        if rebuild is not None:
+            rebuild(clear_cache=False)
+
+    _warm_snapshot(snapshot)
+    log_debug(f"Installed catalog snapshot v{snapshot.version} decoded from a catalog image")
+
+
+def get_catalog_index(name):
+    """
+    Get the columnar filter index of a catalog list in the current snapshot.
+
+    Args:
+        name (str): 'movies', 'tv_series', 'movies_with_images' or 'tv_series_with_images'
+
+    Returns:
+        ColumnarIndex: index whose filter() returns items of that list
+    """
+    return get_catalog_snapshot().indexes[name]
+
+
+def get_text_index(name):
+    """
+    Get the trigram title index of a catalog list in the current snapshot.
+
+    Args:
+        name (str): 'movies', 'tv_series', 'movies_with_images' or 'tv_series_with_images'
+
+    Returns:
+        TrigramIndex: index whose search() ranks positions of that list
+    """
+    return get_catalog_snapshot().text_index(name)
+
+
+def get_autocomplete_index():
+    """
+    Get the autocomplete prefix index of the current snapshot.
+
+    Returns:
+        AutocompleteIndex: index over the with_images lists (utils/autocomplete.py)
+    """
+    return get_catalog_snapshot().autocomplete()
+
+
+def get_ranked_view(kind, content_type='', with_images=False):
+    """
+    Get a discovery ranking of the current snapshot (computed once per version).
+
+    Args:
+        kind (str): 'trending' or 'featured' (see utils/catalog_rankings.py)
+        content_type (str): 'movie', 'tv', or '' for both
+        with_images (bool): Rank the with_images lists
+
+    Returns:
+        RankedView: (item, media_type) entries, best first
+    """
+    return get_catalog_snapshot().ranked(kind, content_type, with_images)
+
+
+def get_similar_items(name, item_id, count=None):
+    """
+    Get the most similar items of a catalog item (see utils/similarity.py).
+
+    Args:
+        name (str): 'movies', 'tv_series', 'movies_with_images' or 'tv_series_with_images'
+        item_id: The item id
+        count (int): Number of items needed, or None for all of them; up to
+            SIMILAR_TOP_K they are the precomputed neighbors, past it the
+            whole ranking is computed for this call
+
+    Returns:
+        list: Read-only items of the same list, most similar first
+    """
+    snapshot = get_catalog_snapshot()
+    by_id = snapshot.by_id[name]
+    index = snapshot.similar(name)
+    if count is not None and count <= index.top_k:
+        neighbor_ids, _ = index.neighbors(item_id)
+    else:
+        neighbor_ids, _ = index.all_neighbors(item_id)
+    return [by_id[neighbor_id] for neighbor_id in neighbor_ids if neighbor_id in by_id]
 
 
-def _get_cached_data(cache_key):
-    """Get data from cache if valid."""
-    if cache_key in _data_cache and _is_cache_valid(cache_key):
-        log_debug(f"Cache hit for {cache_key}")
-        return _data_cache[cache_key]
-    return None
+def get_catalog_item(name, item_id):
+    """
+    Look up a single catalog item by id in the current snapshot (O(1)).
 
+    Args:
+        name (str): 'movies', 'tv_series', 'movies_with_images' or 'tv_series_with_images'
+        item_id: The item id
 
-def _cache_data(cache_key, data):
-    """Cache data with timestamp."""
-    _data_cache[cache_key] = data
-    _cache_timestamps[cache_key] = time.time()
-    log_debug(f"Cached data for {cache_key}")
+    Returns:
+        dict: The read-only item, or None if the list has no item with that id
+    """
+    return get_catalog_snapshot().by_id[name].get(item_id)
+
+
+def encode_catalog_items(items, extras=None, fields=None):
+    """
+    Encode a page of catalog items as a JSON array from cached per-item fragments.
+
+    Each item is encoded once per snapshot (CatalogSnapshot.item_json); per-request
+    fields such as watch_history or media_type are spliced into the fragment
+    instead of re-encoding a copy of the item.
+
+    Args:
+        items (list): Catalog items (plain dicts are encoded as they are)
+        extras (list): Optional dict of fields to add, one per item (None or {} for none)
+        fields (tuple): Optional projection of the items (see utils/projection.py);
+            extras are added after it
+
+    Returns:
+        str: JSON text of the list, with the same data as
+            [dict(project(item, fields), **extra), ...]
+    """
+    snapshot = get_catalog_snapshot()
+    parts = []
+    for position, item in enumerate(items):
+        text = snapshot.item_json(item, fields)
+        extra = extras[position] if extras is not None else None
+        if extra:
+            shown = project(item, fields)
+            added = {key: value for key, value in extra.items() if key not in shown or shown[key] != value}
+            if any(key in shown for key in added):
+                # Overriding a field: encode the merged copy
+                text = encode_json(dict(shown, **added))
+            elif added:
+                spliced = ','.join(f'{encode_json(key)}:{encode_json(value)}' for key, value in sorted(added.items()))
+                text = f'{text[:-1]},{spliced}}}' if len(text) > 2 else f'{{{spliced}}}'
+        parts.append(text)
+    return f'[{",".join(parts)}]'
 
 
 def clean_item_data(item, fields_to_remove=None):
@@ -151,72 +371,59 @@ def clean_data_list(data_list, fields_to_remove=None, clean=True):
         return copy.deepcopy(data_list)
 
 
-def get_movies(force_clean=False, fields_to_remove=None):
+def _get_catalog_list(name, label, force_clean=False, fields_to_remove=None):
     """
-    Get a safe, deep-copied version of the movies data with caching.
-    
-    Args:
-        force_clean (bool): Whether to force cleaning of unwanted fields. 
-                           Only use when saving/exporting data. Defaults to False
-        fields_to_remove (list): Custom list of fields to remove when force_clean=True
-    
-    Returns:
-        list: Deep copy of movies data, cleaned only if force_clean=True
+    Shared implementation of the catalog getters.
+
+    Read operations get the list straight from the current snapshot (no copy).
+    force_clean=True returns a cleaned, mutable deep copy for save/export.
     """
     try:
         # Performance testing: start timing
         start_time = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
-        # Create cache key based on parameters
-        cache_key = f"movies_force_clean_{force_clean}_fields_{fields_to_remove}"
-        
-        # Check cache first (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            cached_data = _get_cached_data(cache_key)
-            if cached_data is not None:
-                if ENABLE_PERFORMANCE_LOGGING:
-                    elapsed = time.time() - start_time
-                    log_info(f"🚀 PERFORMANCE [MOVIES CACHE HIT]: {elapsed:.4f}s for {len(cached_data)} items")
-                return cached_data
-        
-        # Import and process data
-        from app import movies
-        
-        # Performance testing: time the operation
-        process_start = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
+
+        data = getattr(get_catalog_snapshot(), name)
+
         if force_clean:
             # Only clean when explicitly requested (for save/export operations)
-            result = clean_data_list(movies, fields_to_remove, clean=True)
-            log_debug(f"Force cleaned movies data for save/export operation")
+            result = clean_data_list(data, fields_to_remove, clean=True)
+            log_debug(f"Force cleaned {name} data for save/export operation")
         else:
-            # Fast deep copy without cleaning (for all read operations)
-            # This provides complete data isolation without unnecessary processing
-            result = copy.deepcopy(movies)
-            log_debug(f"Fast deep copy of movies data for read operation")
-        
+            # Zero-copy read: the snapshot is immutable, so it can be shared
+            result = data
+
         if ENABLE_PERFORMANCE_LOGGING:
-            process_elapsed = time.time() - process_start
-            total_elapsed = time.time() - start_time
-            operation = "CLEAN" if force_clean else "COPY"
-            log_info(f"⚡ PERFORMANCE [MOVIES {operation}]: Process took {process_elapsed:.4f}s, Total: {total_elapsed:.4f}s for {len(result)} items")
-        
-        # Cache the result (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            _cache_data(cache_key, result)
-        
+            elapsed = time.time() - start_time
+            operation = "CLEAN" if force_clean else "SNAPSHOT"
+            log_info(f"⚡ PERFORMANCE [{label} {operation}]: {elapsed:.4f}s for {len(result)} items")
+
         return result
     except ImportError as e:
-        log_error(f"Error importing movies data: {str(e)}")
+        log_error(f"Error importing {name} data: {str(e)}")
         return []
     except Exception as e:
-        log_error(f"Error getting movies data: {str(e)}")
+        log_error(f"Error getting {name} data: {str(e)}")
         return []
 
 
+def get_movies(force_clean=False, fields_to_remove=None):
+    """
+    Get the movies data from the current catalog snapshot.
+    
+    Args:
+        force_clean (bool): Whether to force cleaning of unwanted fields. 
+                           Only use when saving/exporting data. Defaults to False
+        fields_to_remove (list): Custom list of fields to remove when force_clean=True
+    
+    Returns:
+        list: Read-only movies list, or a cleaned mutable copy if force_clean=True
+    """
+    return _get_catalog_list('movies', 'MOVIES', force_clean, fields_to_remove)
+
+
 def get_tv_shows(force_clean=False, fields_to_remove=None):
     """
-    Get a safe, deep-copied version of the TV series data with caching.
+    Get the TV series data from the current catalog snapshot.
     
     Args:
         force_clean (bool): Whether to force cleaning of unwanted fields.
@@ -224,60 +431,14 @@ def get_tv_shows(force_clean=False, fields_to_remove=None):
         fields_to_remove (list): Custom list of fields to remove when force_clean=True
     
     Returns:
-        list: Deep copy of TV series data, cleaned only if force_clean=True
+        list: Read-only TV series list, or a cleaned mutable copy if force_clean=True
     """
-    try:
-        # Performance testing: start timing
-        start_time = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
-        # Create cache key based on parameters
-        cache_key = f"tv_series_force_clean_{force_clean}_fields_{fields_to_remove}"
-        
-        # Check cache first (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            cached_data = _get_cached_data(cache_key)
-            if cached_data is not None:
-                if ENABLE_PERFORMANCE_LOGGING:
-                    elapsed = time.time() - start_time
-                    log_info(f"🚀 PERFORMANCE [TV CACHE HIT]: {elapsed:.4f}s for {len(cached_data)} items")
-                return cached_data
-            
-        # Import and process data
-        from app import tv_series
-        
-        # Performance testing: time the operation
-        process_start = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
-        if force_clean:
-            # Only clean when explicitly requested (for save/export operations)
-            result = clean_data_list(tv_series, fields_to_remove, clean=True)
-            log_debug(f"Force cleaned TV series data for save/export operation")
-        else:
-            # Just return deep copy without cleaning (for read operations)
-            result = copy.deepcopy(tv_series)
-        
-        if ENABLE_PERFORMANCE_LOGGING:
-            process_elapsed = time.time() - process_start
-            total_elapsed = time.time() - start_time
-            operation = "CLEAN" if force_clean else "COPY"
-            log_info(f"⚡ PERFORMANCE [TV {operation}]: Process took {process_elapsed:.4f}s, Total: {total_elapsed:.4f}s for {len(result)} items")
-        
-        # Cache the result (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            _cache_data(cache_key, result)
-        
-        return result
-    except ImportError as e:
-        log_error(f"Error importing TV series data: {str(e)}")
-        return []
-    except Exception as e:
-        log_error(f"Error getting TV series data: {str(e)}")
-        return []
+    return _get_catalog_list('tv_series', 'TV', force_clean, fields_to_remove)
 
 
 def get_movies_with_images(force_clean=False, fields_to_remove=None):
     """
-    Get a safe, deep-copied version of the movies with images data with caching.
+    Get the movies with images data from the current catalog snapshot.
     
     Args:
         force_clean (bool): Whether to force cleaning of unwanted fields.
@@ -285,60 +446,14 @@ def get_movies_with_images(force_clean=False, fields_to_remove=None):
         fields_to_remove (list): Custom list of fields to remove when force_clean=True
     
     Returns:
-        list: Deep copy of movies with images data, cleaned only if force_clean=True
+        list: Read-only movies with images list, or a cleaned mutable copy if force_clean=True
     """
-    try:
-        # Performance testing: start timing
-        start_time = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
-        # Create cache key based on parameters
-        cache_key = f"movies_with_images_force_clean_{force_clean}_fields_{fields_to_remove}"
-        
-        # Check cache first (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            cached_data = _get_cached_data(cache_key)
-            if cached_data is not None:
-                if ENABLE_PERFORMANCE_LOGGING:
-                    elapsed = time.time() - start_time
-                    log_info(f"🚀 PERFORMANCE [MOVIES_IMG CACHE HIT]: {elapsed:.4f}s for {len(cached_data)} items")
-                return cached_data
-            
-        # Import and process data
-        from app import movies_with_images
-        
-        # Performance testing: time the operation
-        process_start = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
-        if force_clean:
-            # Only clean when explicitly requested (for save/export operations)
-            result = clean_data_list(movies_with_images, fields_to_remove, clean=True)
-            log_debug(f"Force cleaned movies with images data for save/export operation")
-        else:
-            # Just return deep copy without cleaning (for read operations)
-            result = copy.deepcopy(movies_with_images)
-        
-        if ENABLE_PERFORMANCE_LOGGING:
-            process_elapsed = time.time() - process_start
-            total_elapsed = time.time() - start_time
-            operation = "CLEAN" if force_clean else "COPY"
-            log_info(f"⚡ PERFORMANCE [MOVIES_IMG {operation}]: Process took {process_elapsed:.4f}s, Total: {total_elapsed:.4f}s for {len(result)} items")
-        
-        # Cache the result (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            _cache_data(cache_key, result)
-        
-        return result
-    except ImportError as e:
-        log_error(f"Error importing movies with images data: {str(e)}")
-        return []
-    except Exception as e:
-        log_error(f"Error getting movies with images data: {str(e)}")
-        return []
+    return _get_catalog_list('movies_with_images', 'MOVIES_IMG', force_clean, fields_to_remove)
 
 
 def get_tv_shows_with_images(force_clean=False, fields_to_remove=None):
     """
-    Get a safe, deep-copied version of the TV series with images data with caching.
+    Get the TV series with images data from the current catalog snapshot.
     
     Args:
         force_clean (bool): Whether to force cleaning of unwanted fields.
@@ -346,60 +461,14 @@ def get_tv_shows_with_images(force_clean=False, fields_to_remove=None):
         fields_to_remove (list): Custom list of fields to remove when force_clean=True
     
     Returns:
-        list: Deep copy of TV series with images data, cleaned only if force_clean=True
+        list: Read-only TV series with images list, or a cleaned mutable copy if force_clean=True
     """
-    try:
-        # Performance testing: start timing
-        start_time = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
-        # Create cache key based on parameters
-        cache_key = f"tv_series_with_images_force_clean_{force_clean}_fields_{fields_to_remove}"
-        
-        # Check cache first (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            cached_data = _get_cached_data(cache_key)
-            if cached_data is not None:
-                if ENABLE_PERFORMANCE_LOGGING:
-                    elapsed = time.time() - start_time
-                    log_info(f"🚀 PERFORMANCE [TV_IMG CACHE HIT]: {elapsed:.4f}s for {len(cached_data)} items")
-                return cached_data
-            
-        # Import and process data
-        from app import tv_series_with_images
-        
-        # Performance testing: time the operation
-        process_start = time.time() if ENABLE_PERFORMANCE_LOGGING else None
-        
-        if force_clean:
-            # Only clean when explicitly requested (for save/export operations)
-            result = clean_data_list(tv_series_with_images, fields_to_remove, clean=True)
-            log_debug(f"Force cleaned TV series with images data for save/export operation")
-        else:
-            # Just return deep copy without cleaning (for read operations)
-            result = copy.deepcopy(tv_series_with_images)
-        
-        if ENABLE_PERFORMANCE_LOGGING:
-            process_elapsed = time.time() - process_start
-            total_elapsed = time.time() - start_time
-            operation = "CLEAN" if force_clean else "COPY"
-            log_info(f"⚡ PERFORMANCE [TV_IMG {operation}]: Process took {process_elapsed:.4f}s, Total: {total_elapsed:.4f}s for {len(result)} items")
-        
-        # Cache the result (unless disabled for testing)
-        if not DISABLE_CACHE_FOR_TESTING:
-            _cache_data(cache_key, result)
-        
-        return result
-    except ImportError as e:
-        log_error(f"Error importing TV series with images data: {str(e)}")
-        return []
-    except Exception as e:
-        log_error(f"Error getting TV series with images data: {str(e)}")
-        return []
+    return _get_catalog_list('tv_series_with_images', 'TV_IMG', force_clean, fields_to_remove)
 
 
 def get_all_items(force_clean=False, fields_to_remove=None):
     """
-    Get a safe, deep-copied version of all content items (movies + TV shows).
+    Get all content items (movies + TV shows) from the current catalog snapshot.
     
     Args:
         force_clean (bool): Whether to force cleaning of unwanted fields.
@@ -407,7 +476,7 @@ def get_all_items(force_clean=False, fields_to_remove=None):
         fields_to_remove (list): Custom list of fields to remove when force_clean=True
     
     Returns:
-        list: Deep copy of all content items, cleaned only if force_clean=True
+        list: New list of read-only items, cleaned copies only if force_clean=True
     """
     try:
         movies_data = get_movies(force_clean, fields_to_remove)
@@ -420,7 +489,7 @@ def get_all_items(force_clean=False, fields_to_remove=None):
 
 def get_all_items_with_images(force_clean=False, fields_to_remove=None):
     """
-    Get a safe, deep-copied version of all content items with images.
+    Get all content items with images from the current catalog snapshot.
     
     Args:
         force_clean (bool): Whether to force cleaning of unwanted fields.
@@ -428,7 +497,7 @@ def get_all_items_with_images(force_clean=False, fields_to_remove=None):
         fields_to_remove (list): Custom list of fields to remove when force_clean=True
     
     Returns:
-        list: Deep copy of all content items with images, cleaned only if force_clean=True
+        list: New list of read-only items, cleaned copies only if force_clean=True
     """
     try:
         movies_data = get_movies_with_images(force_clean, fields_to_remove)
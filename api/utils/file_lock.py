@@ -0,0 +1,84 @@
+"""
+Exclusive lock files shared by the worker processes on one host.
+
+The catalog files, the edit journal and the catalog image are shared by every
+worker, so the steps that rewrite them (journal appends and rotation,
+compaction, image publishes) are serialized with an OS file lock: flock on
+POSIX, a byte-range lock on Windows. The lock belongs to the open file, so it
+also excludes other threads of the same process.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+# Windows has no blocking lock call: retry this often
+_RETRY_SECONDS = 0.05
+
+
+def _try_lock(f):
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    f.seek(0)
+    try:
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while not _try_lock(f):
+        time.sleep(_RETRY_SECONDS)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """
+    Hold the exclusive lock of a lock file (created if needed).
+
+    Args:
+        path (str): The lock file
+        blocking (bool): Wait for the lock; otherwise give up at once if it is held
+
+    Yields:
+        bool: True while the lock is held, False if blocking=False and another
+            holder has it
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a+b') as f:
+        if blocking:
+            _lock(f)
+        elif not _try_lock(f):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _unlock(f)
+
+
+def lock_path(files_dir, name):
+    """Path of a lock file next to the shared catalog files."""
+    return os.path.join(files_dir, f'{name}.lock')
@@ -8,6 +8,9 @@ Score is a float in [0.0, 1.0] combining four signals:
   4. Word-set overlap ratio             — fraction of query words present in text
 """
 
+import heapq
+import math
+
 
 # ---------------------------------------------------------------------------
 # Signal 1 — N-gram Dice coefficient
@@ -22,6 +25,13 @@ def _ngrams(text: str, n: int) -> dict:
     return grams
 
 
+def _gram_intersection(a_grams: dict, b_grams: dict) -> int:
+    """|A ∩ B| of two n-gram multisets."""
+    return sum(
+        min(count, b_grams.get(g, 0)) for g, count in a_grams.items()
+    )
+
+
 def _dice_coefficient(a_grams: dict, b_grams: dict) -> float:
     """
     Dice coefficient = 2 * |intersection| / (|A| + |B|)
@@ -31,10 +41,7 @@ def _dice_coefficient(a_grams: dict, b_grams: dict) -> float:
     total_b = sum(b_grams.values())
     if total_a + total_b == 0:
         return 0.0
-    intersection = sum(
-        min(a_grams.get(g, 0), b_grams.get(g, 0)) for g in a_grams
-    )
-    return (2.0 * intersection) / (total_a + total_b)
+    return (2.0 * _gram_intersection(a_grams, b_grams)) / (total_a + total_b)
 
 
 def _ngram_similarity(query: str, text: str, n: int = 3) -> float:
@@ -54,10 +61,50 @@ def _ngram_similarity(query: str, text: str, n: int = 3) -> float:
 # Signal 2 — Longest Common Subsequence (LCS) ratio
 # ---------------------------------------------------------------------------
 
+# Population count of an int (int.bit_count needs Python 3.10)
+_popcount = getattr(int, 'bit_count', None) or (lambda value: bin(value).count('1'))
+
+
+def _lcs_masks(a: str) -> dict:
+    """Match masks of a for the bit-parallel LCS: {char: bit i set where a[i] == char}."""
+    masks: dict = {}
+    bit = 1
+    for ch in a:
+        masks[ch] = masks.get(ch, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def _lcs_length_masked(masks: dict, length: int, b: str) -> int:
+    """
+    LCS length of b and the string `masks` was built from (`length` characters).
+
+    Bit-parallel algorithm (Allison–Dix, in Hyyrö's formulation): bit i of V
+    is 0 where the LCS row gains a match at position i, and each character of
+    b updates all of V at once with a few big-int operations, so the cost is
+    O(|b|) operations on |a|-bit integers instead of O(|a|·|b|) steps.
+    """
+    full = (1 << length) - 1
+    v = full
+    for ch in b:
+        u = v & masks.get(ch, 0)
+        if u:
+            v = (v + u) | (v - u)
+    return length - _popcount(v & full)
+
+
 def _lcs_length(a: str, b: str) -> int:
+    """Compute the length of the Longest Common Subsequence of a and b."""
+    if len(a) < len(b):
+        a, b = b, a          # mask the shorter string, iterate the longer one
+    return _lcs_length_masked(_lcs_masks(b), len(b), a)
+
+
+def _lcs_length_dp(a: str, b: str) -> int:
     """
-    Compute the length of the Longest Common Subsequence of a and b.
-    Uses O(min(|a|, |b|)) space via the two-row DP technique.
+    Reference LCS length: the two-row DP _lcs_length replaced, kept for tests
+    and the benchmark (stress_tests/fuzzy_lcs_benchmark.py).
+    Uses O(min(|a|, |b|)) space.
     """
     if len(a) < len(b):
         a, b = b, a          # ensure a is the longer string
@@ -76,11 +123,18 @@ def _lcs_length(a: str, b: str) -> int:
     return prev[lb]
 
 
-def _lcs_ratio(query: str, text: str) -> float:
-    """LCS length / max(len(query), len(text))."""
+def _lcs_ratio(query: str, text: str, q_masks: dict = None) -> float:
+    """
+    LCS length / max(len(query), len(text)).
+
+    q_masks: _lcs_masks(query), when the same query is compared with many texts.
+    """
     if not query or not text:
         return 0.0
-    lcs = _lcs_length(query, text)
+    if q_masks is None:
+        lcs = _lcs_length(query, text)
+    else:
+        lcs = _lcs_length_masked(q_masks, len(query), text)
     return lcs / max(len(query), len(text))
 
 
@@ -88,16 +142,18 @@ def _lcs_ratio(query: str, text: str) -> float:
 # Signal 3 — Prefix bonus
 # ---------------------------------------------------------------------------
 
-def _prefix_bonus(query: str, text: str) -> float:
+def _prefix_bonus(query: str, text: str, t_words=None) -> float:
     """
     Returns a bonus in [0.0, 1.0]:
       - 1.0  if text starts with the entire query
       - 0.7  if any whitespace-separated word in text starts with query
       - 0.0  otherwise
+
+    t_words: text.split(), when already known.
     """
     if text.startswith(query):
         return 1.0
-    for word in text.split():
+    for word in (text.split() if t_words is None else t_words):
         if word.startswith(query):
             return 0.7
     return 0.0
@@ -107,15 +163,19 @@ def _prefix_bonus(query: str, text: str) -> float:
 # Signal 4 — Word-set overlap ratio
 # ---------------------------------------------------------------------------
 
-def _word_overlap(query: str, text: str) -> float:
+def _word_overlap(query: str, text: str, q_words=None, t_words=None) -> float:
     """
     Fraction of unique query words that appear as substrings within text words.
     Example: query="dark knight" text="the dark knight rises" → 2/2 = 1.0
+
+    q_words / t_words: set(query.split()) / text.split(), when already known.
     """
-    q_words = set(query.split())
+    if q_words is None:
+        q_words = set(query.split())
     if not q_words:
         return 0.0
-    t_words = text.split()
+    if t_words is None:
+        t_words = text.split()
     matched = sum(
         1 for qw in q_words
         if any(qw in tw for tw in t_words)
@@ -164,15 +224,119 @@ def fuzzy_score(query: str, text: str) -> float:
     return round(min(score, 1.0), 4)
 
 
-def fuzzy_filter_and_rank(query: str, items: list, text_getter, threshold: float = 0.25) -> list:
+def query_grams(q: str) -> dict:
+    """Trigrams of a normalized (stripped, lowercased, non-empty) query, as fuzzy_filter_and_rank uses them."""
+    return _ngrams(f" {q} ", min(3, len(q) + 2))
+
+
+def text_grams(t: str) -> dict:
+    """Trigrams of a normalized, non-empty text (padded like the query)."""
+    return _ngrams(f" {t} ", 3)
+
+
+# Search features: what the scorer needs from each side of a comparison,
+# derived once per query (query_features) and once per title (the words of
+# TrigramIndex; its trigram postings give the shared trigram counts).
+
+def query_features(q: str) -> tuple:
+    """(trigrams, trigram total, unique words, LCS match masks) of a normalized query."""
+    grams = query_grams(q)
+    return grams, sum(grams.values()), set(q.split()), _lcs_masks(q)
+
+
+def score_candidate(q: str, q_features: tuple, t: str, t_words: tuple, shared: int) -> float:
+    """
+    Score a normalized text that shares at least one trigram with the query.
+
+    Same weights as fuzzy_score.
+
+    Args:
+        q / t:               Normalized query / text.
+        q_features:          query_features(q).
+        t_words:             t.split().
+        shared:              Trigrams the query and the text have in common
+                             (multiset intersection of query_grams(q) and
+                             text_grams(t)).
+    """
+    _, q_total, q_words, q_masks = q_features
+    # A padded text of n characters has n trigrams
+    dice    = (2.0 * shared) / (q_total + len(t))
+    lcs_val = _lcs_ratio(q, t, q_masks)
+    words   = _word_overlap(q, t, q_words, t_words)
+    pfx     = _prefix_bonus(q, t, t_words)
+    return round(min(0.40 * dice + 0.30 * lcs_val + 0.20 * words + 0.10 * pfx, 1.0), 4)
+
+
+def min_gram_overlap(q_grams: dict, threshold: float) -> int:
+    """
+    Fewest distinct query trigrams a text must share to reach `threshold`.
+
+    LCS, word overlap and prefix bonus add at most 0.60, so the Dice term must
+    supply the rest. A text sharing k distinct query trigrams has at most
+    k * (highest query gram count) common grams, which bounds its Dice score:
+    2i / (|Q| + |T|) <= 2i / (|Q| + i).  Always at least 1, as in the
+    pre-filter of fuzzy_filter_and_rank.
+    """
+    # Scores are rounded to 4 places before the threshold comparison
+    dice = (threshold - 0.60 - 0.0001) / 0.40
+    if dice <= 0:
+        return 1
+    total = sum(q_grams.values())
+    most = max(q_grams.values())
+    return max(1, math.ceil(dice * total / ((2.0 - dice) * most) - 1e-9))
+
+
+def top_scored(entries, limit=None) -> list:
+    """
+    Rank (score, payload) pairs produced in catalog order.
+
+    Args:
+        entries:     Iterable of (score, payload); consumed lazily.
+        limit:       Keep only the best `limit` pairs (None keeps all).
+
+    Returns:
+        List of (score, payload) sorted by score descending, ties in the
+        order they were produced.  With a limit, a bounded heap keeps the
+        best pairs, and the scan stops once `limit` exact matches (1.0) are
+        held: no later entry can outrank them.
+    """
+    if limit is None:
+        scored = list(entries)
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return scored
+    if limit <= 0:
+        return []
+
+    # Min-heap of (score, -order, payload): the root is the weakest kept entry
+    heap = []
+    for order, (score, payload) in enumerate(entries):
+        if len(heap) < limit:
+            heapq.heappush(heap, (score, -order, payload))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, -order, payload))
+        else:
+            continue
+        if len(heap) == limit and heap[0][0] >= 1.0:
+            break
+    heap.sort(key=lambda x: (-x[0], -x[1]))
+    return [(score, payload) for score, _, payload in heap]
+
+
+def fuzzy_filter_and_rank(query: str, items: list, text_getter, threshold: float = 0.25, limit: int = None) -> list:
     """
     Filter and rank items by fuzzy score.
 
+    Scans every item; catalog lists are searched through their
+    TrigramIndex instead (utils/trigram_index.py), which gives the same
+    results.
+
     Args:
         query:       Search query string.
         items:       List of items to score.
         text_getter: Callable(item) → str that extracts the searchable text.
         threshold:   Minimum score to include [0.0, 1.0].  Default 0.25.
+        limit:       Return at most this many items (see top_scored); the
+                     same as slicing the full result, without sorting it.
 
     Returns:
         List of items (not tuples) sorted by score descending.
@@ -180,53 +344,37 @@ def fuzzy_filter_and_rank(query: str, items: list, text_getter, threshold: float
     """
     q = query.strip().lower()
     if not q:
-        return list(items)
+        return list(items) if limit is None else list(items[:max(limit, 0)])
 
     # Pre-compute query n-grams ONCE — reused for every item to avoid
     # recomputing the same grams 100K+ times per request.
-    padded_q = f" {q} "
-    q_n = min(3, len(padded_q))
-    q_grams = _ngrams(padded_q, q_n)
-    q_gram_keys = frozenset(q_grams)
-
-    scored = []
-    for item in items:
-        text = text_getter(item) or ""
-        t = text.strip().lower()
-        if not t:
-            continue
-
-        # Exact-substring short-circuit (C-speed, free)
-        if q in t:
-            scored.append((1.0, item))
-            continue
-
-        # Compute text n-grams once — reused for both pre-filter and dice.
-        padded_t = f" {t} "
-        t_n = min(q_n, len(padded_t))
-        if t_n < 1:
-            continue
-        t_grams = _ngrams(padded_t, t_n)
-
-        # Trigram pre-filter: if no n-gram from the query appears in the text
-        # the Dice score is 0.  With threshold=0.25 and dice weight=0.40 the
-        # remaining signals alone rarely exceed 0.25, so skip early.
-        if not q_gram_keys.intersection(t_grams):
-            continue
-
-        # Dice — reuse pre-computed grams; re-derive q_grams only for the rare
-        # case where a very short title requires a smaller effective n.
-        active_q_grams = q_grams if t_n == q_n else _ngrams(padded_q, t_n)
-        dice = _dice_coefficient(active_q_grams, t_grams)
-
-        # Cap strings fed to LCS to bound O(n·m) cost for long titles.
-        lcs_val = _lcs_ratio(q[:50], t[:50])
-        words   = _word_overlap(q, t)
-        pfx     = _prefix_bonus(q, t)
-
-        score = round(min(0.40 * dice + 0.30 * lcs_val + 0.20 * words + 0.10 * pfx, 1.0), 4)
-        if score >= threshold:
-            scored.append((score, item))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [item for _, item in scored]
+    q_features = query_features(q)
+    q_gram_keys = frozenset(q_features[0])
+
+    def scored():
+        for item in items:
+            text = text_getter(item) or ""
+            t = text.strip().lower()
+            if not t:
+                continue
+
+            # Exact-substring short-circuit (C-speed, free)
+            if q in t:
+                yield 1.0, item
+                continue
+
+            # Compute text n-grams once — reused for both pre-filter and dice.
+            t_grams = text_grams(t)
+
+            # Trigram pre-filter: if no n-gram from the query appears in the text
+            # the Dice score is 0.  With threshold=0.25 and dice weight=0.40 the
+            # remaining signals alone rarely exceed 0.25, so skip early.
+            if not q_gram_keys.intersection(t_grams):
+                continue
+
+            shared = _gram_intersection(q_features[0], t_grams)
+            score = score_candidate(q, q_features, t, t.split(), shared)
+            if score >= threshold:
+                yield score, item
+
+    return [item for _, item in top_scored(scored(), limit)]
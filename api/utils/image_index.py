@@ -0,0 +1,129 @@
+"""
+In-memory index of the image files in CDN_POSTERS_DIR.
+
+Deciding whether a title "has images" used to stat its poster/backdrop file
+for every candidate item, which on a network share turns list and search
+requests into stat storms. The directory is listed once with os.scandir into
+a frozenset of filenames; existence checks become set lookups.
+
+The set is kept current by the code that adds or removes images (admin image
+import, CDN content deletion) and is rescanned in the background when it is
+older than RESCAN_INTERVAL_SECONDS, to pick up files copied in from outside.
+"""
+
+import os
+import threading
+import time
+from paths import CDN_POSTERS_DIR
+from utils.logger import log_info, log_error
+
+# Rescan the directory in the background when the set is older than this
+RESCAN_INTERVAL_SECONDS = 600
+
+_names = None
+_scanned_at = 0.0
+_lock = threading.Lock()
+_rescan_thread = None
+# Adds/removes made while a scan is running, re-applied to its result
+_changes = None
+
+
+def _scan(directory):
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        return frozenset()
+
+
+def rescan_images():
+    """List CDN_POSTERS_DIR again and replace the filename set. Returns the number of files."""
+    global _names, _scanned_at, _changes
+    started = time.time()
+    with _lock:
+        _changes = []
+    names = _scan(CDN_POSTERS_DIR)
+    with _lock:
+        for added, removed in _changes:
+            names = (names | added) - removed
+        _changes = None
+        _names = names
+        _scanned_at = started
+    log_info(f"Indexed {len(names)} image files in {CDN_POSTERS_DIR} ({time.time() - started:.2f}s)")
+    return len(names)
+
+
+def _rescan_in_background():
+    global _rescan_thread
+
+    def _run():
+        try:
+            rescan_images()
+        except Exception as e:
+            log_error(f"Image index rescan failed: {e}")
+
+    with _lock:
+        if _rescan_thread is not None and _rescan_thread.is_alive():
+            return
+        _rescan_thread = threading.Thread(target=_run, name='image-index-rescan', daemon=True)
+        _rescan_thread.start()
+
+
+def image_names():
+    """Return the set of image filenames, scanning the directory on first use."""
+    names = _names
+    if names is None:
+        with _lock:
+            names = _names
+        if names is None:
+            rescan_images()
+            return _names
+    if RESCAN_INTERVAL_SECONDS and time.time() - _scanned_at > RESCAN_INTERVAL_SECONDS:
+        _rescan_in_background()
+    return names
+
+
+def image_exists(filename):
+    """
+    Check whether an image file exists in CDN_POSTERS_DIR.
+
+    Args:
+        filename (str): Path relative to CDN_POSTERS_DIR (a leading '/' is ignored)
+
+    Returns:
+        bool: True if the file exists
+    """
+    if not filename or not isinstance(filename, str):
+        return False
+    filename = filename.lstrip('/')
+    if '/' in filename or os.sep in filename:
+        # Only the top level of the directory is indexed
+        return os.path.isfile(os.path.join(CDN_POSTERS_DIR, filename))
+    return filename in image_names()
+
+
+def add_images(filenames):
+    """Record image files that were just written to CDN_POSTERS_DIR."""
+    global _names
+    filenames = {name for name in filenames if name}
+    if not filenames:
+        return
+    with _lock:
+        if _changes is not None:
+            _changes.append((filenames, frozenset()))
+        if _names is not None:
+            _names = _names | filenames
+
+
+def remove_images(filenames):
+    """Record image files that were just deleted from CDN_POSTERS_DIR."""
+    global _names
+    filenames = set(filenames)
+    if not filenames:
+        return
+    with _lock:
+        if _changes is not None:
+            _changes.append((frozenset(), filenames))
+        if _names is not None:
+            _names = _names - filenames
+
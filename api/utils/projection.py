@@ -0,0 +1,72 @@
+"""
+Field projections of catalog records for the list endpoints.
+
+Catalog records carry overviews, keywords, production companies, budgets and
+so on, while a grid card only shows a few of them. List endpoints accept:
+
+- view=card: the fields a card needs (CARD_FIELDS)
+- view=detail (the default): the full record
+- fields=a,b,c: exactly these fields (overrides view)
+
+The record's id is always kept (`id`, or `show_id`/`movie_id` on serialized
+database records, as in utils.cursors.item_id), and per-request fields (watch_history, media_type/type
+tags) are added after the projection. Named views of catalog items are
+encoded once per snapshot version (CatalogSnapshot.item_json); ad-hoc field
+lists are projected per request.
+"""
+
+CARD_FIELDS = ('backdrop_path', 'genres', 'id', 'media_type', 'name', 'poster_path',
+               'show_id', 'title', 'vote_average')
+
+VIEWS = {
+    'card': CARD_FIELDS,
+    'detail': None,
+}
+
+# Projections whose encoded records are kept with the catalog snapshot
+NAMED_PROJECTIONS = frozenset(fields for fields in VIEWS.values() if fields is not None)
+
+# Upper bound on the number of fields of an ad-hoc projection
+MAX_FIELDS = 64
+
+# Id fields of a record, in the order utils.cursors.item_id looks them up
+ID_FIELDS = ('id', 'show_id', 'movie_id')
+
+
+def resolve_fields(args):
+    """
+    Get the projection requested by the `fields` / `view` query args.
+
+    Args:
+        args (MultiDict): Request query args
+
+    Returns:
+        tuple: Sorted field names, or None for the full record
+    """
+    fields = args.get('fields', '', type=str)
+    if fields:
+        names = sorted({name.strip() for name in fields.split(',') if name.strip()})
+        if names:
+            return tuple(sorted(set(names[:MAX_FIELDS]) | {'id'}))
+    return VIEWS.get(args.get('view', '', type=str).strip().lower())
+
+
+def project(item, fields):
+    """
+    Project a record onto the given fields.
+
+    Args:
+        item (dict): The record
+        fields (tuple): Field names, or None to keep the whole record
+
+    Returns:
+        dict: The record itself when fields is None, otherwise a new dict with
+            the listed fields the record has, and its id field
+    """
+    if fields is None:
+        return item
+    projected = {key: item[key] for key in fields if key in item}
+    id_field = next((key for key in ID_FIELDS if key in item), None)
+    if id_field is not None and id_field not in projected:
+        projected[id_field] = item[id_field]
+    return projected
@@ -0,0 +1,124 @@
+"""
+Seeded random paging over filtered catalog positions.
+
+The random endpoints used to copy the filtered catalog, random.shuffle all of
+it and return one page, so every page cost O(N) and page 2 was unrelated to
+page 1 (titles repeated, others never showed up). Instead, a seed picks a
+permutation of the matching positions and a page is the slice
+[start, start + per_page) of that permutation:
+
+- the permutation is never materialized: SeededPermutation maps an index to
+  its permuted position with a small Feistel network (cycle-walking into
+  range), so a page costs O(per_page)
+- the same seed gives the same order, so the pages of one seed never overlap
+  and together cover every matching title (consistent infinite scroll)
+
+Clients pass `seed` to continue a sequence; without one the server issues a
+new seed and returns it in the X-Random-Seed response header.
+"""
+
+import bisect
+import random
+
+SEED_HEADER = 'X-Random-Seed'
+
+_MASK64 = (1 << 64) - 1
+_ROUNDS = 4
+
+
+def _mix(value):
+    """SplitMix64 finalizer: a cheap, well-distributed 64-bit hash."""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def new_seed():
+    """Issue a seed for a client that did not send one."""
+    return random.getrandbits(31)
+
+
+def resolve_seed(seed):
+    """Return the client's seed, or a new one if it sent none."""
+    return new_seed() if seed is None else seed
+
+
+class SeededPermutation:
+    """
+    A permutation of range(size) chosen by `seed`, evaluated one index at a time.
+
+    Args:
+        size (int): Number of elements to permute
+        seed (int): Any integer; equal seeds give equal permutations
+    """
+
+    __slots__ = ('size', '_half', '_mask', '_keys')
+
+    def __init__(self, size, seed):
+        self.size = size
+        # Feistel halves need an even bit width covering size - 1
+        bits = max(2, (size - 1).bit_length())
+        bits += bits & 1
+        self._half = bits // 2
+        self._mask = (1 << self._half) - 1
+        seed &= _MASK64
+        self._keys = [_mix(seed ^ _mix(round_number)) for round_number in range(_ROUNDS)]
+
+    def _encrypt(self, value):
+        left, right = value >> self._half, value & self._mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix(right ^ key) & self._mask)
+        return (left << self._half) | right
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError('permutation index out of range')
+        # The network permutes the next even power of two; walk the cycle until
+        # the value lands in range (at most a few steps on average)
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def page(self, page, per_page):
+        """Return the permuted values of one page, like cdn.utils.paginate over the permutation."""
+        start = (page - 1) * per_page
+        return [self[i] for i in range(self.size)[start:start + per_page]]
+
+
+def sample_page(sources, page, per_page, seed):
+    """
+    Return one page of a seeded shuffle of several filtered lists together.
+
+    Args:
+        sources (list): [(items, positions, media_type), ...] where positions are
+            the indexes of the matching items (e.g. ColumnarIndex.positions())
+        page (int): 1-based page number
+        per_page (int): Page size
+        seed (int): Shuffle seed
+
+    Returns:
+        list: (item, media_type) pairs
+    """
+    offsets = []
+    total = 0
+    for _, positions, _ in sources:
+        offsets.append(total)
+        total += len(positions)
+
+    result = []
+    for value in SeededPermutation(total, seed).page(page, per_page):
+        # Last source starting at or before value (empty sources share the next offset)
+        source = bisect.bisect_right(offsets, value) - 1
+        items, positions, media_type = sources[source]
+        result.append((items[positions[value - offsets[source]]], media_type))
+    return result
+
+
+def sample_items(items, positions, page, per_page, seed):
+    """sample_page() over a single list; returns the items only."""
+    return [item for item, _ in sample_page([(items, positions, None)], page, per_page, seed)]
@@ -0,0 +1,465 @@
+"""
+Precomputed "more like this" neighbors for the /similar endpoints.
+
+The /similar endpoints used to score the requested title against every title
+of the catalog (rebuilding both genre sets each time) and sort the whole
+list, per request. SimilarityIndex computes the top SIMILAR_TOP_K neighbors
+of every title once per catalog list instead, so /similar is a lookup plus
+pagination. Pages past SIMILAR_TOP_K and shuffled lists need the whole
+ranking, which is then computed for the request (all_neighbors).
+
+Each title is a sparse binary feature vector: its genres, its original
+language and its keywords (when the catalog has them). The similarity of two
+titles is the number of features they share: the shared-genres-plus-same-
+language score of cdn.utils.calculate_similarity, with genres normalized the
+way the genre filters do, plus shared keywords. Ties keep catalog order.
+
+- Genre + language features are few, so titles are grouped by that
+  "signature" and scored per signature pair (a small dense matrix product with
+  NumPy). Titles without keywords share the ranking of their signature.
+  Keywords are sparse and are added per title through keyword postings.
+- A single-item edit (replaced/appended/removed) returns a new index. Only
+  the lists the edited title enters or leaves change, and only full lists
+  that lose it are recomputed.
+- Neighbor tables are persisted next to the catalog bundle, keyed by a
+  fingerprint of the features they were computed from, so a restart with an
+  unchanged catalog does not recompute them.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from utils.catalog_index import _discard_position, _insert_position, normalize_genres, np
+from utils.logger import log_info, log_warning, log_error
+
+# Neighbors kept (and served) per title
+SIMILAR_TOP_K = 100
+
+SIMILARITY_FILENAME = 'similarity_neighbors.bin'
+SIMILARITY_FORMAT_VERSION = 1
+
+# Delay before rebuilding and persisting after a change, so bursts of edits are coalesced
+REFRESH_DELAY_SECONDS = 5
+
+# Catalog lists that have a similarity index
+SIMILARITY_LISTS = ('movies', 'tv_series', 'movies_with_images', 'tv_series_with_images')
+
+_store_dir = None
+# name -> (fingerprint, neighbors) as last read from / written to the store
+_persisted = None
+_store_lock = threading.Lock()
+_refresh_timer = None
+_refresh_lock = threading.Lock()
+
+
+def _keyword_names(value):
+    # TMDB appends keywords as {'keywords': [...]} (movies) or {'results': [...]} (tv)
+    if isinstance(value, dict):
+        value = value.get('keywords') or value.get('results') or []
+    if isinstance(value, str):
+        names = value.split(',')
+    elif isinstance(value, list):
+        names = [k.get('name') if isinstance(k, dict) else k for k in value]
+    else:
+        return frozenset()
+    return frozenset(n.strip().lower() for n in names if isinstance(n, str) and n.strip())
+
+
+def item_features(item):
+    """
+    Return the similarity features of an item.
+
+    Returns:
+        tuple: (frozenset of genre/language features, frozenset of keywords)
+    """
+    _, genres = normalize_genres(item.get('genres'))
+    signature = {('genre', name) for name in genres}
+    language = item.get('original_language')
+    if language:
+        signature.add(('language', language))
+    return frozenset(signature), _keyword_names(item.get('keywords'))
+
+
+class SimilarityIndex:
+    """
+    Top-K most similar items of every item of one catalog list.
+
+    Args:
+        items (list): Catalog items; the index keeps a reference and never mutates them
+        name (str): Catalog list name, used to find a persisted neighbor table
+        top_k (int): Neighbors kept per item
+    """
+
+    def __init__(self, items, name=None, top_k=SIMILAR_TOP_K):
+        self.name = name
+        self.top_k = top_k
+        # Signature registry, only ever extended (edits share it copy-on-write)
+        self._signatures = []
+        self._signature_ids = {}
+        self._feature_columns = {}
+        self._matrix = None
+        self._index_items(items)
+
+        started = time.time()
+        neighbors = persisted_neighbors(name, self.fingerprint()) if name else None
+        if neighbors is None:
+            neighbors = self._compute_all()
+            log_info(f"Computed similar titles for {len(self.ids)} {name or 'items'} ({time.time() - started:.2f}s)")
+        self._neighbors = neighbors
+
+    def _index_items(self, items):
+        self.items = items
+        self.ids = [item.get('id') for item in items]
+        self._keywords = []
+        signature_of = []
+        for item in items:
+            signature, keywords = item_features(item)
+            signature_of.append(self._signature_id(signature))
+            self._keywords.append(keywords)
+        self._signature_of = signature_of if np is None else np.array(signature_of, dtype=np.int64)
+        self._index_positions()
+
+    def _index_positions(self):
+        """(Re)build the id -> position map and the keyword postings from ids and keywords."""
+        self._positions = {}
+        postings = {}
+        for position, (item_id, keywords) in enumerate(zip(self.ids, self._keywords)):
+            self._positions.setdefault(item_id, position)
+            for keyword in keywords:
+                postings.setdefault(keyword, []).append(position)
+        to_postings = tuple if np is None else (lambda positions: np.array(positions, dtype=np.int64))
+        self._keyword_postings = {keyword: to_postings(p) for keyword, p in postings.items()}
+
+    def _signature_id(self, signature):
+        sid = self._signature_ids.get(signature)
+        if sid is None:
+            sid = self._signature_ids[signature] = len(self._signatures)
+            self._signatures.append(signature)
+            self._matrix = None
+        return sid
+
+    def _signature_matrix(self):
+        """Dense signature x feature 0/1 matrix (rebuilt after the registry grew)."""
+        if self._matrix is None:
+            for signature in self._signatures:
+                for feature in signature:
+                    self._feature_columns.setdefault(feature, len(self._feature_columns))
+            matrix = np.zeros((len(self._signatures), len(self._feature_columns)), dtype=np.int32)
+            for sid, signature in enumerate(self._signatures):
+                for feature in signature:
+                    matrix[sid, self._feature_columns[feature]] = 1
+            self._matrix = matrix
+        return self._matrix
+
+    def fingerprint(self):
+        """Hash of everything the neighbor table depends on."""
+        digest = hashlib.sha1(repr(self.top_k).encode())
+        for item_id, sid, keywords in zip(self.ids, self._signature_of_list(), self._keywords):
+            digest.update(repr((item_id, sorted(self._signatures[sid]), sorted(keywords))).encode())
+        return digest.hexdigest()
+
+    def _signature_of_list(self):
+        return self._signature_of.tolist() if np is not None else self._signature_of
+
+    def _scores(self, position, with_keywords=True):
+        """Similarity of the item at `position` to every item, by position."""
+        sid = int(self._signature_of[position])
+        if np is not None:
+            matrix = self._signature_matrix()
+            scores = (matrix @ matrix[sid])[self._signature_of]
+        else:
+            signature = self._signatures[sid]
+            by_signature = [len(signature & other) for other in self._signatures]
+            scores = [by_signature[s] for s in self._signature_of]
+        if with_keywords:
+            for keyword in self._keywords[position]:
+                if np is not None:
+                    scores[self._keyword_postings[keyword]] += 1
+                else:
+                    for other in self._keyword_postings[keyword]:
+                        scores[other] += 1
+        return scores
+
+    def _ranked(self, scores, limit):
+        """Return up to `limit` (position, score) pairs with a positive score, best first."""
+        if np is not None:
+            candidates = np.flatnonzero(scores > 0)
+            count = len(self.ids)
+            # Higher score first, then lower position
+            keys = scores[candidates].astype(np.int64) * (count + 1) + (count - candidates)
+            if len(candidates) > limit:
+                chosen = np.argpartition(-keys, limit - 1)[:limit]
+                candidates, keys = candidates[chosen], keys[chosen]
+            candidates = candidates[np.argsort(-keys, kind='stable')].tolist()
+            return [(position, int(scores[position])) for position in candidates]
+        ranked = sorted((p for p, score in enumerate(scores) if score > 0), key=lambda p: (-scores[p], p))
+        return [(position, scores[position]) for position in ranked[:limit]]
+
+    def _pick(self, ranked, item_id, limit=None):
+        picked = [(self.ids[position], score) for position, score in ranked if self.ids[position] != item_id]
+        picked = picked[:self.top_k if limit is None else limit]
+        return tuple(i for i, _ in picked), tuple(s for _, s in picked)
+
+    def _neighbors_of(self, position):
+        return self._pick(self._ranked(self._scores(position), self.top_k + 1), self.ids[position])
+
+    def _compute_all(self):
+        neighbors = {}
+        # Items without keywords share the ranking of their signature
+        by_signature = {}
+        for position, (item_id, sid) in enumerate(zip(self.ids, self._signature_of_list())):
+            if item_id in neighbors:
+                continue
+            if self._keywords[position]:
+                neighbors[item_id] = self._neighbors_of(position)
+                continue
+            ranked = by_signature.get(sid)
+            if ranked is None:
+                # Room for the item itself and a duplicate id
+                ranked = by_signature[sid] = self._ranked(self._scores(position, with_keywords=False), self.top_k + 2)
+            neighbors[item_id] = self._pick(ranked, item_id)
+        return neighbors
+
+    def neighbors(self, item_id):
+        """
+        Return the most similar items of an item.
+
+        Returns:
+            tuple: (neighbor ids, their scores), best first; empty if the id is unknown
+        """
+        return self._neighbors.get(item_id, ((), ()))
+
+    def all_neighbors(self, item_id):
+        """
+        Return every item similar to an item, computed for this call (the
+        first top_k are the stored neighbors).
+
+        Returns:
+            tuple: (neighbor ids, their scores), best first; empty if the id is unknown
+        """
+        position = self._positions.get(item_id)
+        if position is None:
+            return (), ()
+        return self._pick(self._ranked(self._scores(position), len(self.ids)), item_id, len(self.ids))
+
+    # Incremental updates: each returns a new index for the edited list and leaves
+    # this one untouched.
+
+    def _copy(self, items):
+        index = object.__new__(SimilarityIndex)
+        index.__dict__.update(self.__dict__)
+        index.items = items
+        index._signatures = list(self._signatures)
+        index._signature_ids = dict(self._signature_ids)
+        index._feature_columns = dict(self._feature_columns)
+        index._keywords = list(self._keywords)
+        index._keyword_postings = dict(self._keyword_postings)
+        index._neighbors = dict(self._neighbors)
+        return index
+
+    def _set_keywords(self, position, keywords):
+        old = self._keywords[position]
+        for keyword in old - keywords:
+            remaining = _discard_position(self._keyword_postings[keyword], position)
+            if len(remaining):
+                self._keyword_postings[keyword] = remaining
+            else:
+                del self._keyword_postings[keyword]
+        for keyword in keywords - old:
+            self._keyword_postings[keyword] = _insert_position(self._keyword_postings.get(keyword), position)
+        self._keywords[position] = keywords
+
+    def replaced(self, position, item, items):
+        """Return the index of `items`: this list with the item at `position` replaced by `item`."""
+        index = self._copy(items)
+        signature, keywords = item_features(item)
+        index._signature_of = self._signature_of.copy()
+        index._signature_of[position] = index._signature_id(signature)
+        index._set_keywords(position, keywords)
+        if item.get('id') != self.ids[position]:
+            index.ids = list(self.ids)
+            index.ids[position] = item.get('id')
+            index._index_positions()
+        return index._edited(self.items[position], item)
+
+    def appended(self, item, items):
+        """Return the index of `items`: this list with `item` appended."""
+        index = self._copy(items)
+        position = len(self.ids)
+        signature, keywords = item_features(item)
+        index.ids = self.ids + [item.get('id')]
+        index._positions = dict(self._positions)
+        index._positions.setdefault(item.get('id'), position)
+        sid = index._signature_id(signature)
+        if np is not None:
+            index._signature_of = np.append(self._signature_of, np.int64(sid))
+        else:
+            index._signature_of = self._signature_of + [sid]
+        index._keywords.append(frozenset())
+        index._set_keywords(position, keywords)
+        return index._edited(None, item)
+
+    def removed(self, positions, items):
+        """Return the index of `items`: this list without the items at `positions` (all with one id)."""
+        index = self._copy(items)
+        removed = set(positions)
+        index.ids = [item_id for i, item_id in enumerate(self.ids) if i not in removed]
+        index._keywords = [keywords for i, keywords in enumerate(self._keywords) if i not in removed]
+        if np is not None:
+            index._signature_of = np.delete(self._signature_of, sorted(removed))
+        else:
+            index._signature_of = [sid for i, sid in enumerate(self._signature_of) if i not in removed]
+        index._index_positions()
+        return index._edited(self.items[positions[0]], None)
+
+    def _edited(self, old_item, new_item):
+        """Update the neighbor lists of this (already edited) index for one changed item."""
+        neighbors = self._neighbors
+        old_id = old_item.get('id') if old_item is not None else None
+        new_id = new_item.get('id') if new_item is not None else None
+        if old_id is not None and old_id == new_id and item_features(old_item) == item_features(new_item):
+            return self
+
+        recompute = set()
+        if old_item is not None:
+            neighbors.pop(old_id, None)
+            for item_id, (ids, scores) in list(neighbors.items()):
+                if old_id not in ids:
+                    continue
+                if len(ids) >= self.top_k:
+                    # The next best item is not known: rank this one again
+                    recompute.add(item_id)
+                else:
+                    # Every positive-score item is listed: just drop the edited one
+                    keep = [i for i, other in enumerate(ids) if other != old_id]
+                    neighbors[item_id] = (tuple(ids[i] for i in keep), tuple(scores[i] for i in keep))
+
+        if new_item is not None and new_id in self._positions:
+            position = self._positions[new_id]
+            scores = self._scores(position)
+            neighbors[new_id] = self._pick(self._ranked(scores, self.top_k + 1), new_id)
+            # Similarity is symmetric: offer the new item to the lists of everything it scores with
+            for other, score in self._ranked(scores, len(self.ids)):
+                item_id = self.ids[other]
+                if item_id == new_id or item_id in recompute or item_id not in neighbors:
+                    continue
+                neighbors[item_id] = self._inserted(neighbors[item_id], new_id, position, score)
+
+        for item_id in recompute:
+            if item_id in self._positions:
+                neighbors[item_id] = self._neighbors_of(self._positions[item_id])
+        return self
+
+    def _inserted(self, entry, item_id, position, score):
+        ids, scores = entry
+        key = (-score, position)
+        if len(ids) >= self.top_k and key >= (-scores[-1], self._positions[ids[-1]]):
+            return entry
+        at = len(ids)
+        for i, (other, other_score) in enumerate(zip(ids, scores)):
+            if key < (-other_score, self._positions[other]):
+                at = i
+                break
+        ids = ids[:at] + (item_id,) + ids[at:]
+        scores = scores[:at] + (score,) + scores[at:]
+        return ids[:self.top_k], scores[:self.top_k]
+
+
+# Persistence
+
+def _store_path(files_dir):
+    return os.path.join(files_dir, SIMILARITY_FILENAME)
+
+
+def _load_store():
+    global _persisted
+    if _persisted is not None or _store_dir is None:
+        return _persisted or {}
+    path = _store_path(_store_dir)
+    stored = {}
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('format') == SIMILARITY_FORMAT_VERSION:
+            stored = data['lists']
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log_warning(f"Could not read similarity store {path}: {e}")
+    _persisted = stored
+    return stored
+
+
+def persisted_neighbors(name, fingerprint):
+    """Return the persisted neighbor table of a list if it was computed from the same features."""
+    with _store_lock:
+        entry = _load_store().get(name)
+    if entry is not None and entry[0] == fingerprint:
+        return entry[1]
+    return None
+
+
+def save_similarity(files_dir, indexes):
+    """
+    Persist neighbor tables (temp file + atomic rename), keeping stored lists not given here.
+
+    Args:
+        indexes (dict): {catalog name: SimilarityIndex}
+
+    Returns:
+        bool: True if the store was rewritten
+    """
+    global _persisted
+    with _store_lock:
+        stored = dict(_load_store())
+        changed = False
+        for name, index in indexes.items():
+            fingerprint = index.fingerprint()
+            if stored.get(name, (None,))[0] != fingerprint:
+                stored[name] = (fingerprint, index._neighbors)
+                changed = True
+        if not changed:
+            return False
+
+        path = _store_path(files_dir)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'format': SIMILARITY_FORMAT_VERSION, 'lists': stored}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            log_error(f"Error writing similarity store {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        _persisted = stored
+    log_info(f"Similarity store written: {path}")
+    return True
+
+
+def schedule_similarity_refresh(files_dir, delay=REFRESH_DELAY_SECONDS):
+    """
+    Build the similarity indexes of the current catalog snapshot in the background
+    (loading them from the store when it is up to date) and persist them.
+    """
+    global _store_dir, _refresh_timer
+    _store_dir = files_dir
+
+    def _run():
+        from utils.data_helpers import get_catalog_snapshot
+        try:
+            snapshot = get_catalog_snapshot()
+            save_similarity(files_dir, {name: snapshot.similar(name) for name in SIMILARITY_LISTS})
+        except Exception as e:
+            log_error(f"Similarity refresh failed: {e}")
+
+    with _refresh_lock:
+        if _refresh_timer is not None:
+            _refresh_timer.cancel()
+        _refresh_timer = threading.Timer(delay, _run)
+        _refresh_timer.daemon = True
+        _refresh_timer.start()
@@ -0,0 +1,224 @@
+"""
+Trigram inverted index for fuzzy title search.
+
+fuzzy_filter_and_rank (utils/fuzzy.py) lowercases and trigrams every title of
+the list on every query before it can discard the ones sharing nothing with
+the query, so search and per-keystroke autocomplete cost O(catalog).
+TrigramIndex normalizes every title once per catalog list (kept with the
+snapshot, see CatalogSnapshot.text_index) and keeps trigram -> ascending
+positions postings. A query then:
+
+1. counts, per title, how many distinct query trigrams it shares, by merging
+   the postings of the query's trigrams
+2. keeps the titles reaching the minimum overlap the threshold allows
+   (utils.fuzzy.min_gram_overlap), plus those that can still contain the
+   query as a substring
+3. scores only those candidates with the usual Dice/LCS/word/prefix signals,
+   using search features kept per title (normalized text, word tokens), so
+   scoring does only the query-dependent work. The shared trigram count of
+   the Dice term comes from step 1; trigrams a title holds more than once
+   are kept in a small side table (repeats) instead of a multiset per title.
+
+Results are the same as fuzzy_filter_and_rank over the list, in the same
+order. Queries shorter than three characters have no inner trigram, so their
+substring matches are found by a scan of the normalized titles (no scoring).
+
+Single-item edits (replaced/appended/removed) return a new index that shares
+every posting list the edited title does not touch.
+"""
+
+import bisect
+from collections import Counter
+from utils.catalog_index import _discard_position, _drop_positions, _insert_position, np
+from utils.fuzzy import min_gram_overlap, query_features, score_candidate, text_grams, top_scored
+
+
+def title_text(item):
+    """Searchable text of a catalog item: movie title or TV series name."""
+    text = item.get('title') or item.get('name') or ''
+    return text if isinstance(text, str) else ''
+
+
+def _normalize(item):
+    return title_text(item).strip().lower()
+
+
+class TrigramIndex:
+    """
+    Read-only trigram index over the titles of one catalog list.
+
+    Args:
+        items (list): Catalog items; the index keeps a reference and never mutates them
+    """
+
+    def __init__(self, items):
+        self.items = items
+        # Search features per position: normalized title ('' for items without
+        # one) and its words, so a query only does the query-dependent scoring
+        self.texts = [_normalize(item) for item in items]
+        self.words = [tuple(text.split()) for text in self.texts]
+        postings = {}
+        # gram -> {position: count} for the titles holding a trigram more than once
+        self.repeats = {}
+        for position, text in enumerate(self.texts):
+            if text:
+                for gram, count in text_grams(text).items():
+                    postings.setdefault(gram, []).append(position)
+                    if count > 1:
+                        self.repeats.setdefault(gram, {})[position] = count
+        to_postings = (lambda positions: np.array(positions, dtype=np.int64)) if np is not None else tuple
+        self.postings = {gram: to_postings(positions) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.items)
+
+    def _overlaps(self, q_grams, min_overlap):
+        """
+        Titles sharing at least min_overlap distinct trigrams with the query.
+
+        Returns:
+            tuple: (ascending positions, position -> number of distinct shared trigrams)
+        """
+        lists = [self.postings[gram] for gram in q_grams if gram in self.postings]
+        if len(lists) < min_overlap:
+            return [], {}
+        if np is not None:
+            counts = np.bincount(np.concatenate(lists), minlength=len(self.texts))
+            positions = np.flatnonzero(counts >= min_overlap)
+            return positions.tolist(), dict(zip(positions.tolist(), counts[positions].tolist()))
+        counts = Counter()
+        for positions in lists:
+            counts.update(positions)
+        return sorted(position for position, count in counts.items() if count >= min_overlap), counts
+
+    def search(self, query, threshold=0.25, positions=None, limit=None):
+        """
+        Fuzzy-match the query against the titles.
+
+        Args:
+            query (str): Search query
+            threshold (float): Minimum score to include
+            positions (iterable): Only consider these positions (e.g. the
+                result of a ColumnarIndex filter); None for the whole list
+            limit (int): Return at most this many pairs; scoring stops early
+                once as many exact matches are found (utils.fuzzy.top_scored)
+
+        Returns:
+            list: (score, position) pairs, best score first and ties in
+                catalog order; every considered position when the query is blank
+        """
+        if positions is not None and np is not None and isinstance(positions, np.ndarray):
+            positions = positions.tolist()
+        allowed = None if positions is None else set(positions)
+        q = query.strip().lower()
+        if not q:
+            considered = range(len(self.texts)) if allowed is None else sorted(allowed)
+            if limit is not None:
+                considered = considered[:max(limit, 0)]
+            return [(1.0, position) for position in considered]
+
+        q_features = query_features(q)
+        q_grams = q_features[0]
+        # Unpadded trigrams of the query: a title containing the query has all of them
+        inner = {q[i:i + 3] for i in range(len(q) - 2)}
+        min_overlap = min_gram_overlap(q_grams, threshold)
+        if inner:
+            candidates, overlaps = self._overlaps(q_grams, min(min_overlap, len(inner)))
+        else:
+            candidates, overlaps = self._overlaps(q_grams, min_overlap)
+            candidates = sorted(set(candidates).union(
+                position for position, text in enumerate(self.texts) if q in text))
+        # Query trigrams that occur more than once: they count up to min(query, title) times
+        repeated = [(self.repeats.get(gram, {}), count) for gram, count in q_grams.items() if count > 1]
+
+        texts, words = self.texts, self.words
+
+        def scored():
+            for position in candidates:
+                if allowed is not None and position not in allowed:
+                    continue
+                t = texts[position]
+                if q in t:
+                    yield 1.0, position
+                    continue
+                shared = overlaps[position]
+                for title_counts, count in repeated:
+                    title_count = title_counts.get(position)
+                    if title_count:
+                        shared += min(count, title_count) - 1
+                score = score_candidate(q, q_features, t, words[position], shared)
+                if score >= threshold:
+                    yield score, position
+
+        return top_scored(scored(), limit)
+
+    # Incremental updates: each returns a new index for the edited list and leaves
+    # this one untouched, sharing every posting list that did not change.
+
+    def _derive(self, items, texts, words):
+        index = object.__new__(TrigramIndex)
+        index.items = items
+        index.texts = texts
+        index.words = words
+        index.postings = dict(self.postings)
+        index.repeats = dict(self.repeats)
+        return index
+
+    def _add(self, position, text):
+        if text:
+            for gram, count in text_grams(text).items():
+                self.postings[gram] = _insert_position(self.postings.get(gram), position)
+                if count > 1:
+                    self.repeats[gram] = {**self.repeats.get(gram, {}), position: count}
+
+    def _remove(self, position, text):
+        if text:
+            for gram in text_grams(text):
+                remaining = _discard_position(self.postings[gram], position)
+                if len(remaining):
+                    self.postings[gram] = remaining
+                else:
+                    del self.postings[gram]
+                if position in self.repeats.get(gram, ()):
+                    counts = {p: c for p, c in self.repeats[gram].items() if p != position}
+                    if counts:
+                        self.repeats[gram] = counts
+                    else:
+                        del self.repeats[gram]
+
+    def replaced(self, position, item, items):
+        """Return the index of `items`: this list with the item at `position` replaced by `item`."""
+        text = _normalize(item)
+        texts, words = list(self.texts), list(self.words)
+        texts[position], words[position] = text, tuple(text.split())
+        index = self._derive(items, texts, words)
+        index._remove(position, self.texts[position])
+        index._add(position, text)
+        return index
+
+    def appended(self, item, items):
+        """Return the index of `items`: this list with `item` appended."""
+        text = _normalize(item)
+        index = self._derive(items, self.texts + [text], self.words + [tuple(text.split())])
+        index._add(len(self.texts), text)
+        return index
+
+    def removed(self, positions, items):
+        """Return the index of `items`: this list without the items at `positions`."""
+        positions = sorted(positions)
+        removed = set(positions)
+        index = self._derive(items, [text for i, text in enumerate(self.texts) if i not in removed],
+                             [words for i, words in enumerate(self.words) if i not in removed])
+        # Drop the removed positions and shift the ones after them
+        for gram, values in self.postings.items():
+            remaining = _drop_positions(values, positions)
+            if len(remaining):
+                index.postings[gram] = remaining
+            else:
+                del index.postings[gram]
+        index.repeats = {}
+        for gram, counts in self.repeats.items():
+            kept = {p - bisect.bisect_left(positions, p): c for p, c in counts.items() if p not in removed}
+            if kept:
+                index.repeats[gram] = kept
+        return index
@@ -46,6 +46,7 @@ import {
   ClearOutlined  // Add this for clean files functionality
 } from '@ant-design/icons';
 import { API_URL } from "../../../../config";
+import { fetchAllPages } from "../../../../Utils/fetchAllPages";
 import './CDNManagementPage.css';
 import { FaEye, FaEyeSlash } from "react-icons/fa6";
 import dayjs from 'dayjs';
@@ -407,18 +408,16 @@ const CdnManagementPage = () => {
         Authorization: `Bearer ${localStorage.getItem('admin_token')}`
       };
 
-      // Fetch movies and TV shows with all items (no pagination parameters)
-      const moviesResponse = await fetch(`${API_URL}/cdn/movies?with_images=true&per_page=1000000`, {
-        headers: headers
-      });
-      
-      const showsResponse = await fetch(`${API_URL}/cdn/tv?with_images=true&per_page=1000000`, {
-        headers: headers
-      });
+      // Fetch all movies and TV shows, following X-Next-Cursor page by page
+      const [
+        { response: moviesResponse, items: movies },
+        { response: showsResponse, items: shows }
+      ] = await Promise.all([
+        fetchAllPages(`${API_URL}/cdn/movies?with_images=true`, { headers: headers }),
+        fetchAllPages(`${API_URL}/cdn/tv?with_images=true`, { headers: headers })
+      ]);
       
       if (moviesResponse.ok && showsResponse.ok) {
-        const movies = await moviesResponse.json();
-        const shows = await showsResponse.json();
         
         // Combine and format the data for display with enhanced fields
         const combinedContent = [
@@ -3,6 +3,7 @@ import React, { useState, useEffect, useCallback } from "react";
 import './ManageMoviesPage.css'
 import Card from "../../../../Components/Card/Card";
 import { API_URL } from "../../../../config";
+import { fetchAllPages } from "../../../../Utils/fetchAllPages";
 import { CloseOutlined, PlusCircleOutlined } from "@ant-design/icons";
 import UnifiedUploadModal from "../UploadByFile/components/UnifiedUploadModal";
 import { FaEye, FaEyeSlash } from "react-icons/fa6";
@@ -149,15 +150,15 @@ const ManageMovies = () => {
                 setMovieType('api')
                 setLoadingMovies(true)
                 const token = localStorage.getItem('token');
-                const res = await fetch(`${API_URL}/api/movies?per_page=10000`, {
+                const { response: res, items } = await fetchAllPages(`${API_URL}/api/movies`, {
                     headers: { 'Authorization': `Bearer ${token}` }
                 })
-                const data = await res.json();
                 if (!res.ok) {
+                    const data = await res.json();
                     console.error({message: data.error})
                     return
                 }
-                setMovies(data)
+                setMovies(items)
             } catch (error) {
                 console.error('Error validating token:', error);
             } finally {
@@ -2,6 +2,7 @@ import { CloseOutlined, PlusCircleOutlined } from "@ant-design/icons";
 import { Button, Flex, Input, Select, Tooltip, notification } from "antd";
 import React, { useCallback, useEffect, useState } from "react";
 import { API_URL } from "../../../../config";
+import { fetchAllPages } from "../../../../Utils/fetchAllPages";
 import Card from "../../../../Components/Card/Card";
 import UnifiedUploadModal from "../UploadByFile/components/UnifiedUploadModal";
 import { FaEye, FaEyeSlash } from "react-icons/fa6";
@@ -136,16 +137,15 @@ const ManageShows = () => {
                 setShowType('api')
                 setLoadingShows(true)
                 const token = localStorage.getItem('token');
-                const res = await fetch(`${API_URL}/api/shows?per_page=10000`, {
+                const { response: res, items } = await fetchAllPages(`${API_URL}/api/shows`, {
                     headers: { 'Authorization': `Bearer ${token}` }
                 })
-                const data = await res.json();
-                console.log(data);
                 if (!res.ok) {
+                    const data = await res.json();
                     console.error({message: data.error})
                     return
                 }
-                setShows(data)
+                setShows(items)
             } catch (error) {
                 console.error('Error validating token:', error);
             } finally {
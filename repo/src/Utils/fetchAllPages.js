@@ -0,0 +1,23 @@
+// Catalog list endpoints return at most MAX_PER_PAGE (100) items per request and
+// send the next page's cursor in the X-Next-Cursor header (none on the last page).
+export const MAX_PER_PAGE = 100;
+export const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+
+// Fetch every page of a catalog list by following X-Next-Cursor.
+// Resolves to { response, items }: response is the last response fetched (check
+// response.ok; on an error its body is left unread) and items all items received.
+export const fetchAllPages = async (url, options = {}) => {
+  const separator = url.includes('?') ? '&' : '?';
+  const items = [];
+  let cursor = null;
+
+  for (;;) {
+    const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await fetch(`${url}${separator}per_page=${MAX_PER_PAGE}${cursorParam}`, options);
+    if (!response.ok) return { response, items };
+
+    items.push(...(await response.json()));
+    cursor = response.headers.get(NEXT_CURSOR_HEADER);
+    if (!cursor) return { response, items };
+  }
+};
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Amanflix fuzzy search LCS benchmark
+Compares the bit-parallel LCS of api/utils/fuzzy.py with the two-row DP it
+replaced, on synthetic titles, and checks that both give the same lengths.
+
+Usage:
+    python fuzzy_lcs_benchmark.py [--titles 20000] [--seed 1]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'api'))
+
+from utils.fuzzy import _lcs_length_dp, _lcs_length_masked, _lcs_masks  # noqa: E402
+
+QUERIES = ['drk knight', 'the lord of the rings', 'stranger thngs', 'interstellar',
+           'a very long query typed into the search box to look for a documentary series']
+
+
+def make_titles(count, seed):
+    rng = random.Random(seed)
+    vocab = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9)))
+             for _ in range(5000)]
+    return [' '.join(rng.choice(vocab) for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+
+def bench(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<14} {elapsed * 1000:9.1f} ms")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the fuzzy scorer LCS implementations')
+    parser.add_argument('--titles', type=int, default=20000, help='Number of synthetic titles')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles, args.seed)
+    print(f"LCS of {len(QUERIES)} queries against {len(titles):,} titles")
+
+    total_dp = total_bits = 0.0
+    for query in QUERIES:
+        print(f"\n'{query}' ({len(query)} chars)")
+        expected, dp_time = bench('two-row DP', lambda: [_lcs_length_dp(query, title) for title in titles])
+        masks = _lcs_masks(query)
+        actual, bits_time = bench('bit-parallel', lambda: [_lcs_length_masked(masks, len(query), title)
+                                                           for title in titles])
+        if actual != expected:
+            print("   ✗ Results differ!")
+            return 1
+        print(f"   ✓ Same lengths, {dp_time / bits_time:.1f}x faster")
+        total_dp += dp_time
+        total_bits += bits_time
+
+    print(f"\nOverall: {total_dp / total_bits:.1f}x faster")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())